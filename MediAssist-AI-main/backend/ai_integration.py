@@ -1,37 +1,387 @@
 # ai_integration.py
 import rule_based_extractor as fallback
-import ocr_pipeline as ocr
-from openai import OpenAI
+import rule_based_summarizer
+from llm_gateway import LLMUnavailable, gateway
+from result_cache import cache as result_cache
+import asyncio
+import hashlib
 import os
-from dotenv import load_dotenv
+import re
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
 
-# Load environment variables
-load_dotenv()
+SYSTEM_PROMPT = "You are a medical assistant that converts prescription text into simple patient instructions."
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Prescriptions the rule-based extractor scores at least this confident about
+# are answered locally, without an LLM round trip. Above 1.0 always asks the LLM.
+LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_CONFIDENCE_THRESHOLD", "0.8"))
 
-def process_prescription(image_path):
-    # Step 1: Extract text from image
-    extracted_text = ocr.extract_text(image_path)
+# Recent latencies kept per tier for the percentiles in tier_stats.snapshot()
+LATENCY_SAMPLES = 1000
+
+# Transcripts summarized together in one chat completion while the LLM is busy,
+# and how long (seconds) a transcript waits for others to join its batch
+SYMPTOM_BATCH_SIZE = int(os.getenv("SYMPTOM_BATCH_SIZE", "8"))
+SYMPTOM_BATCH_WAIT = float(os.getenv("SYMPTOM_BATCH_WAIT", "0.05"))
+
+SYMPTOM_PROMPT = """
+You are a medical assistant AI. Summarize the following patient-reported symptoms into a single, concise sentence for a doctor.
+
+Patient symptoms:
+"{transcript}"
+
+Doctor summary:
+"""
+
+class TierStats:
+    """How many items each tier answered, and how quickly (prescriptions: local, llm, rules)"""
+
+    TIERS = ("local", "llm", "rules")
+    PERCENTILES = ("p50_ms", "p95_ms", "p99_ms")  # current values (gauges), unlike the counts
+
+    def __init__(self, samples=LATENCY_SAMPLES, tiers=TIERS):
+        self.tiers = tiers
+        self.counts = dict.fromkeys(self.tiers, 0)
+        self.latencies = {tier: deque(maxlen=samples) for tier in self.tiers}
+
+    def record(self, tier, seconds, count=1):
+        self.counts[tier] += count
+        self.latencies[tier].extend([seconds] * count)
+
+    def snapshot(self):
+        """{tier: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}}; percentiles cover the recent samples"""
+        result = {}
+        for tier in self.tiers:
+            ordered = sorted(self.latencies[tier])
+            result[tier] = {"count": self.counts[tier]}
+            for pct, key in zip((50, 95, 99), self.PERCENTILES):
+                value = ordered[min(len(ordered) - 1, len(ordered) * pct // 100)] * 1000 if ordered else None
+                result[tier][key] = value
+        return result
+
+# Shared counters for every prescription pipeline in this process
+tier_stats = TierStats()
+
+@dataclass
+class PrescriptionResult:
+    extracted_text: str  # raw OCR output, as shown to the user
+    cleaned_text: str  # OCR output after clean_ocr_text, as sent to the LLM
+    instructions: str
+    instructions_source: str = "llm"  # 'local' (confident rules), 'llm', or 'rules' (fallback after an LLM failure)
+    word_confidences: List[Tuple[str, float]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+async def process_prescription(image_path):
+    import ocr_pipeline as ocr  # OpenCV and Tesseract load on first use
+
+    # Step 1: Extract text from image (a single Tesseract pass)
+    ocr_result = await asyncio.to_thread(ocr.extract_text_with_details, image_path)
     
-    # Step 2: Try to use GPT for processing
+    # Step 2: Turn the text into patient instructions
+    return await complete_prescription(ocr_result)
+
+async def complete_prescription(ocr_result):
+    """Generate instructions for an OCR result and bundle everything together"""
+    start = time.perf_counter()
+    instructions, source = await generate_instructions_with_source(ocr_result.cleaned_text)
+    timings = dict(ocr_result.timings, generate_instructions=time.perf_counter() - start)
+
+    return PrescriptionResult(
+        extracted_text=ocr_result.raw_text,
+        cleaned_text=ocr_result.cleaned_text,
+        instructions=instructions,
+        instructions_source=source,
+        word_confidences=ocr_result.word_confidences,
+        timings=timings
+    )
+
+async def generate_instructions(extracted_text):
+    return (await generate_instructions_with_source(extracted_text))[0]
+
+async def generate_instructions_with_source(extracted_text):
+    """Return (instructions, source) where source is 'local', 'llm' or 'rules'"""
+    start = time.perf_counter()
+    extracted_info = fallback.extract_medication_info(extracted_text)
+    if fallback.extraction_confidence(extracted_text, extracted_info) >= LOCAL_CONFIDENCE_THRESHOLD:
+        instructions = "\n".join(fallback.format_patient_instructions(extracted_info))
+        tier_stats.record("local", time.perf_counter() - start)
+        return instructions, "local"
+
+    # Try to use GPT for processing
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a medical assistant that converts prescription text into simple patient instructions."},
-                {"role": "user", "content": f"Convert this prescription into three simple patient instructions covering dosage, timing, and precautions: {extracted_text}"}
-            ]
-        )
-        return response.choices[0].message.content
+        content = await gateway.chat([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Convert this prescription into three simple patient instructions covering dosage, timing, and precautions: {extracted_text}"}
+        ])
+        tier_stats.record("llm", time.perf_counter() - start)
+        return content, "llm"
     except Exception as e:
-        # Fallback to rule-based extraction
+        # Fallback to rule-based extraction (straight away while the circuit is open)
         print(f"GPT processing failed: {e}. Using fallback extraction.")
-        extracted_info = fallback.extract_medication_info(extracted_text)
-        instructions = fallback.format_patient_instructions(extracted_info)
-        return "\n".join(instructions)
+        instructions = "\n".join(fallback.format_patient_instructions(extracted_info))
+        tier_stats.record("rules", time.perf_counter() - start)
+        return instructions, "rules"
+
+def rule_based_instructions(extracted_text):
+    extracted_info = fallback.extract_medication_info(extracted_text)
+    return "\n".join(fallback.format_patient_instructions(extracted_info))
+
+async def generate_instructions_batch(texts):
+    """Instructions for several prescriptions, the unsure ones from one chat completion; returns [(instructions, source)]"""
+    results = [None] * len(texts)
+    remaining = []  # indexes of texts the rules are not confident about
+    for i, text in enumerate(texts):
+        start = time.perf_counter()
+        extracted_info = fallback.extract_medication_info(text)
+        if fallback.extraction_confidence(text, extracted_info) >= LOCAL_CONFIDENCE_THRESHOLD:
+            results[i] = ("\n".join(fallback.format_patient_instructions(extracted_info)), "local")
+            tier_stats.record("local", time.perf_counter() - start)
+        else:
+            remaining.append(i)
+
+    if len(remaining) == 1:
+        results[remaining[0]] = await generate_instructions_with_source(texts[remaining[0]])
+    elif remaining:
+        for i, result in zip(remaining, await _generate_llm_batch([texts[i] for i in remaining])):
+            results[i] = result
+    return results
+
+async def _generate_llm_batch(texts):
+    start = time.perf_counter()
+    numbered = "\n\n".join(f"Prescription {i}:\n{text}" for i, text in enumerate(texts, 1))
+    try:
+        content = await gateway.chat([
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": (
+                f"Convert each of the following {len(texts)} prescriptions into three simple patient instructions "
+                "covering dosage, timing, and precautions. Start the answer for each prescription with a line "
+                "containing only '### <prescription number>'.\n\n" + numbered
+            )}
+        ])
+        sections = _split_numbered_sections(content or "")
+    except LLMUnavailable as e:
+        # Degraded API: per-item calls would fail too, so go straight to the rules
+        print(f"GPT batch processing failed: {e}. Using fallback extraction.")
+        tier_stats.record("rules", time.perf_counter() - start, count=len(texts))
+        return [(rule_based_instructions(text), "rules") for text in texts]
+    except Exception as e:
+        print(f"GPT batch processing failed: {e}. Processing prescriptions one by one.")
+        sections = {}
+
+    answered = sum(1 for i in range(1, len(texts) + 1) if sections.get(i))
+    if answered:
+        tier_stats.record("llm", time.perf_counter() - start, count=answered)
+
+    results = []
+    for i, text in enumerate(texts, 1):
+        if sections.get(i):
+            results.append((sections[i], "llm"))
+        else:
+            # Missing or unparseable section: fall back to a single-item call
+            results.append(await generate_instructions_with_source(text))
+    return results
+
+def _split_numbered_sections(content):
+    sections = {}
+    parts = re.split(r'^\s*###\s*(\d+)\s*$', content, flags=re.MULTILINE)
+    # parts = [preamble, number, body, number, body, ...]
+    for number, body in zip(parts[1::2], parts[2::2]):
+        sections[int(number)] = body.strip()
+    return sections
+
+class SymptomSummarizer:
+    """Doctor summaries of symptom transcripts, micro-batched into shared chat completions"""
+
+    def __init__(self, gateway=gateway, cache=result_cache, batch_size=SYMPTOM_BATCH_SIZE, batch_wait=SYMPTOM_BATCH_WAIT):
+        self.gateway = gateway
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self._loops = weakref.WeakKeyDictionary()  # event loop -> _SummarizerState
+        self.stats = {"cache_hits": 0, "shared": 0, "llm_requests": 0, "batched_items": 0, "fallbacks": 0}
+        self.tier_stats = TierStats(tiers=("cached", "llm", "rules"))
+
+    @staticmethod
+    def key(transcript):
+        return hashlib.sha256(" ".join(transcript.lower().split()).encode()).hexdigest()
+
+    async def summarize(self, transcript):
+        """Return (summary, source) where source is 'cached', 'llm' or 'rules'"""
+        start = time.perf_counter()
+        if not transcript.strip():
+            return rule_based_summarizer.summarize_symptoms(transcript), "rules"
+
+        key = self.key(transcript)
+        cached = await asyncio.to_thread(self.cache.get, 'symptom_summary', key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            self.tier_stats.record("cached", time.perf_counter() - start)
+            return cached['doctor_summary'], "cached"
+
+        state = self._state()
+        pending = state.inflight.get(key)
+        if pending is not None:
+            # Same transcript already on its way to the LLM: share its answer
+            self.stats["shared"] += 1
+            summary, source = await asyncio.shield(pending)
+            source = "cached" if source == "llm" else source
+            self.tier_stats.record(source, time.perf_counter() - start)
+            return summary, source
+
+        future = state.inflight[key] = asyncio.get_running_loop().create_future()
+        state.pending.append((transcript, key, future))
+        if len(state.pending) >= self.batch_size:
+            state.grown.set()
+        if state.flusher is None or state.flusher.done():
+            state.flusher = asyncio.create_task(self._flush(state))
+        summary, source = await asyncio.shield(future)
+        self.tier_stats.record(source, time.perf_counter() - start)
+        return summary, source
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _SummarizerState()
+        return state
+
+    async def _flush(self, state):
+        while state.pending:
+            # An idle LLM gets the transcript straight away; a busy one gets a batch
+            if state.active and len(state.pending) < self.batch_size:
+                state.grown.clear()
+                try:
+                    await asyncio.wait_for(state.grown.wait(), self.batch_wait)
+                except asyncio.TimeoutError:
+                    pass
+            batch, state.pending = state.pending[:self.batch_size], state.pending[self.batch_size:]
+            state.active += 1
+            task = asyncio.create_task(self._run_batch(state, batch))
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+
+    async def _run_batch(self, state, batch):
+        transcripts = [transcript for transcript, _, _ in batch]
+        try:
+            try:
+                results = await self._summarize_batch(transcripts)
+            except Exception as e:
+                print(f"Symptom summary batch failed: {e}. Using rule-based summaries.")
+                results = [(rule_based_summarizer.summarize_symptoms(text), "rules") for text in transcripts]
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            # Even when this task is cancelled, every caller waiting on the batch gets an
+            # answer and later identical transcripts no longer wait on these futures
+            state.active -= 1
+            for transcript, key, future in batch:
+                if state.inflight.get(key) is future:
+                    del state.inflight[key]
+                if not future.done():
+                    self.stats["fallbacks"] += 1
+                    future.set_result((rule_based_summarizer.summarize_symptoms(transcript), "rules"))
+
+        # Only LLM summaries are cached; fallbacks should be retried next time
+        for (_, key, _), (summary, source) in zip(batch, results):
+            if source == "llm":
+                await asyncio.to_thread(self.cache.put, 'symptom_summary', key, {'doctor_summary': summary})
+
+    async def _summarize_batch(self, transcripts):
+        """[(summary, source)] for transcripts, from one chat completion when there are several"""
+        if len(transcripts) == 1:
+            return [await self._summarize_one(transcripts[0])]
+
+        numbered = "\n\n".join(f'Patient {i} symptoms:\n"{text}"' for i, text in enumerate(transcripts, 1))
+        try:
+            self.stats["llm_requests"] += 1
+            content = await self.gateway.chat([
+                {"role": "user", "content": (
+                    f"You are a medical assistant AI. Summarize the reported symptoms of each of the following "
+                    f"{len(transcripts)} patients into a single, concise sentence for a doctor. Start the summary for "
+                    "each patient with a line containing only '### <patient number>'.\n\n" + numbered
+                )}
+            ])
+            sections = _split_numbered_sections(content or "")
+        except LLMUnavailable as e:
+            # Degraded API: per-item calls would fail too, so go straight to the rules
+            print(f"GPT symptom batch failed: {e}. Using rule-based summaries.")
+            self.stats["fallbacks"] += len(transcripts)
+            return [(rule_based_summarizer.summarize_symptoms(text), "rules") for text in transcripts]
+        except Exception as e:
+            print(f"GPT symptom batch failed: {e}. Summarizing transcripts one by one.")
+            sections = {}
+
+        self.stats["batched_items"] += sum(1 for i in range(1, len(transcripts) + 1) if sections.get(i))
+        # Missing or unparseable sections fall back to single-item calls
+        retries = [i for i in range(1, len(transcripts) + 1) if not sections.get(i)]
+        retried = await asyncio.gather(*(self._summarize_one(transcripts[i - 1]) for i in retries))
+        results = {i: (sections[i], "llm") for i in range(1, len(transcripts) + 1) if sections.get(i)}
+        results.update(zip(retries, retried))
+        return [results[i] for i in range(1, len(transcripts) + 1)]
+
+    async def _summarize_one(self, transcript):
+        try:
+            if not self.gateway.configured:
+                raise LLMUnavailable("OpenAI API key not configured")
+            self.stats["llm_requests"] += 1
+            summary = await self.gateway.chat([
+                {"role": "user", "content": SYMPTOM_PROMPT.format(transcript=transcript)}
+            ])
+            if summary and summary.strip():
+                return summary.strip(), "llm"
+            raise ValueError("empty summary")
+        except Exception as e:
+            print(f"GPT API Error: {e}. Using rule-based summary.")
+            self.stats["fallbacks"] += 1
+            return rule_based_summarizer.summarize_symptoms(transcript), "rules"
+
+class _SummarizerState:
+    """Per event loop: transcripts waiting for a batch and the batches in flight"""
+
+    def __init__(self):
+        self.pending = []  # [(transcript, key, future)]
+        self.inflight = {}  # key -> future, so identical transcripts share one summary
+        self.active = 0
+        self.grown = asyncio.Event()
+        self.flusher = None
+        self.tasks = set()
+
+# Shared summarizer, so concurrent submissions in this process batch together
+symptom_summarizer = SymptomSummarizer()
+
+@dataclass
+class SymptomResult:
+    transcribed_text: str
+    doctor_summary: str
+    transcription_ok: bool = True
+    summary_source: str = "llm"  # 'cached', 'llm', 'rules' (fallback), or 'none' (nothing to summarize)
+
+async def process_symptoms(audio_file, language="en"):
+    """Transcribe a recording, given as (filename, bytes or file object), and summarize it for the doctor"""
+    if not gateway.configured:
+        return SymptomResult(
+            transcribed_text="Transcription unavailable - OpenAI API key not configured.",
+            doctor_summary="Summary unavailable - OpenAI API key not configured.",
+            transcription_ok=False,
+            summary_source="none"
+        )
+
+    # Step 1: Speech to text (Whisper)
+    try:
+        transcribed_text = await gateway.transcribe(audio_file, language=language)
+    except Exception as e:
+        print(f"Whisper API Error: {e}")
+        return SymptomResult(
+            transcribed_text="Transcription failed.",
+            doctor_summary="Summary generation failed.",
+            transcription_ok=False,
+            summary_source="none"
+        )
 
-def process_symptoms(transcript):
-    # Similar implementation for symptom processing
-    pass
\ No newline at end of file
+    # Step 2: One sentence for the doctor
+    doctor_summary, source = await symptom_summarizer.summarize(transcribed_text)
+    return SymptomResult(transcribed_text=transcribed_text, doctor_summary=doctor_summary, summary_source=source)
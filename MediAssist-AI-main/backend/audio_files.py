@@ -0,0 +1,169 @@
+# audio_files.py
+# Serving of generated audio (and other files in the uploads directory).
+#
+# Every response carries a strong ETag derived from the SHA-256 of the file's
+# bytes, so a replay revalidates with a 304 instead of downloading the file
+# again, and Range requests let players seek without restarting the download.
+# Content-addressed files (the TTS cache's tts_<hash>.mp3) never change under
+# their name and are marked immutable for a year.
+#
+# Small files, which is nearly all generated audio, are kept in a bounded
+# in-memory LRU and answered with a single send. Larger files go through
+# FileResponse, which hands the file to the server for zero-copy sending when
+# it supports the ASGI zerocopysend extension and streams it otherwise.
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response
+
+AUDIO_MEMORY_CACHE_BYTES = int(os.getenv("AUDIO_MEMORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Files up to this size are served from memory
+AUDIO_MEMORY_FILE_LIMIT = int(os.getenv("AUDIO_MEMORY_FILE_LIMIT", str(1024 * 1024)))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Files whose ETag is remembered (larger files keep only their ETag in memory)
+MAX_ENTRIES = 100000
+
+_SINGLE_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """FileResponse that lets the server send the file itself when it advertises zerocopysend"""
+
+    async def __call__(self, scope, receive, send):
+        self._zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send, send_header_only):
+        if not self._zerocopy or send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({"type": "http.response.zerocopysend", "file": file.fileno()})
+
+    async def _handle_single_range(self, send, start, end, file_size, send_header_only):
+        if not self._zerocopy or send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({"type": "http.response.zerocopysend", "file": file.fileno(), "offset": start, "count": end - start})
+
+
+class AudioFiles:
+    def __init__(self, memory_bytes=AUDIO_MEMORY_CACHE_BYTES, memory_file_limit=AUDIO_MEMORY_FILE_LIMIT):
+        self.memory_bytes = memory_bytes
+        self.memory_file_limit = memory_file_limit
+        self._entries = OrderedDict()  # (path, device, inode, size) -> (etag, bytes or None)
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_reads": 0, "not_modified": 0}
+
+    async def serve(self, request, path, immutable=False, headers=None):
+        """Response for a GET of the file at path, honouring If-None-Match and Range"""
+        try:
+            stat_result = await asyncio.to_thread(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise HTTPException(status_code=404, detail="Audio file not found")
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=404, detail="Audio file not found")
+
+        etag, data = await self._entry(path, stat_result)
+        response_headers = dict(headers or {})
+        response_headers.update({
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "Accept-Ranges": "bytes",
+            "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        })
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=response_headers)
+
+        media_type = mimetypes.guess_type(str(path))[0] or "audio/mpeg"
+        if data is None:
+            self.stats["disk_reads"] += 1
+            return ZeroCopyFileResponse(path, media_type=media_type, headers=response_headers, stat_result=stat_result)
+
+        self.stats["memory_hits"] += 1
+        http_range = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if http_range is None or (if_range is not None and if_range != etag):
+            return Response(data, media_type=media_type, headers=response_headers)
+
+        match = _SINGLE_RANGE_RE.fullmatch(http_range.replace(" ", ""))
+        if match is None or match.groups() == ("", ""):
+            # Multiple ranges (or a malformed header): FileResponse implements the rest of RFC 9110
+            return ZeroCopyFileResponse(path, media_type=media_type, headers=response_headers, stat_result=stat_result)
+        first, last = match.groups()
+        size = len(data)
+        if first:
+            start, end = int(first), min(int(last) + 1, size) if last else size
+        else:
+            start, end = max(size - int(last), 0), size
+        if start >= size or start >= end:
+            return Response(status_code=416, headers={**response_headers, "Content-Range": f"bytes */{size}"})
+        response_headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        return Response(data[start:end], status_code=206, media_type=media_type, headers=response_headers)
+
+    async def _entry(self, path, stat_result):
+        # A rewritten file is a new inode (renderings are renamed into place), so this key changes with the content
+        key = (str(path), stat_result.st_dev, stat_result.st_ino, stat_result.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = await asyncio.to_thread(self._load, path, stat_result.st_size)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._cached_bytes += len(entry[1] or b"")
+                self._shrink()
+        return entry
+
+    def _load(self, path, size):
+        if size <= self.memory_file_limit:
+            with open(path, "rb") as f:
+                data = f.read()
+            return f'"{hashlib.sha256(data).hexdigest()}"', data
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return f'"{digest.hexdigest()}"', None
+
+    def _shrink(self):
+        # Caller holds self._lock
+        while self._entries and (self._cached_bytes > self.memory_bytes or len(self._entries) > MAX_ENTRIES):
+            _, (_, data) = self._entries.popitem(last=False)
+            self._cached_bytes -= len(data or b"")
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+# Shared file server for the application
+audio_files = AudioFiles()
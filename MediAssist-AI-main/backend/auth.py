@@ -1,13 +1,20 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+import os
 import secrets
-from database import User, UserSession, SessionLocal
+from database import User, UserSession, SessionLocal, AsyncSessionLocal
+from session_cache import cache as session_cache, UserSnapshot
 from typing import Optional
 
 security = HTTPBearer()
 
+# Rows deleted per transaction when purging sessions, so the writer is never held for long
+SESSION_PURGE_BATCH_SIZE = int(os.getenv("SESSION_PURGE_BATCH_SIZE", "1000"))
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,6 +22,11 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Async session for handlers that should not block the event loop on the database"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def create_session_token(user_id: int, db: Session) -> str:
     """Create a new session token for a user"""
     # Generate a secure random token
@@ -35,37 +47,49 @@ def create_session_token(user_id: int, db: Session) -> str:
     
     return token
 
-def get_current_user(
+async def create_session_token_async(user_id: int, db: AsyncSession) -> str:
+    """create_session_token for the async handlers"""
+    token = secrets.token_urlsafe(32)
+    db.add(UserSession(
+        user_id=user_id,
+        session_token=token,
+        expires_at=datetime.utcnow() + timedelta(hours=24)
+    ))
+    await db.commit()
+    return token
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
     """Get the current authenticated user from session token"""
     token = credentials.credentials
     
-    # Find active session
-    session = db.query(UserSession).filter(
+    cached = session_cache.get(token)
+    if cached is not None:
+        return cached
+    
+    # Find active session and its user in one query
+    result = await db.execute(select(User, UserSession.expires_at).join(
+        UserSession, UserSession.user_id == User.id
+    ).where(
         UserSession.session_token == token,
         UserSession.is_active.is_(True),
         UserSession.expires_at > datetime.utcnow()
-    ).first()
+    ).limit(1))
+    row = result.first()
     
-    if not session:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired session token",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user
-    user = db.query(User).filter(User.id == session.user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return user
+    user, expires_at = row
+    snapshot = UserSnapshot.from_user(user)
+    session_cache.put(token, snapshot, expires_at)
+    return snapshot
 
 def invalidate_session(token: str, db: Session) -> bool:
     """Invalidate a session token"""
@@ -74,6 +98,9 @@ def invalidate_session(token: str, db: Session) -> bool:
         UserSession.is_active.is_(True)
     ).first()
     
+    # Drop the cached entry even if the row was already inactive
+    session_cache.invalidate(token)
+    
     if session:
         session.is_active = False  # type: ignore[assignment]
         db.commit()
@@ -81,14 +108,19 @@ def invalidate_session(token: str, db: Session) -> bool:
     
     return False
 
-def cleanup_expired_sessions(db: Session):
-    """Clean up expired sessions"""
-    expired_sessions = db.query(UserSession).filter(
-        UserSession.expires_at < datetime.utcnow()
-    ).all()
-    
-    for session in expired_sessions:
-        session.is_active = False  # type: ignore[assignment]
-    
-    db.commit()
-    return len(expired_sessions)
\ No newline at end of file
+def cleanup_expired_sessions(db: Session, batch_size: int = SESSION_PURGE_BATCH_SIZE) -> int:
+    """Delete expired and logged-out sessions, batch_size rows per transaction; returns the number deleted"""
+    deleted = 0
+    while True:
+        batch = select(UserSession.id).where(or_(
+            UserSession.expires_at < datetime.utcnow(),
+            UserSession.is_active.is_(False)
+        )).limit(batch_size)
+        result = db.execute(
+            delete(UserSession).where(UserSession.id.in_(batch)),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
@@ -0,0 +1,229 @@
+# batch_processing.py
+# Batch prescription processing for /submit_prescriptions/batch.
+#
+# OCR for every page fans out over the job queue's process pool; finished pages
+# are grouped into batched chat completions, and each result is stored and
+# streamed back as soon as its batch is done, so a client that disconnects
+# mid-stream keeps everything finished so far (OCR not yet started for it is
+# cancelled). Multi-page scans are counted from their metadata before any page
+# is rendered, so an oversized scan is rejected without rasterising it.
+import asyncio
+import importlib.util
+import io
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from database import SessionLocal, Submission
+import ai_integration
+import job_queue
+from result_cache import cache
+
+# pdf2image and PIL are imported by expand_pages when a multi-page scan arrives
+PDF_AVAILABLE = importlib.util.find_spec("pdf2image") is not None
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "100"))
+
+# Up to this many pages share one chat completion
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "8"))
+
+# Send a partial LLM batch if no other page finished OCR within this many seconds
+LLM_BATCH_WAIT = float(os.getenv("LLM_BATCH_WAIT", "0.5"))
+
+
+@dataclass
+class BatchItem:
+    index: int
+    filename: str
+    page: int
+    source: Union[bytes, str, None] = None  # encoded image bytes or a file path, for ocr_pipeline
+    error: Optional[str] = None
+    extracted_text: Optional[str] = None
+    patient_instructions: Optional[str] = None
+    cached: bool = False
+    ocr_result: Optional[object] = None
+    content_hash: Optional[str] = None
+    submission_id: Optional[int] = None
+
+    @property
+    def status(self):
+        return "failed" if self.error else "done"
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "filename": self.filename,
+            "page": self.page,
+            "status": self.status,
+            "error": self.error,
+            "extracted_text": self.extracted_text,
+            "patient_instructions": self.patient_instructions,
+            "cached": self.cached,
+            "submission_id": self.submission_id,
+        }
+
+
+def count_pages(upload):
+    """Pages expand_pages will return for an upload, read from the document metadata without rendering"""
+    suffix = upload.suffix.lower()
+
+    if suffix == ".pdf":
+        if not PDF_AVAILABLE:
+            raise ValueError("PDF uploads require the pdf2image package")
+        from pdf2image import pdfinfo_from_bytes, pdfinfo_from_path
+        info = pdfinfo_from_bytes(upload.buffer()) if upload.in_memory else pdfinfo_from_path(str(upload.path))
+        return int(info["Pages"])
+    if suffix in (".tif", ".tiff"):
+        from PIL import Image
+        stream = io.BytesIO(upload.buffer()) if upload.in_memory else upload.path
+        with Image.open(stream) as image:
+            return getattr(image, "n_frames", 1)
+    return 1
+
+
+def expand_pages(upload):
+    """OCR sources for an upload: one PNG per page for multi-page TIFF or PDF scans, else the upload itself"""
+    suffix = upload.suffix.lower()
+
+    if suffix == ".pdf":
+        if not PDF_AVAILABLE:
+            raise ValueError("PDF uploads require the pdf2image package")
+        from pdf2image import convert_from_bytes, convert_from_path
+        if upload.in_memory:
+            pages = convert_from_bytes(upload.buffer())
+        else:
+            pages = convert_from_path(str(upload.path))
+    elif suffix in (".tif", ".tiff"):
+        from PIL import Image, ImageSequence
+        stream = io.BytesIO(upload.buffer()) if upload.in_memory else upload.path
+        with Image.open(stream) as image:
+            pages = [page.copy() for page in ImageSequence.Iterator(image)]
+    else:
+        return [upload.source()]
+
+    sources = []
+    for page in pages:
+        encoded = io.BytesIO()
+        page.convert("RGB").save(encoded, format="PNG")
+        sources.append(encoded.getvalue())
+    return sources
+
+
+async def process_batch(items, uploads, user_id):
+    """Async generator yielding one NDJSON line per item, then a summary line; closes the uploads when done"""
+    chunks = _process_items(items)
+    try:
+        async for chunk in chunks:
+            await asyncio.to_thread(_store_submissions, chunk, user_id)
+            for item in chunk:
+                yield json.dumps(item.to_dict()) + "\n"
+
+        submission_ids = [item.submission_id for item in items]
+        yield json.dumps({
+            "summary": {
+                "total": len(items),
+                "done": sum(1 for item in items if item.status == "done"),
+                "failed": sum(1 for item in items if item.status == "failed"),
+                "cached": sum(1 for item in items if item.cached),
+            },
+            "submission_ids": submission_ids,
+        }) + "\n"
+    finally:
+        # On a disconnect this stops the OCR still pending for the batch
+        await chunks.aclose()
+        for upload in uploads:
+            upload.close()
+
+
+async def _process_items(items):
+    """Yield the items in chunks, each as soon as all of its items are finished"""
+    pending = {}
+    ready = []  # failed uploads and cache hits, finished without OCR
+    for item in items:
+        if item.error:
+            ready.append(item)
+            continue
+
+        cached = await asyncio.to_thread(cache.get, "prescription", item.content_hash) if item.content_hash else None
+        if cached is not None:
+            item.extracted_text = cached["extracted_text"]
+            item.patient_instructions = cached["patient_instructions"]
+            item.cached = True
+            ready.append(item)
+            continue
+
+        future = asyncio.ensure_future(job_queue.queue.run_ocr(item.source))
+        pending[future] = item
+    try:
+        if ready:
+            yield ready
+        async for chunk in _finish_items(pending):
+            yield chunk
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def _finish_items(pending):
+    """Yield OCR failures and LLM batches as they finish; pending maps OCR futures to their items"""
+    batch = []
+    while pending or batch:
+        done = set()
+        if pending:
+            # While a batch is waiting, only wait a little for more pages to join it
+            timeout = LLM_BATCH_WAIT if batch else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+        failed = []
+        for future in done:
+            item = pending.pop(future)
+            try:
+                item.ocr_result = future.result()
+            except Exception as e:
+                print(f"OCR failed for {item.filename} page {item.page}: {e}")
+                item.error = f"OCR failed: {e}"
+                failed.append(item)
+            else:
+                batch.append(item)
+        if failed:
+            yield failed
+
+        if batch and (len(batch) >= LLM_BATCH_SIZE or not pending or not done):
+            current, batch = batch[:LLM_BATCH_SIZE], batch[LLM_BATCH_SIZE:]
+            texts = [item.ocr_result.cleaned_text for item in current]
+            outputs = await ai_integration.generate_instructions_batch(texts)
+
+            for item, (instructions, source) in zip(current, outputs):
+                item.extracted_text = item.ocr_result.raw_text
+                item.patient_instructions = instructions
+                if item.content_hash and source != "rules":
+                    await asyncio.to_thread(cache.put, "prescription", item.content_hash, {
+                        "extracted_text": item.extracted_text,
+                        "patient_instructions": instructions,
+                    })
+            yield current
+
+
+def _store_submissions(items, user_id):
+    """Insert the submissions of finished items in a single transaction and set their submission_id"""
+    rows = [
+        Submission(
+            user_id=user_id,
+            type="prescription",
+            extracted_text=item.extracted_text,
+            patient_instructions=item.patient_instructions if not item.error else job_queue.PRESCRIPTION_FAILED_TEXT,
+            status="pending" if not item.error else "failed",
+        )
+        for item in items
+    ]
+    db = SessionLocal()
+    try:
+        db.add_all(rows)
+        db.flush()
+        for item, row in zip(items, rows):
+            item.submission_id = row.id
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Request handlers on the sync database path (def handlers in the thread pool,
+a sync Session each) vs the async path (async def handlers on AsyncSession).
+
+A uvicorn server in a child process runs the real application on a scratch
+database seeded with --rows submissions. Besides the real /get_result, which
+is async, it serves the same listing through the old sync handler, and a
+small write (insert a submission) both ways. The session cache is off, so
+every request also authenticates against the database. Many concurrent
+clients then hit each path for a fixed time; reports requests/s, p50/p99 and
+failed requests (pool timeouts are cut to 5 s so a starved path still ends).
+
+    python bench_async_db.py [--seconds 5] [--concurrency 64] [--rows 20000]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+USERS = 100
+
+
+def serve(directory, port, rows):
+    os.chdir(directory)
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["SESSION_CACHE_TTL"] = "0"
+    os.environ.setdefault("DB_POOL_TIMEOUT", "5")
+
+    import uvicorn
+    from datetime import datetime
+    from fastapi import Depends, HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    import submission_listing
+    from auth import get_async_db, get_current_user, get_db, security
+    from database import Submission, User, UserSession, engine
+
+    app_module.init_worker()  # the lifespan would run it, but the rows go in before the server starts
+    with engine.begin() as conn:
+        conn.execute(Submission.__table__.insert(), [
+            {"user_id": random.randint(1, USERS), "type": "prescription", "extracted_text": "Metformin 500mg BID",
+             "status": "pending", "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+            for _ in range(rows)
+        ])
+
+    def sync_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+        row = db.query(User).join(UserSession, UserSession.user_id == User.id).filter(
+            UserSession.session_token == credentials.credentials,
+            UserSession.is_active.is_(True),
+            UserSession.expires_at > datetime.utcnow()
+        ).first()
+        if not row:
+            raise HTTPException(status_code=401)
+        return row
+
+    @app_module.app.get("/bench/sync/get_result", response_model=app_module.SubmissionsList)
+    def sync_get_result(current_user=Depends(sync_current_user), db: Session = Depends(get_db)):
+        return submission_listing.list_submissions(db, user_id=current_user.id)
+
+    @app_module.app.post("/bench/sync/submit")
+    def sync_submit(current_user=Depends(sync_current_user), db: Session = Depends(get_db)):
+        submission = Submission(user_id=current_user.id, type="audio", transcribed_text="Headache since Monday")
+        db.add(submission)
+        db.commit()
+        return {"submission_id": submission.id}
+
+    @app_module.app.post("/bench/async/submit")
+    async def async_submit(current_user=Depends(get_current_user), db=Depends(get_async_db)):
+        submission = Submission(user_id=current_user.id, type="audio", transcribed_text="Headache since Monday")
+        db.add(submission)
+        await db.commit()
+        return {"submission_id": submission.id}
+
+    uvicorn.run(app_module.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def load(method, url, headers, seconds, concurrency):
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.request(method, url, headers=headers)
+                if response.status_code != 200:
+                    failures += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies, failures
+
+
+async def run(base, seconds, concurrency):
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{base}/register", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        token = (await client.post(f"{base}/login", json={"username": "bench", "password": "bench"})).json()["session_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    scenarios = [
+        ("list page", "GET", {"sync": "/bench/sync/get_result", "async": "/get_result"}),
+        ("insert", "POST", {"sync": "/bench/sync/submit", "async": "/bench/async/submit"}),
+    ]
+    print(f"{'scenario':<12}{'path':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'failed':>10}")
+    for name, method, paths in scenarios:
+        for path, url in paths.items():
+            rate, latencies, failures = await load(method, base + url, headers, seconds, concurrency)
+            print(f"{name:<12}{path:<8}{rate:>10.0f}"
+                  f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}{failures:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        server = multiprocessing.Process(target=serve, args=(directory, port, args.rows), daemon=True)
+        server.start()
+        try:
+            base = f"http://127.0.0.1:{port}"
+            for _ in range(300):
+                try:
+                    httpx.get(base)
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            print(f"{args.concurrency} concurrent clients, {args.rows} rows, {args.seconds:.0f} s per run")
+            asyncio.run(run(base, args.seconds, args.concurrency))
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Concurrent downloads of generated audio: the old /uploads handler (plain
+FileResponse, every request a full download) vs audio_files.
+
+A uvicorn server in a child process serves a 200 KB MP3 both ways. The client
+replays it from many concurrent connections: first downloads, replays that
+revalidate with If-None-Match (as a browser does with a cached copy), and
+seeks that ask for the second half with a Range header.
+
+    python bench_audio.py [--seconds 3] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from tts_generator import SILENT_MP3_FRAME
+
+FILENAME = "tts_bench.mp3"
+FILE_SIZE = len(SILENT_MP3_FRAME) * 490  # ~200 KB, about 13 s of audio
+
+
+def serve(directory, port):
+    import uvicorn
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import FileResponse
+
+    from audio_files import audio_files
+
+    app = FastAPI()
+
+    @app.get("/legacy/{filename}")
+    async def legacy(filename: str):
+        file_path = Path(directory) / filename
+        if not file_path.exists():
+            raise HTTPException(status_code=404, detail="Audio file not found")
+        return FileResponse(file_path, media_type="audio/mpeg")
+
+    @app.get("/current/{filename}")
+    async def current(filename: str, request: Request):
+        return await audio_files.serve(request, Path(directory) / filename, immutable=True)
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def load(url, headers, seconds, concurrency):
+    counts = {"requests": 0, "bytes": 0}
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                response = await client.get(url, headers=headers)
+                assert response.status_code in (200, 206, 304), response.status_code
+                counts["requests"] += 1
+                counts["bytes"] += len(response.content)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return counts["requests"] / elapsed, counts["bytes"] / elapsed / (1024 * 1024)
+
+
+async def run(base, seconds, concurrency):
+    async with httpx.AsyncClient() as client:
+        etags = {mode: (await client.get(f"{base}/{mode}/{FILENAME}")).headers["etag"] for mode in ("legacy", "current")}
+
+    scenarios = [
+        ("first download", lambda mode: {}),
+        ("replay", lambda mode: {"If-None-Match": etags[mode]}),
+        ("seek", lambda mode: {"Range": f"bytes={FILE_SIZE // 2}-"}),
+    ]
+    print(f"{'scenario':<16}{'mode':<10}{'req/s':>10}{'MB/s':>10}")
+    for name, headers in scenarios:
+        for mode in ("legacy", "current"):
+            rate, throughput = await load(f"{base}/{mode}/{FILENAME}", headers(mode), seconds, concurrency)
+            print(f"{name:<16}{mode:<10}{rate:>10.0f}{throughput:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        (Path(directory) / FILENAME).write_bytes(SILENT_MP3_FRAME * 490)
+        port = free_port()
+        server = multiprocessing.Process(target=serve, args=(directory, port), daemon=True)
+        server.start()
+        try:
+            base = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base}/current/{FILENAME}")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            print(f"{FILE_SIZE / 1024:.0f} KB file, {args.concurrency} concurrent clients, {args.seconds:.0f} s per run")
+            asyncio.run(run(base, args.seconds, args.concurrency))
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Authenticated request latency with and without the session cache.
+
+Boots the app in-process against a throwaway SQLite database seeded with many
+sessions, then times GET /me (which does nothing but authenticate) and reports
+p50/p99 latency for both modes.
+
+    python bench_auth.py [--requests 2000] [--sessions 20000]
+"""
+
+import argparse
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(client, headers, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get("/me", headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=20000)
+    args = parser.parse_args()
+
+    # The database lives at ./mediassist.db, so run from a scratch directory
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    from fastapi.testclient import TestClient
+    import main as app_module
+    from database import SessionLocal, UserSession
+    from session_cache import cache
+
+    with TestClient(app_module.app) as client:
+        client.post("/register", json={"username": "bench", "email": "bench@example.com", "password": "bench"})
+        token = client.post("/login", json={"username": "bench", "password": "bench"}).json()["session_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        db = SessionLocal()
+        expires_at = datetime.utcnow() + timedelta(hours=24)
+        db.bulk_save_objects([
+            UserSession(user_id=1, session_token=secrets.token_urlsafe(32), expires_at=expires_at)
+            for _ in range(args.sessions)
+        ])
+        db.commit()
+        db.close()
+
+        results = {}
+        for mode, ttl in (("no cache", 0), ("cache", 60)):
+            cache.ttl = ttl
+            cache.clear()
+            run(client, headers, 100)  # warm up
+            results[mode] = run(client, headers, args.requests)
+
+    print(f"GET /me x {args.requests}, {args.sessions} extra sessions, hit rate {cache.hit_rate:.1%}")
+    print(f"{'mode':<10}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for mode, samples in results.items():
+        print(f"{mode:<10}{percentile(samples, 50):>10.3f}{percentile(samples, 99):>10.3f}{statistics.mean(samples):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write load on the SQLite database: the old engine (rollback
+journal, one shared pool, deferred transactions) vs db_config (WAL, pragmas,
+read pool plus a single BEGIN IMMEDIATE writer).
+
+Writer threads insert submissions and update their status, reader threads
+page through the newest submissions, all at once for a fixed time, against
+a fresh database seeded with --rows submissions. Reports operations/s,
+p99 latency and how many operations failed with 'database is locked'.
+
+    python bench_db.py [--seconds 5] [--writers 4] [--readers 8] [--rows 20000] [--processes 1]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import db_config
+from database import Base, Submission, User
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def legacy_sessions(url):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def current_sessions(url):
+    engine, read_engine = db_config.create_engines(url)
+    return engine, sessionmaker(class_=db_config.RoutingSession, autocommit=False, autoflush=False,
+                                bind=engine, read_bind=read_engine)
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x", "user_type": "patient"}
+            for i in range(100)
+        ])
+        conn.execute(Submission.__table__.insert(), [
+            {"user_id": random.randint(1, 100), "type": "prescription", "extracted_text": "Metformin 500mg BID",
+             "status": "pending", "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()}
+            for _ in range(rows)
+        ])
+
+
+def run_workers(mode, url, args, start_at, deadline):
+    """Run the reader and writer threads of one process from start_at until deadline; returns (latencies, lock errors)"""
+    engine, Session = MODES[mode](url)
+    time.sleep(max(0.0, start_at - time.time()))
+    results = {"write": [], "read": []}
+    errors = {"write": 0, "read": 0}
+    lock = threading.Lock()
+
+    def write_once(db, rng):
+        db.add(Submission(user_id=rng.randint(1, 100), type="prescription", extracted_text="Lipitor 20mg daily", status="queued"))
+        db.commit()
+        # Read, then write in the same transaction, as approving a submission does
+        submission = db.query(Submission).filter(Submission.id == rng.randint(1, args.rows)).first()
+        submission.status = "approved"
+        db.commit()
+
+    def read_once(db, rng):
+        db.query(Submission).filter(Submission.user_id == rng.randint(1, 100)).order_by(
+            Submission.created_at.desc(), Submission.id.desc()).limit(50).all()
+        db.commit()
+
+    def worker(kind, operation, seed_value):
+        rng = random.Random(seed_value)
+        samples = []
+        failed = 0
+        while time.time() < deadline:
+            db = Session()
+            start = time.perf_counter()
+            try:
+                operation(db, rng)
+                samples.append(time.perf_counter() - start)
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                failed += 1
+                db.rollback()
+            finally:
+                db.close()
+        with lock:
+            results[kind].extend(samples)
+            errors[kind] += failed
+
+    seed_base = os.getpid() * 1000
+    threads = [threading.Thread(target=worker, args=("write", write_once, seed_base + i)) for i in range(args.writers)]
+    threads += [threading.Thread(target=worker, args=("read", read_once, seed_base + 500 + i)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return results, errors
+
+
+def run(mode, args):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed(create_engine(url), args.rows)
+        start_at = time.time() + (1 if args.processes > 1 else 0)  # give the processes time to start
+        deadline = start_at + args.seconds
+        if args.processes == 1:
+            return run_workers(mode, url, args, start_at, deadline)
+
+        # Separate processes, as with several server workers: each has its own pools
+        with multiprocessing.Pool(args.processes) as pool:
+            outcomes = pool.starmap(run_workers, [(mode, url, args, start_at, deadline)] * args.processes)
+        results = {"write": [], "read": []}
+        errors = {"write": 0, "read": 0}
+        for process_results, process_errors in outcomes:
+            for kind in results:
+                results[kind].extend(process_results[kind])
+                errors[kind] += process_errors[kind]
+        return results, errors
+
+
+MODES = {"legacy": legacy_sessions, "current": current_sessions}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=1, help="run the writers and readers in each of this many processes")
+    args = parser.parse_args()
+
+    print(f"{args.processes} x ({args.writers} writers, {args.readers} readers), {args.rows} rows, {args.seconds:.0f} s per mode")
+    print(f"{'mode':<10}{'writes/s':>10}{'w p99 ms':>10}{'w locked':>10}{'reads/s':>10}{'r p99 ms':>10}{'r locked':>10}")
+    for mode in MODES:
+        results, errors = run(mode, args)
+        print(f"{mode:<10}"
+              f"{len(results['write']) / args.seconds:>10.0f}{percentile(results['write'], 99) * 1000:>10.1f}{errors['write']:>10}"
+              f"{len(results['read']) / args.seconds:>10.0f}{percentile(results['read'], 99) * 1000:>10.1f}{errors['read']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Fallback extractor throughput: the old regex-per-field extractor vs the current
+single-pass engine.
+
+Reports extractions/sec on typical one-line prescriptions and a full OCR page,
+the time taken on OCR-like text with no separators (where the old "detailed"
+pattern backtracks quadratically) as it grows, and how fast the medication
+lexicon loads and answers lookups.
+
+    python bench_extractor.py [--seconds 1.0]
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+
+import medication_lexicon
+import rule_based_extractor
+
+PRESCRIPTIONS = [
+    "Amoxicillin 500mg: Take 1 tablet three times daily for 7 days",
+    "Lipitor 20mg - 1 tablet daily at bedtime",
+    "Rx: Metformin 500mg BID with meals",
+    "Paracetamol 650 mg tablet every 6 hours x 3 days",
+    "Omeprazole 20mg once daily before breakfast for 4 weeks",
+]
+
+PAGE = (
+    "CITY CLINIC Dr. A. Rao MBBS Reg No 44821\n"
+    "Patient: J. Doe Age 54 Date 12-03-2024\n"
+    + "\n".join(PRESCRIPTIONS)
+    + "\nReview after 2 weeks. Avoid alcohol.\n"
+)
+
+
+def legacy_extract(text):
+    """The extractor as it was before the single-pass engine"""
+    patterns = {
+        'medication_name': r'([A-Z][a-z]+)(?:\s+\d+[mgMG]+)?',
+        'dosage': r'(\d+\s*[mgMG]+\s*(?:tablet|cap|mg|mL|gram|g))',
+        'frequency': r'(\d+\s*times?\s*(?:a|\/)\s*day|daily|every\s*\d+\s*hours?|BID|TID|QID)',
+        'duration': r'(?:for|x)\s*(\d+\s*(?:days|weeks|months))'
+    }
+    extracted_info = {}
+    for key, pattern in patterns.items():
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            extracted_info[key] = matches[0] if len(matches) == 1 else matches
+    detailed_pattern = r'([A-Za-z\s]+)\s*(\d+\s*[mgMG]+)?\s*[:\\-]\s*([^\.]+)'
+    detailed_matches = re.findall(detailed_pattern, text)
+    if detailed_matches:
+        extracted_info['detailed'] = [
+            {'medication': m.strip(), 'strength': s.strip() if s else 'N/A', 'instructions': i.strip()}
+            for m, s, i in detailed_matches
+        ]
+    return extracted_info
+
+
+def ocr_noise(size, seed=0):
+    """Letters and blanks with no separators or full stops, as OCR makes of smudged text"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + "  \t"
+    return "".join(rng.choice(alphabet) for _ in range(size))
+
+
+def lookup_words(count, seed=0):
+    """Exact names, OCR misspellings of them and unrelated words, mixed"""
+    rng = random.Random(seed)
+    names = [m.name for m in medication_lexicon.lexicon.medications if " " not in m.name]
+    words = []
+    for i in range(count):
+        name = rng.choice(names)
+        if i % 3 == 1 and len(name) > 5:
+            cut = rng.randrange(1, len(name) - 1)
+            name = name[:cut] + name[cut + 1:]  # dropped letter
+        elif i % 3 == 2:
+            name = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+        words.append(name)
+    return words
+
+
+def rate(fn, texts, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(texts)
+        count += len(texts)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    legacy_batch = lambda texts: [legacy_extract(t) for t in texts]
+    current_single = lambda texts: [rule_based_extractor.extract_medication_info(t) for t in texts]
+
+    print(f"{'input':<22}{'legacy/s':>12}{'current/s':>12}")
+    for name, texts in (("one-line", PRESCRIPTIONS), ("OCR page", [PAGE])):
+        old = rate(legacy_batch, texts, args.seconds)
+        new = rate(current_single, texts, args.seconds)
+        print(f"{name:<22}{old:>12.0f}{new:>12.0f}")
+
+    print()
+    print(f"{'noise bytes':<22}{'legacy ms':>12}{'current ms':>12}")
+    for size in (1000, 2000, 4000, 8000, 64000):
+        text = ocr_noise(size)
+        start = time.perf_counter()
+        rule_based_extractor.extract_medication_info(text)
+        new = (time.perf_counter() - start) * 1000
+        if size <= 8000:
+            start = time.perf_counter()
+            legacy_extract(text)
+            old = f"{(time.perf_counter() - start) * 1000:.1f}"
+        else:
+            old = "(skipped)"
+        print(f"{size:<22}{old:>12}{new:>12.1f}")
+
+    print()
+    path = medication_lexicon.LEXICON_PATH
+    path.with_suffix(medication_lexicon.INDEX_SUFFIX).unlink(missing_ok=True)
+    for label in ("lexicon cold load", "lexicon warm load"):
+        start = time.perf_counter()
+        lexicon = medication_lexicon.MedicationLexicon.load(path)
+        print(f"{label:<22}{(time.perf_counter() - start) * 1000:>11.1f} ms ({len(lexicon)} names)")
+    words = lookup_words(20000)
+    start = time.perf_counter()
+    for word in words:
+        lexicon.lookup(word)  # fresh lexicon: nothing memoised yet
+    print(f"{'lexicon lookups/s':<22}{len(words) / (time.perf_counter() - start):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Submission listing latency on a large table.
+
+Boots the app in-process against a throwaway SQLite database seeded with
+--rows submissions spread over --users patients, then times the listing
+endpoints. "legacy" is the old handler (every matching row through Pydantic);
+the rest are keyset pages of the current /get_result and /get_all_results.
+The legacy doctor listing (every row in the table) only runs with --legacy-all;
+at a million rows it needs more memory than most machines have.
+
+    python bench_listing.py [--rows 1000000] [--users 1000] [--repeat 20] [--legacy-all]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEXT = "Take one tablet by mouth twice daily after meals. " * 8
+
+
+def seed(engine, rows, users):
+    from sqlalchemy import text
+
+    start = datetime(2024, 1, 1)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        for offset in range(0, rows, 50000):
+            conn.execute(
+                text("INSERT INTO submissions (user_id, type, extracted_text, patient_instructions, status, created_at, updated_at) "
+                     "VALUES (:user_id, :type, :text, :text, :status, :created_at, :created_at)"),
+                [
+                    {
+                        "user_id": rng.randint(2, users + 1),
+                        "type": "prescription" if i % 3 else "audio",
+                        "text": TEXT,
+                        "status": "approved" if i % 4 else "pending",
+                        "created_at": start + timedelta(seconds=30 * i),
+                    }
+                    for i in range(offset, min(rows, offset + 50000))
+                ],
+            )
+
+
+def timed(client, headers, path, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers, params=params)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return statistics.median(samples), len(response.json()["submissions"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--legacy-all", action="store_true", help="also time the old /get_all_results")
+    args = parser.parse_args()
+
+    # The database lives at ./mediassist.db, so run from a scratch directory
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    from fastapi import Depends
+    from fastapi.testclient import TestClient
+
+    import main as app_module
+    from auth import get_current_user, get_db
+    from database import Submission, engine
+
+    @app_module.app.get("/bench/legacy_get_result", response_model=app_module.SubmissionsList)
+    def legacy_get_result(user_id: int, current_user=Depends(get_current_user), db=Depends(get_db)):
+        return {"submissions": db.query(Submission).filter(Submission.user_id == user_id).all()}
+
+    @app_module.app.get("/bench/legacy_get_all_results", response_model=app_module.SubmissionsList)
+    def legacy_get_all_results(current_user=Depends(get_current_user), db=Depends(get_db)):
+        return {"submissions": db.query(Submission).all()}
+
+    with TestClient(app_module.app) as client:
+        client.post("/register", json={"username": "doctor", "email": "doctor@example.com", "password": "bench", "user_type": "doctor"})
+        token = client.post("/login", json={"username": "doctor", "password": "bench"}).json()["session_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        start = time.perf_counter()
+        seed(engine, args.rows, args.users)
+        print(f"Seeded {args.rows} submissions for {args.users} patients in {time.perf_counter() - start:.1f}s")
+
+        # A cursor roughly halfway down the table
+        page = client.get("/get_all_results", headers=headers, params={"fields": "summary", "limit": 500}).json()
+        for _ in range(args.rows // 1000):
+            page = client.get("/get_all_results", headers=headers,
+                              params={"fields": "summary", "limit": 500, "cursor": page["next_cursor"]}).json()
+        deep_cursor = page["next_cursor"]
+
+        cases = [
+            ("legacy, one patient", "/bench/legacy_get_result", {"user_id": 2}, args.repeat),
+            ("first page", "/get_all_results", {}, args.repeat),
+            ("first page, summary", "/get_all_results", {"fields": "summary"}, args.repeat),
+            ("middle page", "/get_all_results", {"cursor": deep_cursor}, args.repeat),
+            ("middle page, summary", "/get_all_results", {"cursor": deep_cursor, "fields": "summary"}, args.repeat),
+            ("one patient", "/get_all_results", {"user_id": 2}, args.repeat),
+            ("status=pending, type=audio", "/get_all_results", {"status": "pending", "type": "audio", "fields": "summary"}, args.repeat),
+            ("date range", "/get_all_results", {"created_after": "2024-01-10T00:00:00", "created_before": "2024-01-11T00:00:00"}, args.repeat),
+        ]
+        if args.legacy_all:
+            cases.insert(1, ("legacy, all rows", "/bench/legacy_get_all_results", {}, 1))
+
+        print(f"{'case':<30}{'rows':>10}{'median ms':>12}")
+        for name, path, params, repeat in cases:
+            elapsed, count = timed(client, headers, path, params, repeat)
+            print(f"{name:<30}{count:>10}{elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the whole application, with local stand-ins for the
+external services.
+
+The FastAPI app runs in this process, lifespan and job queue included, on a
+scratch database, and is driven through ASGI (no sockets). OpenAI chat and
+Whisper answer from an in-process fake transport, gTTS is the fake TTS
+backend, and Tesseract returns canned words when the binary is missing (or
+with --fake-ocr). Each stand-in waits --llm-latency, --tts-latency or
+--ocr-latency seconds. Uploads are synthetic prescription images and WAV
+recordings, a quarter of them repeats.
+
+Virtual users log in, then loop through a weighted mix. Patients poll
+/get_result and /jobs, upload prescriptions and voice notes, and request
+audio instructions. Doctors (one user in five) page through
+/get_all_results and approve one at a time or in bulk. Each --concurrency
+level runs for --seconds. The report covers, per level and per endpoint:
+requests/s, p50/p95/p99 and CPU time per request. CPU counts this process,
+load generator included, plus the OCR worker processes. It is written as
+JSON to --output, so runs from two commits can be compared:
+
+    python bench_load.py [--concurrency 1,4,16,64] [--seconds 10] [--output bench_load.json]
+    python bench_load.py --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from collections import defaultdict
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PASSWORD = "bench-password"
+DOCTOR_EVERY = 5  # one virtual user in five is a doctor
+REPEAT_UPLOADS = 0.25  # share of uploads that are byte-identical to an earlier one
+
+PATIENT_MIX = [
+    ("get_result", 50),
+    ("job_status", 20),
+    ("submit_prescription", 10),
+    ("submit_audio", 8),
+    ("generate_audio", 7),
+    ("me", 5),
+]
+DOCTOR_MIX = [
+    ("get_all_results", 60),
+    ("approve", 25),
+    ("approve_bulk", 15),
+]
+
+INSTRUCTION_TEXTS = [
+    "Take Amoxicillin 500mg three times daily for 7 days. Finish the course.",
+    "Take Metformin 500mg twice daily with meals.",
+    "Take Lipitor 20mg once daily at bedtime.",
+    "Take Paracetamol 650mg every 6 hours if you have a fever.",
+]
+
+OCR_LINES = [
+    "Dr. A. Sharma: General Physician",
+    "Rx: Amoxicillin 500mg: 1 tablet three times daily for 7 days",
+    "Metformin 500mg BID with meals",
+]
+
+
+class FakeOpenAITransport(httpx.AsyncBaseTransport):
+    """Answers chat completions and transcriptions locally after `latency` seconds"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if request.url.path.endswith("/audio/transcriptions"):
+            return httpx.Response(200, json={"text": "I have had a headache and a mild fever for three days"})
+        return httpx.Response(200, json={
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                "role": "assistant",
+                "content": "Take one 500mg tablet three times daily after meals for 7 days.",
+            }}],
+        })
+
+
+def fake_image_to_data(latency):
+    """Stand-in for pytesseract.image_to_data returning OCR_LINES as recognised words"""
+    def image_to_data(image, config="", output_type=None, **kwargs):
+        time.sleep(latency)
+        data = {"text": [], "conf": [], "block_num": [], "par_num": [], "line_num": []}
+        for line_number, line in enumerate(OCR_LINES, 1):
+            for word in line.split():
+                data["text"].append(word)
+                data["conf"].append(91)
+                data["block_num"].append(1)
+                data["par_num"].append(1)
+                data["line_num"].append(line_number)
+        return data
+    return image_to_data
+
+
+def make_images(count):
+    import cv2
+    from bench_ocr import make_prescription_image
+    return [cv2.imencode(".png", make_prescription_image(seed=seed, width=1200))[1].tobytes() for seed in range(count)]
+
+
+def make_recording(seconds=1.0, rate=16000):
+    """A short 16-bit mono WAV of a quiet tone"""
+    frames = bytearray()
+    for i in range(int(seconds * rate)):
+        frames += int(2000 * ((i // 20) % 2 * 2 - 1)).to_bytes(2, "little", signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as recording:
+        recording.setnchannels(1)
+        recording.setsampwidth(2)
+        recording.setframerate(rate)
+        recording.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def worker_cpu_seconds(pids):
+    """User + system CPU of the given child processes, from /proc (0 where unavailable)"""
+    ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])  # utime, stime
+        except (OSError, IndexError, ValueError):
+            pass
+    return total / ticks
+
+
+class VirtualUser:
+    def __init__(self, client, username, doctor, uploads, rng):
+        self.client = client
+        self.username = username
+        self.doctor = doctor
+        self.uploads = uploads
+        self.rng = rng
+        self.headers = {}
+        self.submission_ids = []
+
+    async def login(self, record):
+        response = await record("login", self.client.post("/login", json={"username": self.username, "password": PASSWORD}))
+        self.headers = {"Authorization": f"Bearer {response.json()['session_token']}"}
+
+    async def step(self, record):
+        mix = DOCTOR_MIX if self.doctor else PATIENT_MIX
+        action = self.rng.choices([name for name, _ in mix], weights=[weight for _, weight in mix])[0]
+        await getattr(self, action)(record)
+
+    async def get_result(self, record):
+        await record("get_result", self.client.get("/get_result", headers=self.headers))
+
+    async def job_status(self, record):
+        if not self.submission_ids:
+            return await self.get_result(record)
+        submission_id = self.rng.choice(self.submission_ids[-5:])
+        await record("job_status", self.client.get(f"/jobs/{submission_id}", headers=self.headers))
+
+    async def submit_prescription(self, record):
+        files = {"file": ("prescription.png", self.uploads.image(), "image/png")}
+        response = await record("submit_prescription", self.client.post("/submit_prescription", headers=self.headers, files=files))
+        if "submission_id" in response.json():
+            self.submission_ids.append(response.json()["submission_id"])
+
+    async def submit_audio(self, record):
+        files = {"file": ("symptoms.wav", self.uploads.recording(), "audio/wav")}
+        await record("submit_audio", self.client.post("/submit_audio", headers=self.headers, files=files))
+
+    async def generate_audio(self, record):
+        body = {"text": self.rng.choice(INSTRUCTION_TEXTS), "language": "en"}
+        await record("generate_audio", self.client.post("/generate_audio", json=body))
+
+    async def me(self, record):
+        await record("me", self.client.get("/me", headers=self.headers))
+
+    async def get_all_results(self, record):
+        response = await record("get_all_results", self.client.get("/get_all_results", headers=self.headers,
+                                                                     params={"status": "pending", "fields": "summary"}))
+        self.submission_ids = [item["id"] for item in response.json().get("submissions", [])]
+
+    async def approve(self, record):
+        if not self.submission_ids:
+            return await self.get_all_results(record)
+        submission_id = self.submission_ids.pop()
+        await record("approve", self.client.put(f"/approve/{submission_id}", headers=self.headers))
+
+    async def approve_bulk(self, record):
+        if not self.submission_ids:
+            return await self.get_all_results(record)
+        ids, self.submission_ids = self.submission_ids, []
+        await record("approve_bulk", self.client.post("/approve/bulk", headers=self.headers, json={"submission_ids": ids}))
+
+
+class Uploads:
+    """Synthetic upload bodies; most are made unique so they miss the result cache"""
+
+    def __init__(self, images, recording, rng):
+        self.images = images
+        self._recording = recording
+        self.rng = rng
+
+    def _maybe_unique(self, data):
+        if self.rng.random() < REPEAT_UPLOADS:
+            return data
+        return data + self.rng.randbytes(16)  # decoders stop at the end marker and ignore trailing bytes
+
+    def image(self):
+        return self._maybe_unique(self.rng.choice(self.images))
+
+    def recording(self):
+        return self._maybe_unique(self._recording)
+
+
+async def run_level(client, users, seconds, ocr_pids):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async def record(name, request):
+        start = time.perf_counter()
+        response = await request
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            errors[name] += 1
+        else:
+            latencies[name].append(elapsed)
+        return response
+
+    login_start = time.perf_counter()
+    await asyncio.gather(*(user.login(record) for user in users))
+    login_elapsed = time.perf_counter() - login_start
+
+    cpu_start = time.process_time() + worker_cpu_seconds(ocr_pids())
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    async def loop(user):
+        while time.perf_counter() < deadline:
+            await user.step(record)
+
+    await asyncio.gather(*(loop(user) for user in users))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() + worker_cpu_seconds(ocr_pids()) - cpu_start
+
+    everything = [sample for name, samples in latencies.items() if name != "login" for sample in samples]
+    failed = sum(count for name, count in errors.items() if name != "login")
+
+    def summary(samples, failures, window):
+        return {
+            "requests": len(samples),
+            "errors": failures,
+            "rps": round(len(samples) / window, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+
+    level = summary(everything, failed, elapsed)
+    level["concurrency"] = len(users)
+    level["cpu_ms_per_request"] = round(cpu * 1000 / max(1, len(everything) + failed), 3)
+    level["endpoints"] = {name: summary(latencies[name], errors[name], login_elapsed if name == "login" else elapsed)
+                          for name in sorted(set(latencies) | set(errors))}
+    return level
+
+
+async def run(args, concurrency_levels):
+    import llm_gateway
+    import main as app_module
+    import tts_cache
+    from job_queue import queue
+    from tts_generator import FakeTTSBackend
+
+    llm_gateway.gateway.transport = FakeOpenAITransport(args.llm_latency)
+    tts_cache.cache.backend = FakeTTSBackend(delay=args.tts_latency)
+
+    rng = random.Random(args.seed)
+    uploads = Uploads(make_images(8), make_recording(), rng)
+
+    def ocr_pids():
+        pool = queue._pool
+        return list(getattr(pool, "_processes", None) or {})
+
+    levels = []
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with app_module.lifespan(app_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            users = []
+            for concurrency in concurrency_levels:
+                while len(users) < concurrency:
+                    number = len(users)
+                    doctor = number % DOCTOR_EVERY == DOCTOR_EVERY - 1
+                    username = f"{'doctor' if doctor else 'patient'}{number}"
+                    await client.post("/register", json={
+                        "username": username, "email": f"{username}@example.com", "password": PASSWORD,
+                        "user_type": "doctor" if doctor else "patient",
+                    })
+                    users.append(VirtualUser(client, username, doctor, uploads, random.Random(args.seed + number)))
+                level = await run_level(client, users[:concurrency], args.seconds, ocr_pids)
+                levels.append(level)
+                print(f"{concurrency:>6}{level['rps']:>10.1f}{level['p50_ms']:>10.1f}{level['p95_ms']:>10.1f}"
+                      f"{level['p99_ms']:>10.1f}{level['cpu_ms_per_request']:>10.2f}{level['errors']:>8}")
+    return levels
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {level["concurrency"]: level for level in json.load(f)["levels"]}
+    with open(after_path) as f:
+        after_report = json.load(f)
+    print(f"{'users':>6}  {'endpoint':<22}{'rps':>18}{'p99 ms':>20}")
+    for level in after_report["levels"]:
+        old = before.get(level["concurrency"])
+        if old is None:
+            continue
+        rows = [("all", old, level)] + [(name, old["endpoints"].get(name), stats)
+                                        for name, stats in level["endpoints"].items()]
+        for name, was, now in rows:
+            if not was:
+                continue
+            rps_change = (now["rps"] - was["rps"]) / was["rps"] if was["rps"] else 0.0
+            print(f"{level['concurrency']:>6}  {name:<22}{was['rps']:>8.1f} -> {now['rps']:<7.1f}{rps_change:>+6.0%}"
+                  f"{was['p99_ms']:>8.1f} -> {now['p99_ms']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated numbers of virtual users")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--ocr-latency", type=float, default=0.5)
+    parser.add_argument("--fake-ocr", action="store_true", help="fake Tesseract even when it is installed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_load.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    output = os.path.abspath(args.output)
+    concurrency_levels = [int(value) for value in args.concurrency.split(",")]
+    fake_ocr = args.fake_ocr or shutil.which("tesseract") is None
+
+    # The database and uploads live in the working directory, so run from a scratch one
+    scratch = tempfile.TemporaryDirectory(prefix="bench_load_")
+    os.chdir(scratch.name)
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["OPENAI_API_KEY"] = "sk-bench"  # never the real API: the gateway's transport is replaced
+    os.environ.pop("OPENAI_BASE_URL", None)
+    os.environ["TTS_BACKEND"] = "fake"
+    if fake_ocr:
+        # Patched before the OCR process pool forks, so the workers inherit it
+        import pytesseract
+        pytesseract.image_to_data = fake_image_to_data(args.ocr_latency)
+
+    print(f"{', '.join(map(str, concurrency_levels))} virtual users, {args.seconds:.0f} s per level, "
+          f"stand-in latency: LLM {args.llm_latency} s, TTS {args.tts_latency} s, "
+          f"OCR {'fake ' + str(args.ocr_latency) + ' s' if fake_ocr else 'real Tesseract'}")
+    print(f"{'users':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'cpu ms':>10}{'errors':>8}")
+    try:
+        levels = asyncio.run(run(args, concurrency_levels))
+    finally:
+        os.chdir(BACKEND_DIR)
+        scratch.cleanup()
+
+    report = {
+        "benchmark": "bench_load",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "seconds": args.seconds, "llm_latency": args.llm_latency, "tts_latency": args.tts_latency,
+            "ocr_latency": args.ocr_latency if fake_ocr else None, "fake_ocr": fake_ocr, "seed": args.seed,
+        },
+        "levels": levels,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
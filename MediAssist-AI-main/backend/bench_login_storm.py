@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Login storm: logins/sec and latency of an unrelated endpoint while it lasts.
+
+Boots the app in-process against a throwaway SQLite database, then fires
+--logins concurrent POST /login requests while a probe keeps timing GET /
+(which touches neither the database nor password hashing). "legacy" is the old
+login handler, hashing inline in a sync endpoint; "current" is /login, which
+verifies in the bounded password hashing pool.
+
+    python bench_login_storm.py [--logins 200] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def storm(client, path, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    probe_samples = []
+
+    async def login(i):
+        async with semaphore:
+            response = await client.post(path, json={"username": f"user{i % 20}", "password": "secret"})
+            assert response.status_code == 200, response.text
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/")
+            probe_samples.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.01)
+
+    prober = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await prober
+    return logins / elapsed, probe_samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    # The database lives at ./mediassist.db, so run from a scratch directory
+    os.chdir(tempfile.mkdtemp())
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    import httpx
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    import password_hashing
+    from auth import create_session_token, get_db
+    from database import User, create_db_and_tables
+
+    @app_module.app.post("/bench/legacy_login")
+    def legacy_login(login_data: app_module.UserLogin, db: Session = Depends(get_db)):
+        user = db.query(User).filter(User.username == login_data.username).first()
+        if not user or not user.check_password(login_data.password):
+            raise HTTPException(status_code=401)
+        return {"session_token": create_session_token(user.id, db)}
+
+    create_db_and_tables()
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for i in range(20):
+            await client.post("/register", json={"username": f"user{i}", "email": f"user{i}@example.com", "password": "secret"})
+
+        # Baseline probe latency with no storm
+        idle = []
+        for _ in range(50):
+            start = time.perf_counter()
+            await client.get("/")
+            idle.append((time.perf_counter() - start) * 1000)
+
+        results = {}
+        for mode, path in (("legacy", "/bench/legacy_login"), ("current", "/login")):
+            results[mode] = await storm(client, path, args.logins, args.concurrency)
+
+    print(f"{args.logins} logins, concurrency {args.concurrency}, "
+          f"{password_hashing.PASSWORD_HASH_WORKERS} hash workers, {password_hashing.PASSWORD_HASH_ITERATIONS} iterations")
+    print(f"idle GET / p50 {percentile(idle, 50):.2f} ms")
+    print(f"{'mode':<10}{'logins/s':>10}{'GET / p50':>12}{'p99':>10}{'max':>10}{'probes':>8}")
+    for mode, (rate, samples) in results.items():
+        print(f"{mode:<10}{rate:>10.1f}{percentile(samples, 50):>12.2f}{percentile(samples, 99):>10.2f}"
+              f"{max(samples):>10.2f}{len(samples):>8}")
+    print("mean GET / during storm: " + ", ".join(f"{m} {statistics.mean(s):.2f} ms" for m, (_, s) in results.items()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Overhead of the metrics instrumentation: a trivial FastAPI route driven
+straight through ASGI (no sockets) with and without MetricsMiddleware, a
+pipeline span enabled vs disabled, and a SQLite query (a 50-row page, the size
+of a listing) with and without the statement timing events. Reports
+microseconds per operation.
+
+    python bench_metrics.py [--requests 20000] [--spans 200000] [--queries 20000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+
+from metrics import MetricsMiddleware, MetricsRegistry
+
+SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+    "path": "/items/7", "raw_path": b"/items/7", "root_path": "", "query_string": b"", "headers": [],
+    "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8000),
+}
+
+
+def make_app(registry=None):
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    if registry is not None:
+        app.add_middleware(MetricsMiddleware, registry=registry)
+    return app
+
+
+async def drive(app, requests):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up (builds the middleware stack)
+        await app(dict(SCOPE), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+def time_spans(registry, spans):
+    start = time.perf_counter()
+    for _ in range(spans):
+        with registry.span("bench"):
+            pass
+    return (time.perf_counter() - start) / spans
+
+
+def time_queries(registry, queries):
+    engine = create_engine("sqlite://")
+    if registry is not None:
+        registry.instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE submissions (id INTEGER PRIMARY KEY, status TEXT, extracted_text TEXT)"))
+        conn.execute(text("INSERT INTO submissions (status, extracted_text) VALUES ('pending', :text)"),
+                     [{"text": f"Metformin 500mg twice daily #{i}"} for i in range(10000)])
+        statement = text("SELECT id, status, extracted_text FROM submissions ORDER BY id DESC LIMIT 50")
+        start = time.perf_counter()
+        for _ in range(queries):
+            conn.execute(statement).all()
+        elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed / queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    rows = [
+        ("request", asyncio.run(drive(make_app(), args.requests)),
+         asyncio.run(drive(make_app(MetricsRegistry(enabled=True)), args.requests))),
+        ("span", time_spans(MetricsRegistry(enabled=False), args.spans),
+         time_spans(MetricsRegistry(enabled=True), args.spans)),
+        ("db query", time_queries(None, args.queries),
+         time_queries(MetricsRegistry(enabled=True), args.queries)),
+    ]
+    print(f"{'operation':<12}{'off us':>10}{'on us':>10}{'overhead us':>14}{'overhead':>10}")
+    for name, off, on in rows:
+        print(f"{name:<12}{off * 1e6:>10.2f}{on * 1e6:>10.2f}{(on - off) * 1e6:>14.2f}{(on - off) / off:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
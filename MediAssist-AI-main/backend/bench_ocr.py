@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+OCR throughput benchmark.
+
+Compares the old prescription path (deskewed --psm 6 pass plus a second raw
+image_to_string pass) with the single-pass extract_text_with_details, on one
+core, using synthetic prescription images. Requires the tesseract binary.
+
+    python bench_ocr.py [--images 20] [--rounds 3]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+import ocr_pipeline as ocr
+
+SAMPLE_LINES = [
+    "Dr. A. Sharma: General Physician",
+    "Rx: Amoxicillin 500mg: 1 tablet three times daily for 7 days",
+    "Metformin 500mg BID with meals",
+    "Lipitor 20mg - 1 tablet daily at bedtime",
+    "Paracetamol 650mg every 6 hours if fever",
+]
+
+
+def make_prescription_image(lines=SAMPLE_LINES, angle=0.0, width=1600, seed=0):
+    """Render dark text on a light, slightly noisy page and rotate it by `angle` degrees"""
+    rng = np.random.default_rng(seed)
+    line_height = 70
+    height = line_height * (len(lines) + 2)
+    img = np.full((height, width, 3), 245, dtype=np.uint8)
+    img = (img - rng.integers(0, 12, img.shape, dtype=np.uint8)).astype(np.uint8)
+
+    for i, line in enumerate(lines, 1):
+        cv2.putText(img, line, (40, i * line_height), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 2, cv2.LINE_AA)
+
+    if angle:
+        center = (width // 2, height // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        img = cv2.warpAffine(img, M, (width, height), borderValue=(245, 245, 245))
+
+    return img
+
+
+def old_path(image_path):
+    """What submit_prescription used to do: two Tesseract passes"""
+    cleaned_text = ocr.extract_text(image_path)
+    with Image.open(image_path) as image:
+        extracted_text = pytesseract.image_to_string(image)
+    return cleaned_text, extracted_text
+
+
+def new_path(image_path):
+    result = ocr.extract_text_with_details(image_path)
+    return result.cleaned_text, result.raw_text
+
+
+def run(fn, paths, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(paths) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        print("tesseract binary not found; install Tesseract OCR to run this benchmark")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.images):
+            path = os.path.join(tmp, f"rx_{i}.png")
+            cv2.imwrite(path, make_prescription_image(angle=(i % 7) - 3, seed=i))
+            paths.append(path)
+
+        old_rps = run(old_path, paths, args.rounds)
+        new_rps = run(new_path, paths, args.rounds)
+
+    print(f"Images: {args.images}, rounds: {args.rounds} (single core, best round)")
+    print(f"Two OCR passes:  {old_rps:6.2f} requests/sec/core")
+    print(f"One OCR pass:    {new_rps:6.2f} requests/sec/core")
+    print(f"Speedup:         {new_rps / old_rps:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Preprocessing benchmark: images/sec and peak RSS of ocr_pipeline.preprocess_image
+against the previous implementation, over a synthetic corpus of rotated
+12-megapixel text images. Each variant runs in a fresh process so its peak RSS
+is not polluted by the other one. Does not need Tesseract.
+
+    python bench_preprocess.py [--images 12] [--width 4000] [--rounds 2]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import ocr_pipeline as ocr
+from bench_ocr import SAMPLE_LINES, make_prescription_image
+
+
+def legacy_preprocess_image(image_path):
+    """preprocess_image as it was before the vectorized deskew"""
+    img = cv2.imread(image_path)
+    if img is None:
+        raise ValueError(f"Could not load image from path: {image_path}")
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    coords = np.column_stack(np.where(thresh > 0))
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = -(90 + angle)
+    else:
+        angle = -angle
+    (h, w) = img.shape[:2]
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    return cv2.warpAffine(thresh, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+VARIANTS = {
+    "legacy": legacy_preprocess_image,
+    "current": ocr.preprocess_image,
+}
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(name, paths, rounds, results):
+    fn = VARIANTS[name]
+    baseline = max_rss_mb()
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in paths:
+            fn(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    results[name] = (len(paths) / best, max_rss_mb(), max_rss_mb() - baseline)
+
+
+def build_corpus(directory, count, width):
+    # Enough lines to fill a 4:3 page at the requested width
+    lines = SAMPLE_LINES * max(1, (width * 3 // 4) // (70 * len(SAMPLE_LINES)))
+    angles = np.linspace(-10, 10, count)
+    paths = []
+    for i, angle in enumerate(angles):
+        path = os.path.join(directory, f"page_{i}.png")
+        cv2.imwrite(path, make_prescription_image(lines, angle=float(angle), width=width, seed=i))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=12)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp, ctx.Manager() as manager:
+        paths = build_corpus(tmp, args.images, args.width)
+        shape = cv2.imread(paths[0], cv2.IMREAD_GRAYSCALE).shape
+        results = manager.dict()
+
+        for name in VARIANTS:
+            proc = ctx.Process(target=run_variant, args=(name, paths, args.rounds, results))
+            proc.start()
+            proc.join()
+
+        print(f"Corpus: {args.images} images of {shape[1]}x{shape[0]}, skew -10..10 degrees, best of {args.rounds} rounds")
+        print(f"{'variant':<10}{'images/sec':>12}{'peak RSS MB':>14}{'RSS growth MB':>16}")
+        for name in VARIANTS:
+            ips, peak, growth = results[name]
+            print(f"{name:<10}{ips:>12.2f}{peak:>14.1f}{growth:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Cold start of a backend worker: time to import main, to run the startup
+(lifespan) and to answer the first request, plus resident memory, measured in
+fresh interpreters from a scratch directory. Two modes:
+
+    lazy    the default: OCR, gTTS and the OpenAI SDK load on first use
+    warm    WARM_UP=1: the startup loads them (and starts the OCR processes)
+
+"first ocr" is what the lazy mode defers: importing the OCR stack when the
+first prescription arrives. The import profile lists the modules main pulls
+in, by cumulative import time (python -X importtime), to see what a change
+added. Each mode runs --runs times; medians are reported. --output writes
+JSON to compare commits.
+
+    python bench_startup.py [--runs 5] [--profile 15] [--output bench_startup.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Loaded on first use; reported when present right after `import main`
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "pytesseract", "gtts", "openai", "httpx")
+
+HTTP_SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+    "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"", "headers": [],
+    "client": ("127.0.0.1", 1234), "server": ("127.0.0.1", 8000),
+}
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def start_and_serve(app):
+    """Run the lifespan startup and one GET / straight through ASGI; returns (startup s, first request s)"""
+    lifespan_in, lifespan_out = asyncio.Queue(), asyncio.Queue()
+    start = time.perf_counter()
+    await lifespan_in.put({"type": "lifespan.startup"})
+    lifespan = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}},
+                                       lifespan_in.get, lifespan_out.put))
+    message = await lifespan_out.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"startup failed: {message}")
+    started = time.perf_counter()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    responses = []
+
+    async def send(message):
+        responses.append(message)
+
+    await app(dict(HTTP_SCOPE), receive, send)
+    if responses[0]["status"] != 200:
+        raise RuntimeError(f"GET / answered {responses[0]['status']}")
+    served = time.perf_counter()
+
+    await lifespan_in.put({"type": "lifespan.shutdown"})
+    await lifespan_out.get()
+    await lifespan
+    return started - start, served - started
+
+
+def probe():
+    """One cold start in this (fresh) interpreter; prints the measurements as JSON"""
+    sys.path.insert(0, BACKEND_DIR)
+    start = time.perf_counter()
+    import main
+    imported = time.perf_counter() - start
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+    rss_imported = rss_mb()
+
+    startup, first_request = asyncio.run(start_and_serve(main.app))
+    rss_ready = rss_mb()
+
+    start = time.perf_counter()
+    import ocr_pipeline  # noqa: F401
+    first_ocr = time.perf_counter() - start
+
+    print(json.dumps({
+        "import_ms": imported * 1000, "startup_ms": startup * 1000, "first_request_ms": first_request * 1000,
+        "ready_ms": (imported + startup + first_request) * 1000, "first_ocr_ms": first_ocr * 1000,
+        "rss_import_mb": rss_imported, "rss_ready_mb": rss_ready, "heavy_after_import": heavy,
+    }))
+
+
+def run_probe(warm):
+    env = dict(os.environ, WARM_UP="1" if warm else "0", OPENAI_API_KEY="", PYTHONDONTWRITEBYTECODE="1")
+    with tempfile.TemporaryDirectory() as directory:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe"], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(limit):
+    """(cumulative ms, self ms, module) for the modules imported while importing main, slowest first"""
+    with tempfile.TemporaryDirectory() as directory:
+        stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=directory,
+                                env=dict(os.environ, PYTHONPATH=BACKEND_DIR), capture_output=True,
+                                text=True, check=True).stderr
+    # Children are listed before their parent, so main's direct imports are
+    # the depth-1 lines since the previous top-level import (e.g. `site`)
+    rows, pending = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            pending.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == "main":
+                rows = pending + [(int(cumulative_us) / 1000, int(self_us) / 1000, "main")]
+            pending = []
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", type=int, default=15, help="modules listed in the import profile")
+    parser.add_argument("--output")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe:
+        probe()
+        return
+
+    columns = ("import_ms", "startup_ms", "first_request_ms", "ready_ms", "first_ocr_ms", "rss_import_mb", "rss_ready_mb")
+    report = {"runs": args.runs, "modes": {}}
+    print(f"{'mode':<6}{'import ms':>11}{'startup ms':>12}{'first / ms':>12}{'ready ms':>10}"
+          f"{'first ocr ms':>14}{'rss import MB':>15}{'rss ready MB':>14}")
+    for mode in ("lazy", "warm"):
+        samples = [run_probe(mode == "warm") for _ in range(args.runs)]
+        medians = {column: statistics.median(sample[column] for sample in samples) for column in columns}
+        medians["heavy_after_import"] = samples[-1]["heavy_after_import"]
+        report["modes"][mode] = medians
+        print(f"{mode:<6}" + "".join(f"{medians[column]:>{width}.1f}"
+                                     for column, width in zip(columns, (11, 12, 12, 10, 14, 15, 14))))
+    heavy = report["modes"]["lazy"]["heavy_after_import"]
+    print(f"Heavy modules loaded by `import main`: {', '.join(heavy) if heavy else 'none'}")
+
+    report["import_profile"] = [
+        {"module": name, "cumulative_ms": cumulative, "self_ms": own}
+        for cumulative, own, name in import_profile(args.profile)
+    ]
+    print(f"\n{'module':<32}{'cumulative ms':>15}{'self ms':>10}")
+    for row in report["import_profile"]:
+        print(f"{row['module']:<32}{row['cumulative_ms']:>15.1f}{row['self_ms']:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Doctor summaries of symptom transcripts under concurrent submissions, with
+and without micro-batching.
+
+The real SymptomSummarizer and LLM gateway run against an in-process
+stand-in for the OpenAI API. A chat completion takes --latency seconds plus
+--per-item seconds for each patient in it (longer answers take longer to
+generate); the gateway keeps at most LLM_MAX_IN_FLIGHT requests open, as in
+production. --concurrency clients each submit --per-client transcripts one
+after another; --repeats of them are a transcript seen before (the
+summary cache is in memory, emptied for every run). Two modes:
+
+    batched     SYMPTOM_BATCH_SIZE transcripts per chat completion while busy
+    unbatched   batch size 1: one chat completion per transcript
+
+Reports LLM requests, requests per transcript, wall time, transcripts/s and
+p50/p99 latency per transcript.
+
+    python bench_symptoms.py [--concurrency 1 8 32 128] [--per-client 3] [--latency 0.4] [--per-item 0.03]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+import httpx
+
+from ai_integration import SYMPTOM_BATCH_SIZE, SYMPTOM_BATCH_WAIT, SymptomSummarizer
+from llm_gateway import LLMGateway
+
+SYMPTOMS = ("a headache", "a mild fever", "a dry cough", "a sore throat", "back pain", "nausea", "a rash", "dizziness")
+
+
+class FakeOpenAITransport(httpx.AsyncBaseTransport):
+    """Answers chat completions locally, one '### n' section per patient, after a size-dependent delay"""
+
+    def __init__(self, latency, per_item):
+        self.latency = latency
+        self.per_item = per_item
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        prompt = json.loads(await request.aread())["messages"][-1]["content"]
+        self.requests += 1
+        transcripts = re.findall(r'"(.*)"', prompt)
+        await asyncio.sleep(self.latency + self.per_item * len(transcripts))
+        if "###" in prompt:
+            content = "\n".join(f"### {i}\nPatient reports {text[9:]}." for i, text in enumerate(transcripts, 1))
+        else:
+            content = f"Patient reports {transcripts[0][9:]}."
+        return httpx.Response(200, json={
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        })
+
+
+class MemoryCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, kind, content_hash):
+        return self.entries.get((kind, content_hash))
+
+    def put(self, kind, content_hash, value):
+        self.entries[(kind, content_hash)] = value
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+async def run(concurrency, per_client, batch_size, args, rng):
+    transport = FakeOpenAITransport(args.latency, args.per_item)
+    gateway = LLMGateway(api_key="bench", base_url="http://llm.invalid/v1", transport=transport)
+    summarizer = SymptomSummarizer(gateway=gateway, cache=MemoryCache(), batch_size=batch_size, batch_wait=args.batch_wait)
+    seen = []
+    latencies = []
+
+    def transcript():
+        if seen and rng.random() < args.repeats:
+            return rng.choice(seen)
+        text = f"I've had {rng.choice(SYMPTOMS)} and {rng.choice(SYMPTOMS)} for {rng.randint(1, 9999)} days"
+        seen.append(text)
+        return text
+
+    async def client():
+        for _ in range(per_client):
+            start = time.perf_counter()
+            await summarizer.summarize(transcript())
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    await gateway.aclose()
+    return transport.requests, wall, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--per-client", type=int, default=3, help="transcripts each client submits in turn")
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per chat completion")
+    parser.add_argument("--per-item", type=float, default=0.03, help="extra seconds per patient in a completion")
+    parser.add_argument("--batch-size", type=int, default=SYMPTOM_BATCH_SIZE)
+    parser.add_argument("--batch-wait", type=float, default=SYMPTOM_BATCH_WAIT)
+    parser.add_argument("--repeats", type=float, default=0.25, help="share of transcripts seen before")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    import openai  # noqa: F401 -- loaded on first use; keep the import out of the first run's timings
+
+    print(f"{'clients':>8}  {'mode':<10}{'items':>7}{'LLM reqs':>10}{'reqs/item':>11}{'wall s':>8}"
+          f"{'items/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        for mode, batch_size in (("batched", args.batch_size), ("unbatched", 1)):
+            rng = random.Random(args.seed)
+            requests, wall, latencies = asyncio.run(run(concurrency, args.per_client, batch_size, args, rng))
+            items = len(latencies)
+            print(f"{concurrency:>8}  {mode:<10}{items:>7}{requests:>10}{requests / items:>11.2f}{wall:>8.2f}"
+                  f"{items / wall:>9.1f}{percentile(latencies, 50) * 1000:>9.0f}{percentile(latencies, 99) * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
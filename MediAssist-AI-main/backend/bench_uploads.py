@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Upload handling throughput for 1 MB - 50 MB uploads.
+
+"legacy" is what the endpoints used to do: copy the upload into the uploads
+directory while hashing it, read the file back from disk, unlink it. "current" is
+uploads.receive_upload (chunked read with size cap and SHA-256) followed by
+taking the buffer the decoders use. Both start from a Starlette UploadFile
+backed by a SpooledTemporaryFile, as produced by the multipart parser.
+
+    python bench_uploads.py [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from starlette.datastructures import UploadFile
+
+import uploads
+
+SIZES_MB = [1, 5, 10, 25, 50]
+
+
+def make_upload(payload):
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(payload)
+    spooled.seek(0)
+    return UploadFile(spooled, filename="scan.jpg")
+
+
+async def legacy(file, directory):
+    file_path = Path(directory) / file.filename
+    digest = hashlib.sha256()
+    with file_path.open("wb") as buffer:
+        while True:
+            chunk = file.file.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+            buffer.write(chunk)
+    with open(file_path, "rb") as f:
+        data = f.read()
+    np.frombuffer(data, dtype=np.uint8)
+    file_path.unlink()
+
+
+async def current(file, directory):
+    upload = await uploads.receive_upload(file, max_bytes=1 << 40, directory=directory)
+    with upload:
+        np.frombuffer(upload.buffer(), dtype=np.uint8)
+
+
+async def measure(fn, payload, rounds, directory):
+    best = None
+    for _ in range(rounds):
+        file = make_upload(payload)
+        start = time.perf_counter()
+        await fn(file, directory)
+        elapsed = time.perf_counter() - start
+        file.file.close()
+        best = elapsed if best is None else min(best, elapsed)
+    return len(payload) / best / (1024 * 1024)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Spool threshold: {uploads.SPOOL_MEMORY_LIMIT / (1024 * 1024):.0f} MB, best of {args.rounds} rounds")
+    print(f"{'size MB':>8}{'legacy MB/s':>14}{'current MB/s':>14}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES_MB:
+            payload = os.urandom(size * 1024 * 1024)
+            old = await measure(legacy, payload, args.rounds, directory)
+            new = await measure(current, payload, args.rounds, directory)
+            print(f"{size:>8}{old:>14.0f}{new:>14.0f}{new / old:>9.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Throughput of the multi-worker deployment at 1, 2, 4 and 8 web workers.
+
+For each worker count, gunicorn (gunicorn.conf.py, the OCR job runner
+included) serves the real application from a scratch directory. --users
+patients are registered and --rows submissions seeded, then --clients load
+generator processes with --concurrency connections each run two scenarios
+for a fixed time:
+
+    list    GET /get_result as a random patient (auth, a page of rows, JSON)
+    login   POST /login (CPU-bound password hashing)
+
+Reports requests/s, p50/p99, failed requests and the speedup over one worker.
+The load generators run on the same machine, so on a small box they compete
+with the server for CPU; the CPU count is printed with the results.
+
+    python bench_workers.py [--workers 1 2 4 8] [--seconds 10] [--clients 2] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = "bench-password"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def start_server(directory, port, workers):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}", OPENAI_API_KEY="")
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+         "--pythonpath", BACKEND_DIR, "main:app"],
+        cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(60)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def wait_ready(base, workers):
+    for _ in range(600):
+        try:
+            httpx.get(base)
+            break
+        except httpx.TransportError:
+            time.sleep(0.1)
+    else:
+        raise RuntimeError("server did not start")
+    # The first worker answers before the others finished booting
+    time.sleep(1.0 + 0.25 * workers)
+
+
+def seed(base, directory, users, rows):
+    with httpx.Client(base_url=base, timeout=60) as client:
+        tokens = []
+        for index in range(users):
+            username = f"patient{index}"
+            client.post("/register", json={"username": username, "email": f"{username}@example.com", "password": PASSWORD})
+            tokens.append(client.post("/login", json={"username": username, "password": PASSWORD}).json()["session_token"])
+    now = datetime.utcnow().isoformat(" ")
+    with sqlite3.connect(os.path.join(directory, "mediassist.db"), timeout=30) as conn:
+        conn.executemany(
+            "INSERT INTO submissions (user_id, type, extracted_text, patient_instructions, status, created_at, updated_at)"
+            " VALUES (?, 'prescription', 'Metformin 500mg BID with meals', 'Take one tablet twice daily with meals.',"
+            " 'pending', ?, ?)",
+            [(random.randint(1, users), now, now) for _ in range(rows)]
+        )
+    return tokens
+
+
+async def generate(base, scenario, tokens, seconds, concurrency):
+    latencies = []
+    failures = 0
+    deadline = time.perf_counter() + seconds
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal failures
+            while time.perf_counter() < deadline:
+                index = random.randrange(len(tokens))
+                start = time.perf_counter()
+                try:
+                    if scenario == "list":
+                        response = await client.get("/get_result", headers={"Authorization": f"Bearer {tokens[index]}"})
+                    else:
+                        response = await client.post("/login", json={"username": f"patient{index}", "password": PASSWORD})
+                except httpx.TransportError:
+                    failures += 1
+                    continue
+                if response.status_code != 200:
+                    failures += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures
+
+
+def client_process(base, scenario, tokens, seconds, concurrency, results):
+    results.put(asyncio.run(generate(base, scenario, tokens, seconds, concurrency)))
+
+
+def drive(base, scenario, tokens, seconds, clients, concurrency):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=client_process, args=(base, scenario, tokens, seconds, concurrency, results))
+        for _ in range(clients)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    latencies, failures = [], 0
+    for _ in processes:
+        client_latencies, client_failures = results.get()
+        latencies += client_latencies
+        failures += client_failures
+    for process in processes:
+        process.join()
+    return len(latencies) / (time.perf_counter() - start), latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per load generator")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} x {args.concurrency} connections, {args.seconds:.0f} s per run")
+    print(f"{'workers':>8}  {'scenario':<9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'failed':>8}{'speedup':>9}")
+    baseline = {}
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as directory:
+            port = free_port()
+            base = f"http://127.0.0.1:{port}"
+            server = start_server(directory, port, workers)
+            try:
+                wait_ready(base, workers)
+                tokens = seed(base, directory, args.users, args.rows)
+                for scenario in ("list", "login"):
+                    rate, latencies, failures = drive(base, scenario, tokens, args.seconds, args.clients, args.concurrency)
+                    baseline.setdefault(scenario, rate)
+                    print(f"{workers:>8}  {scenario:<9}{rate:>9.0f}{percentile(latencies, 50) * 1000:>9.1f}"
+                          f"{percentile(latencies, 99) * 1000:>9.1f}{failures:>8}{rate / baseline[scenario]:>8.2f}x")
+            finally:
+                stop_server(server)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,39 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import inspect, text, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
-import hashlib
-import secrets
+import db_config
+import password_hashing
 
-# Create the database engine. This will create a file named "mediassist.db"
-SQLALCHEMY_DATABASE_URL = "sqlite:///./mediassist.db"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Create the database engines. By default this is a SQLite file named "mediassist.db"
+# (see db_config for DATABASE_URL, the pragmas and the read pool / single writer split)
+SQLALCHEMY_DATABASE_URL = db_config.DATABASE_URL
+engine, read_engine = db_config.create_engines(SQLALCHEMY_DATABASE_URL)
 
 # A base class for our models
 Base = declarative_base()
 
-# The database session class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The database session class; SELECTs use the read pool until a transaction writes
+SessionLocal = sessionmaker(
+    class_=db_config.RoutingSession, autocommit=False, autoflush=False, bind=engine,
+    read_bind=read_engine if read_engine is not engine else None
+)
+
+# Async sessions for the request handlers, routed the same way. Objects stay
+# usable after commit: lazy loads are not possible once the session is closed.
+async_engine, async_read_engine = db_config.create_async_engines(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, sync_session_class=db_config.AsyncRoutingSession, autoflush=False, expire_on_commit=False,
+    read_bind=async_read_engine.sync_engine if async_read_engine is not async_engine else None
+)
+
+
+async def dispose_async_engines():
+    """Close the async connections; they belong to the event loop that opened them"""
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
 
 # User model for authentication and data ownership
 class User(Base):
@@ -30,21 +48,15 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     
     # Relationship with submissions
-    submissions = relationship("Submission", back_populates="user")
+    submissions = relationship("Submission", back_populates="user", foreign_keys="Submission.user_id")
     
     def set_password(self, password: str):
         """Hash and set password"""
-        salt = secrets.token_hex(32)
-        self.password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000).hex() + ':' + salt
+        self.password_hash = password_hashing.hash_password_sync(password)
     
     def check_password(self, password: str) -> bool:
         """Check if provided password matches stored hash"""
-        try:
-            stored_hash, salt = self.password_hash.split(':')
-            password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000).hex()
-            return password_hash == stored_hash
-        except:
-            return False
+        return password_hashing.verify_password_sync(password, self.password_hash)
 
 # Enhanced submission model with user ownership
 class Submission(Base):
@@ -60,9 +72,19 @@ class Submission(Base):
     status = Column(String, default="pending")  # Add a new status field
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    approved_by = Column(Integer, ForeignKey("users.id"))  # doctor who approved or rejected it
+    approved_at = Column(DateTime)
     
     # Relationship with user
-    user = relationship("User", back_populates="submissions")
+    user = relationship("User", back_populates="submissions", foreign_keys=[user_id])
+
+    # Keyset pagination walks (created_at, id) newest first. Each index also
+    # carries the summary columns, so summary listings never touch the table.
+    __table_args__ = (
+        Index("ix_submissions_created_id", "created_at", "id", "user_id", "type", "status"),
+        Index("ix_submissions_user_created_id", "user_id", "created_at", "id", "type", "status"),
+        Index("ix_submissions_status_created_id", "status", "created_at", "id", "user_id", "type"),
+    )
 
 # Session model for user authentication
 class UserSession(Base):
@@ -72,9 +94,60 @@ class UserSession(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     session_token = Column(String, unique=True, index=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # the maintenance purge finds expired rows by it
     is_active = Column(Boolean, default=True)
 
+    # The token lookup on every authenticated request is answered from this index alone
+    __table_args__ = (
+        Index("ix_user_sessions_token_active_expires", "session_token", "is_active", "expires_at"),
+    )
+
+# Background job for work that is too slow to run inside a request
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    submission_id = Column(Integer, ForeignKey("submissions.id"), unique=True, nullable=False)
+    kind = Column(String, default="prescription")  # only 'prescription' for now
+    payload_path = Column(String, nullable=False)  # stored upload the worker reads
+    status = Column(String, default="queued", index=True)  # 'queued', 'running', 'done' or 'failed'
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    content_hash = Column(String, index=True)  # SHA-256 of the upload, for the result cache
+    last_error = Column(Text)
+    run_after = Column(DateTime, default=datetime.utcnow, index=True)  # retry backoff
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Persistent tier of the upload result cache (see result_cache.py)
+class CachedResult(Base):
+    __tablename__ = "result_cache"
+
+    key = Column(String, primary_key=True)  # '<kind>:<sha256 of upload>'
+    payload = Column(Text, nullable=False)  # JSON encoded result fields
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+
 # Function to create the database tables
 def create_db_and_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """Add columns and indexes introduced after a table was first created (create_all skips existing tables)"""
+    with engine.begin() as conn:
+        # Inspect through the same connection: SQLite has a single writer connection
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            # Indexes on new columns, and indexes added to existing columns
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
\ No newline at end of file
@@ -0,0 +1,209 @@
+# db_config.py
+# Database engines and sessions.
+#
+# DATABASE_URL selects the database; the default is the SQLite file
+# ./mediassist.db. For SQLite every connection is set up for concurrent use:
+# WAL journaling (readers never wait for the writer and the writer never waits
+# for readers), a busy timeout instead of immediate 'database is locked'
+# errors, and a larger page cache plus memory-mapped reads.
+#
+# SQLite allows one writer at a time, so writes go through a single pooled
+# connection whose transactions start with BEGIN IMMEDIATE: writers queue for
+# that connection (and, across processes, for the write lock) instead of
+# failing halfway through a transaction. The queue is first come, first served,
+# so one busy thread cannot keep re-taking the writer while others starve. Reads use a separate pool of
+# read-only connections. RoutingSession picks the pool per statement: SELECTs
+# go to the read pool until the transaction writes, after which everything in
+# it uses the writer so it reads its own changes.
+#
+# Any other DATABASE_URL (e.g. postgresql://...) gets one ordinary pooled
+# engine for both reads and writes.
+#
+# The request handlers use async engines for the same database (aiosqlite for
+# SQLite, asyncpg for PostgreSQL), so waiting on the database never blocks the
+# event loop; background threads and the sync handlers keep the sync engines.
+import os
+import threading
+from collections import deque
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mediassist.db")
+
+# SQLite pragmas
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # NORMAL is durable across app crashes in WAL mode
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Read connections kept open, and extra ones allowed under load
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+DB_READ_POOL_OVERFLOW = int(os.getenv("DB_READ_POOL_OVERFLOW", "8"))
+
+# Seconds a write waits for the writer connection (or a session for a pooled connection)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Connection pool size for server databases such as PostgreSQL
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+
+# Async drivers used for each kind of DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def is_sqlite(url):
+    return str(url).startswith("sqlite")
+
+
+def _set_pragmas(dbapi_connection, read_only):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def create_engines(url=DATABASE_URL):
+    """(write engine, read engine); the same engine twice for databases other than SQLite"""
+    if not is_sqlite(url):
+        engine = create_engine(url, pool_size=DB_POOL_SIZE, pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True)
+        return engine, engine
+
+    connect_args = {"check_same_thread": False}
+    write_engine = create_engine(url, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT)
+    read_engine = create_engine(
+        url, connect_args=connect_args,
+        pool_size=DB_READ_POOL_SIZE, max_overflow=DB_READ_POOL_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT
+    )
+
+    _configure_sqlite(write_engine, read_engine)
+    return write_engine, read_engine
+
+
+def async_url(url):
+    """The same database URL with its async driver (sqlite:// -> sqlite+aiosqlite://)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_async_engines(url=DATABASE_URL):
+    """(write engine, read engine) for the async sessions, set up like create_engines"""
+    url = async_url(url)
+    if not is_sqlite(url):
+        engine = create_async_engine(url, pool_size=DB_POOL_SIZE, pool_timeout=DB_POOL_TIMEOUT, pool_pre_ping=True)
+        return engine, engine
+
+    write_engine = create_async_engine(url, pool_size=1, max_overflow=0, pool_timeout=DB_POOL_TIMEOUT)
+    read_engine = create_async_engine(
+        url, pool_size=DB_READ_POOL_SIZE, max_overflow=DB_READ_POOL_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT
+    )
+    _configure_sqlite(write_engine.sync_engine, read_engine.sync_engine)
+    return write_engine, read_engine
+
+
+def _configure_sqlite(write_engine, read_engine):
+    @event.listens_for(write_engine, "connect")
+    def _connect_writer(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (below) instead of the driver's deferred BEGIN
+        dbapi_connection.isolation_level = None
+        _set_pragmas(dbapi_connection, read_only=False)
+
+    @event.listens_for(write_engine, "begin")
+    def _begin_immediate(connection):
+        # Take the write lock up front; a deferred transaction that later tries to
+        # upgrade its lock fails with 'database is locked' without waiting
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(read_engine, "connect")
+    def _connect_reader(dbapi_connection, connection_record):
+        _set_pragmas(dbapi_connection, read_only=True)
+
+
+class FairLock:
+    """A lock granted in the order it was requested (threading.Lock lets the releasing thread barge back in)"""
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._waiters = deque()
+        self._held = False
+
+    def acquire(self, timeout=None):
+        with self._mutex:
+            if not self._held:
+                self._held = True
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+        if granted.wait(timeout):
+            return True
+        with self._mutex:
+            if granted in self._waiters:
+                self._waiters.remove(granted)
+                return False
+        return True  # handed over just as the wait timed out
+
+    def release(self):
+        with self._mutex:
+            if self._waiters:
+                self._waiters.popleft().set()  # stays held, now by the next waiter
+            else:
+                self._held = False
+
+
+# Sessions take turns at the SQLite writer connection
+writer_turn = FairLock()
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to read_bind until its transaction writes"""
+
+    # Taken while the transaction writes; async sessions wait in the (async) writer pool instead
+    writer_lock = writer_turn
+
+    def __init__(self, *args, read_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_bind = read_bind
+        self.wrote = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        if self.read_bind is not None and not self.wrote:
+            if clause is not None and getattr(clause, "is_select", False) and not self._flushing:
+                return self.read_bind
+            if self.writer_lock is not None and not self.writer_lock.acquire(DB_POOL_TIMEOUT):
+                raise PoolTimeoutError(f"Waited {DB_POOL_TIMEOUT:.0f} s for the database writer")
+            self.wrote = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def close(self):
+        super().close()
+        self._end_write()
+
+    def _end_write(self):
+        if self.wrote:
+            self.wrote = False
+            if self.writer_lock is not None:
+                self.writer_lock.release()
+
+
+class AsyncRoutingSession(RoutingSession):
+    """RoutingSession behind an AsyncSession; blocking on a thread lock would stall the event loop"""
+
+    writer_lock = None
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session._end_write()
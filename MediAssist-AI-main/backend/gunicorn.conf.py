@@ -0,0 +1,106 @@
+# gunicorn.conf.py
+# Multi-worker deployment:  gunicorn -c gunicorn.conf.py main:app
+#
+# WEB_CONCURRENCY uvicorn workers (default: one per CPU) serve HTTP. The
+# master loads .env and creates the schema once before forking; every worker
+# then runs its own startup in the app lifespan (main.init_worker), so nothing
+# is shared between processes except the database, the uploads directory and
+# the session revocation log (session_cache.py).
+#
+# PRELOAD_APP=1 imports the application and its heavy subsystems (OCR, gTTS,
+# the OpenAI SDK) once in the master: workers fork ready to serve and share
+# those pages copy-on-write. Without it each worker imports the application
+# itself and loads the subsystems on first use (or at startup with WARM_UP=1).
+#
+# Prescription jobs and their OCR pool run in one job runner (ocr_worker.py)
+# that the master starts, restarts if it dies, and stops with the workers, so
+# single-upload OCR never competes with request handling inside a web worker.
+# Batch uploads are the exception: /submit_prescriptions/batch streams each
+# page's result on the open request and shares chat completions between the
+# pages, so their OCR stays in the web worker that holds the connection, in a
+# pool of OCR_PROCESSES (default: CPUs / WEB_CONCURRENCY) started on the first
+# batch. Deployments that must keep all OCR out of the web tier should send
+# scans to /submit_prescription page by page instead. JOB_RUNNER:
+#   process   (default) the master supervises one ocr_worker.py
+#   external  run ocr_worker.py yourself, e.g. in its own container
+#   web       every web worker runs jobs, as the single-process server does
+# The runner's OCR and LLM timings are not in the web workers' /metrics; it
+# serves them on RUNNER_METRICS_PORT (see ocr_worker.py).
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv("BIND", f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = os.getenv("PRELOAD_APP", "0").lower() in ("1", "true", "yes", "on")
+
+JOB_RUNNER = os.getenv("JOB_RUNNER", "process")
+
+OCR_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_worker.py")
+
+_runner = {"process": None, "stopping": False}
+
+
+def on_starting(server):
+    import database
+
+    database.create_db_and_tables()
+    if preload_app:
+        import main
+
+        main.warm_up()
+    # Workers are forked from this process: don't hand them its connections
+    database.engine.dispose()
+    database.read_engine.dispose()
+
+
+def when_ready(server):
+    if JOB_RUNNER == "process":
+        threading.Thread(target=_supervise_runner, args=(server.log,), daemon=True).start()
+
+
+def post_fork(server, worker):
+    if JOB_RUNNER != "web":
+        # Web workers only enqueue; batch uploads still OCR in a small per-worker pool (see the top of this file)
+        os.environ["JOB_WORKERS"] = "0"
+        os.environ.setdefault("OCR_PROCESSES", str(max(1, (os.cpu_count() or 1) // max(1, server.cfg.workers))))
+        # With preload_app the queue was built in the master, from the master's settings
+        job_queue = sys.modules.get("job_queue")
+        if job_queue is not None:
+            job_queue.queue.workers = 0
+            job_queue.queue.ocr_processes = int(os.environ["OCR_PROCESSES"])
+
+
+def on_exit(server):
+    _runner["stopping"] = True
+    process = _runner["process"]
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(server.cfg.graceful_timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _supervise_runner(log):
+    while not _runner["stopping"]:
+        started = time.monotonic()
+        # A session of its own: Ctrl-C reaches the master, which then stops the runner in on_exit
+        _runner["process"] = subprocess.Popen([sys.executable, OCR_WORKER_SCRIPT], start_new_session=True)
+        log.info("Started OCR worker (pid %s)", _runner["process"].pid)
+        code = _runner["process"].wait()
+        if _runner["stopping"]:
+            return
+        log.warning("OCR worker exited with code %s, restarting", code)
+        # Don't spin on a runner that fails at startup
+        time.sleep(max(0.0, 5.0 - (time.monotonic() - started)))
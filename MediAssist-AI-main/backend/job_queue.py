@@ -0,0 +1,346 @@
+# job_queue.py
+# Durable, in-process job queue for prescription processing.
+#
+# Jobs live in the `jobs` table of the main SQLite database, so queued work
+# survives a restart and no external broker is needed. A handful of asyncio
+# workers drain the table: OCR runs in a process pool (it is CPU bound and
+# holds the GIL), the LLM call runs in a thread so it does not block the loop.
+#
+# With several web workers, run them with JOB_WORKERS=0 so they only enqueue,
+# and drain the table from one dedicated job runner (ocr_worker.py) that owns
+# the OCR pool; gunicorn.conf.py sets this up.
+import asyncio
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from database import SessionLocal, Job, Submission
+import ai_integration
+import metrics
+from result_cache import cache
+
+# Retry policy: a failed job is retried with exponential backoff and jitter
+# until it has been attempted JOB_MAX_ATTEMPTS times.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "2.0"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "60.0"))
+
+# Number of concurrent jobs (0: only enqueue) and size of the OCR process pool
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", str(os.cpu_count() or 1)))
+
+# Path to the tesseract binary when it is not on PATH
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "")
+
+# How often idle workers look for new or retried jobs
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+
+# A job still 'running' after this long belongs to a worker that died
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "600"))
+
+PRESCRIPTION_FAILED_TEXT = "Prescription processing failed."
+
+
+def _init_ocr_worker(tesseract_cmd):
+    """Process pool initializer: loads the OCR stack (the web process never imports it) and sets the Tesseract path"""
+    import ocr_pipeline  # noqa: F401
+    import pytesseract
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def _run_ocr(source):
+    """OCR stage, executed inside the process pool; source is a path or encoded image bytes"""
+    import ocr_pipeline as ocr
+
+    return ocr.extract_text_with_details(source)
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next attempt of a job that failed `attempts` times"""
+    delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def enqueue_prescription(db, user_id, image_path, content_hash=None):
+    """Create a queued submission and its job in one transaction"""
+    submission = Submission(user_id=user_id, type='prescription', status='queued')
+    db.add(submission)
+    await db.flush()
+
+    job = Job(
+        submission_id=submission.id,
+        kind='prescription',
+        payload_path=str(image_path),
+        content_hash=content_hash,
+        max_attempts=JOB_MAX_ATTEMPTS
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(submission)
+
+    queue.notify()
+    return submission
+
+
+async def record_cached_prescription(db, user_id, cached, content_hash):
+    """Store a submission whose result came from the cache, with an already finished job"""
+    submission = Submission(
+        user_id=user_id,
+        type='prescription',
+        extracted_text=cached['extracted_text'],
+        patient_instructions=cached['patient_instructions']
+    )
+    db.add(submission)
+    await db.flush()
+
+    db.add(Job(
+        submission_id=submission.id,
+        kind='prescription',
+        payload_path='',
+        content_hash=content_hash,
+        status='done',
+        max_attempts=JOB_MAX_ATTEMPTS
+    ))
+    await db.commit()
+    await db.refresh(submission)
+    return submission
+
+
+async def get_job(db, submission_id):
+    result = await db.execute(select(Job).where(Job.submission_id == submission_id).limit(1))
+    return result.scalars().first()
+
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, ocr_processes=OCR_PROCESSES, sessions=SessionLocal, result_cache=cache):
+        self.workers = workers
+        self.ocr_processes = ocr_processes
+        self.sessions = sessions  # sessionmaker for the jobs and submissions tables
+        self.result_cache = result_cache
+        self._pool = None
+        self._tasks = []
+        self._wakeup = None
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        self._ensure_pool()
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._requeue_stale_jobs)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def warm_up(self):
+        """Start the OCR processes now rather than on the first job; a no-op if this process runs no jobs"""
+        if self.workers > 0:
+            await asyncio.get_running_loop().run_in_executor(self._ensure_pool(), os.getpid)
+
+    async def run_ocr(self, source):
+        """Run the OCR stage for one image (path or encoded bytes) in the process pool"""
+        loop = asyncio.get_running_loop()
+        pool = self._ensure_pool()
+        try:
+            with metrics.registry.span("ocr"):
+                result = await loop.run_in_executor(pool, _run_ocr, source)
+        except BrokenProcessPool:
+            # An OCR process died (e.g. killed for memory): the pool takes no more
+            # work, so the next image starts a fresh one; this one is retried
+            self._replace_pool(pool)
+            raise
+        # Timed inside the worker process: preprocess_image, tesseract and clean_ocr_text
+        for stage, seconds in result.timings.items():
+            metrics.registry.observe(stage, seconds)
+        return result
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.ocr_processes,
+                initializer=_init_ocr_worker,
+                initargs=(TESSERACT_CMD,)
+            )
+        return self._pool
+
+    def _replace_pool(self, broken):
+        if self._pool is broken:
+            self._pool = None
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _worker(self):
+        errors = 0  # consecutive failures of the queue itself, e.g. "database is locked"
+        while True:
+            try:
+                await self._work_once()
+                errors = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A worker that exits leaves jobs queued until a restart, so back off and go on
+                errors += 1
+                delay = retry_delay(errors)
+                print(f"Job worker error: {e}. Retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _work_once(self):
+        """Run the next runnable job, or wait for one for up to JOB_POLL_INTERVAL"""
+        job = await asyncio.to_thread(self._claim_next_job)
+        if job is None:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            return
+
+        try:
+            await self._run(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job['id']} failed (attempt {job['attempts']}): {e}")
+            await asyncio.to_thread(self._record_failure, job, e)
+
+    async def _run(self, job):
+        ocr_result = await self.run_ocr(job['payload_path'])
+        result = await ai_integration.complete_prescription(ocr_result)
+        await asyncio.to_thread(self._record_success, job, result)
+
+    def _requeue_stale_jobs(self):
+        """Put jobs abandoned by a crashed worker back on the queue"""
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+        db = self.sessions()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.status == 'running', Job.updated_at < cutoff)
+                .values(status='queued', run_after=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim_next_job(self):
+        """Atomically move the oldest runnable job from 'queued' to 'running'"""
+        db = self.sessions()
+        try:
+            now = datetime.utcnow()
+            job = db.query(Job).filter(
+                Job.status == 'queued',
+                Job.run_after <= now
+            ).order_by(Job.id).first()
+            if job is None:
+                return None
+
+            # Compare-and-swap so two workers never claim the same job
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == 'queued')
+                .values(status='running', attempts=Job.attempts + 1, updated_at=now)
+            )
+            db.commit()
+            if claimed.rowcount != 1:
+                return None
+
+            db.refresh(job)
+            return {
+                'id': job.id,
+                'submission_id': job.submission_id,
+                'payload_path': job.payload_path,
+                'content_hash': job.content_hash,
+                'attempts': job.attempts,
+                'max_attempts': job.max_attempts,
+            }
+        finally:
+            db.close()
+
+    def _record_success(self, job, result):
+        db = self.sessions()
+        try:
+            db.query(Submission).filter(Submission.id == job['submission_id']).update({
+                Submission.extracted_text: result.extracted_text,
+                Submission.patient_instructions: result.instructions,
+            })
+            # Ready for review, unless the submission left 'queued' meanwhile
+            db.query(Submission).filter(Submission.id == job['submission_id'], Submission.status == 'queued').update({
+                Submission.status: 'pending',
+            })
+            db.query(Job).filter(Job.id == job['id']).update({
+                Job.status: 'done',
+                Job.last_error: None,
+            })
+            db.commit()
+        finally:
+            db.close()
+        _remove_payload(job['payload_path'])
+
+        # Rule-based fallbacks are not cached so a re-upload gets another shot at the LLM;
+        # confident local answers are as good as the LLM's for the same image
+        if job['content_hash'] and result.instructions_source != 'rules':
+            self.result_cache.put('prescription', job['content_hash'], {
+                'extracted_text': result.extracted_text,
+                'patient_instructions': result.instructions,
+            })
+
+    def _record_failure(self, job, error):
+        # Unreadable images will not get better on a retry
+        permanent = isinstance(error, (ValueError, FileNotFoundError))
+        exhausted = job['attempts'] >= job['max_attempts']
+
+        db = self.sessions()
+        try:
+            if permanent or exhausted:
+                db.query(Submission).filter(Submission.id == job['submission_id']).update({
+                    Submission.patient_instructions: PRESCRIPTION_FAILED_TEXT,
+                })
+                db.query(Submission).filter(Submission.id == job['submission_id'], Submission.status == 'queued').update({
+                    Submission.status: 'failed',
+                })
+                db.query(Job).filter(Job.id == job['id']).update({
+                    Job.status: 'failed',
+                    Job.last_error: str(error),
+                })
+            else:
+                db.query(Job).filter(Job.id == job['id']).update({
+                    Job.status: 'queued',
+                    Job.last_error: str(error),
+                    Job.run_after: datetime.utcnow() + timedelta(seconds=retry_delay(job['attempts'])),
+                })
+            db.commit()
+        finally:
+            db.close()
+
+        if permanent or exhausted:
+            _remove_payload(job['payload_path'])
+
+
+def _remove_payload(path):
+    try:
+        Path(path).unlink()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Failed to delete temp file: {e}")
+
+
+# Shared queue started and stopped by the application lifespan
+queue = JobQueue()
@@ -0,0 +1,208 @@
+# llm_gateway.py
+# Shared, non-blocking access to the OpenAI API.
+#
+# Every chat completion and transcription goes through one AsyncOpenAI client
+# per event loop, backed by a pooled httpx connection. Calls are capped by a
+# semaphore, time out, and are retried with jittered exponential backoff on
+# 429s, 5xx responses, timeouts and connection errors. After
+# LLM_BREAKER_THRESHOLD consecutive failures the circuit breaker opens and calls
+# fail immediately with LLMUnavailable for LLM_BREAKER_COOLDOWN seconds, so
+# callers go straight to their rule-based fallback instead of queueing behind a
+# degraded API. Set OPENAI_BASE_URL to point the gateway at a stub server.
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+import metrics
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+
+CHAT_MODEL = "gpt-4o-mini"
+TRANSCRIPTION_MODEL = "whisper-1"
+
+PLACEHOLDER_API_KEY = "your_actual_openai_api_key_here"
+
+# Worth another attempt; anything else (bad request, bad key) fails straight away.
+# Names in the openai package, which (with httpx) is imported by the first call.
+RETRYABLE_ERRORS = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError")
+
+
+class LLMUnavailable(Exception):
+    """The API is not configured, the circuit is open, or retries ran out"""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `cooldown` seconds"""
+
+    def __init__(self, threshold=LLM_BREAKER_THRESHOLD, cooldown=LLM_BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """The state a call is admitted under ('closed', or 'half_open' for the trial call), or None to reject it"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return state
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return state
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def abandon_trial(self):
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMGateway:
+    def __init__(self, api_key=None, base_url=None, max_in_flight=LLM_MAX_IN_FLIGHT,
+                 timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES,
+                 retry_base_delay=LLM_RETRY_BASE_DELAY, retry_max_delay=LLM_RETRY_MAX_DELAY,
+                 breaker=None, transport=None):
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport  # httpx transport override, e.g. a local stand-in for load tests
+        self._loops = weakref.WeakKeyDictionary()  # event loop -> (AsyncOpenAI, asyncio.Semaphore)
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuits": 0}
+
+    @property
+    def configured(self):
+        return bool(self.api_key) and self.api_key != PLACEHOLDER_API_KEY
+
+    def _client(self):
+        # httpx connections belong to the loop that opened them, so each loop gets its own pool
+        loop = asyncio.get_running_loop()
+        entry = self._loops.get(loop)
+        if entry is None:
+            import httpx
+            import openai
+
+            http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+                transport=self.transport,
+            )
+            client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0,  # retries are ours, so the breaker sees every failure
+            )
+            entry = self._loops[loop] = (client, asyncio.Semaphore(self.max_in_flight))
+        return entry
+
+    def retry_delay(self, attempt):
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempt - 1)))
+
+    async def _call(self, request, stage):
+        if not self.configured:
+            raise LLMUnavailable("OpenAI API key not configured")
+        admitted = self.breaker.allow()
+        if admitted is None:
+            self.stats["short_circuits"] += 1
+            raise LLMUnavailable("OpenAI API circuit open")
+
+        self.stats["calls"] += 1
+        try:
+            with metrics.registry.span(stage):
+                return await self._with_retries(request)
+        finally:
+            if admitted == "half_open":
+                # A cancelled trial is not evidence either way; let the next call try
+                self.breaker.abandon_trial()
+
+    async def _with_retries(self, request):
+        import openai
+
+        client, semaphore = self._client()
+        retryable = tuple(getattr(openai, name) for name in RETRYABLE_ERRORS)
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    result = await request(client)
+            except retryable as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    self.stats["failures"] += 1
+                    self.breaker.record_failure()
+                    raise LLMUnavailable(f"OpenAI API failed after {attempt} attempts: {e}") from e
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.retry_delay(attempt))
+            except openai.APIError:
+                self.stats["failures"] += 1
+                # The API answered, so it is not degraded; this request is just bad
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def chat(self, messages, model=CHAT_MODEL):
+        """Content of the first choice of a chat completion"""
+        async def request(client):
+            response = await client.chat.completions.create(model=model, messages=messages)
+            return response.choices[0].message.content
+        return await self._call(request, "llm_chat")
+
+    async def transcribe(self, file, language="en", model=TRANSCRIPTION_MODEL):
+        """Transcript text for an audio file, given as (filename, bytes or file object)"""
+        async def request(client):
+            content = file[1]
+            if hasattr(content, "seek"):
+                content.seek(0)  # a retry must resend the whole file
+            transcription = await client.audio.transcriptions.create(model=model, file=file, language=language)
+            return transcription.text
+        return await self._call(request, "llm_transcribe")
+
+    async def aclose(self):
+        """Close the connection pool opened on the running loop"""
+        entry = self._loops.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].close()
+
+
+# Shared gateway used by main.py and ai_integration.py
+gateway = LLMGateway()
@@ -1,45 +1,93 @@
-import shutil
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Form, status
+import asyncio
+import importlib
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Form, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from openai import OpenAI
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pathlib import Path
-from PIL import Image
-import pytesseract
 import os
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from dotenv import load_dotenv
 from datetime import datetime
 
-from database import SessionLocal, create_db_and_tables, Submission, User
-from auth import get_current_user, create_session_token, invalidate_session, get_db
-import ai_integration
-import tts_generator
-
-# Load environment variables
+# Settings are read from the environment as modules are imported, so .env has
+# to be loaded before the application modules below
 load_dotenv()
 
-# This line explicitly sets the path to your Tesseract executable.
-pytesseract.pytesseract.tesseract_cmd = r'C:\Users\Pranav\AppData\Local\Programs\Tesseract-OCR\tesseract.exe'
-
-# Initialize OpenAI client with error handling
-openai_api_key = os.getenv('OPENAI_API_KEY')
-if openai_api_key and openai_api_key != 'your_actual_openai_api_key_here':
-    client = OpenAI(api_key=openai_api_key)
-else:
-    client = None
-    print("Warning: OpenAI API key not configured. AI features will be limited.")
-
-UPLOAD_DIRECTORY = Path("./uploads")
-UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
-
-# Create the database file and tables on startup
-create_db_and_tables()
+import database
+from database import SessionLocal, create_db_and_tables, Submission, User
+from auth import get_current_user, create_session_token_async, invalidate_session, get_db, get_async_db, security
+from session_cache import UserSnapshot, cache as session_cache
+import ai_integration
+from audio_files import audio_files
+import batch_processing
+import job_queue
+import llm_gateway
+import maintenance
+import metrics
+import password_hashing
+import submission_listing
+import submission_review
+import tts_cache
+from result_cache import cache as result_cache
+from uploads import UPLOAD_DIRECTORY, MAX_BATCH_REQUEST_BYTES, UploadLimitMiddleware, receive_upload
+
+# OCR (OpenCV, NumPy, Tesseract), gTTS and the OpenAI SDK are imported on
+# first use, so a worker starts serving quickly. WARM_UP=1 imports them (and
+# starts the OCR processes) during startup instead, before the worker takes
+# traffic; gunicorn's PRELOAD_APP=1 does it once in the master for all workers.
+WARM_UP = os.getenv("WARM_UP", "0").lower() in ("1", "true", "yes", "on")
+WARM_UP_MODULES = ("ocr_pipeline", "gtts", "openai")
+
+def warm_up():
+    """Import the lazily loaded subsystems now; safe in a process that forks afterwards"""
+    for name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            print(f"Warm-up: {name} unavailable: {e}")
+
+def init_worker():
+    """Per-process startup, run by the lifespan of every worker; safe to repeat and to run concurrently"""
+    UPLOAD_DIRECTORY.mkdir(parents=True, exist_ok=True)
+
+    # Create the database file and tables; with SQLite the DDL runs under the
+    # write lock, so workers starting together don't race each other
+    create_db_and_tables()
+
+    # All OpenAI calls go through the shared gateway (async client, pooled connections)
+    if not llm_gateway.gateway.configured:
+        print("Warning: OpenAI API key not configured. AI features will be limited.")
+
+    if WARM_UP:
+        warm_up()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_worker()
+    # Start the background workers that process queued prescriptions
+    await job_queue.queue.start()
+    if WARM_UP:
+        await job_queue.queue.warm_up()
+    await tts_cache.cache.start()
+    await maintenance.scheduler.start()
+    try:
+        yield
+    finally:
+        await maintenance.scheduler.stop()
+        await tts_cache.cache.stop()
+        await job_queue.queue.stop()
+        await llm_gateway.gateway.aclose()
+        await database.dispose_async_engines()
 
-app = FastAPI(title="MediAssist AI Backend", description="AI-powered medical assistant API", version="1.0.0")
+app = FastAPI(title="MediAssist AI Backend", description="AI-powered medical assistant API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS with explicit settings
 origins = [
@@ -49,6 +97,10 @@ origins = [
     "http://127.0.0.1:8080",
 ]
 
+# Reject oversized request bodies while they stream in; registered before CORS
+# so the 413 responses still carry CORS headers
+app.add_middleware(UploadLimitMiddleware, limits={"/submit_prescriptions/batch": MAX_BATCH_REQUEST_BYTES})
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -57,6 +109,29 @@ app.add_middleware(
     allow_headers=["Accept", "Accept-Language", "Content-Language", "Content-Type", "Authorization"],
 )
 
+# Latency per route, pipeline stage timings and component stats at /metrics;
+# with METRICS_ENABLED=0 none of it is installed
+if metrics.registry.enabled:
+    app.add_middleware(metrics.MetricsMiddleware, registry=metrics.registry)
+    for instrumented in {database.engine, database.read_engine, database.async_engine.sync_engine, database.async_read_engine.sync_engine}:
+        metrics.registry.instrument_engine(instrumented)
+    metrics.registry.add_stats("llm_gateway", llm_gateway.gateway.stats)
+    metrics.registry.add_stats("prescription_tier", ai_integration.tier_stats.snapshot, gauges=ai_integration.TierStats.PERCENTILES)
+    metrics.registry.add_stats("symptom_summaries", ai_integration.symptom_summarizer.stats)
+    metrics.registry.add_stats("symptom_tier", ai_integration.symptom_summarizer.tier_stats.snapshot, gauges=ai_integration.TierStats.PERCENTILES)
+    metrics.registry.add_stats("result_cache", result_cache.stats)
+    metrics.registry.add_stats("session_cache", session_cache.stats)
+    metrics.registry.add_stats("tts_cache", tts_cache.cache.stats)
+    metrics.registry.add_stats("audio_files", audio_files.stats)
+    metrics.registry.add_stats("maintenance", maintenance.scheduler.stats, gauges=("last_rows", "last_seconds"))
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics(request: Request):
+        """Prometheus scrape endpoint (METRICS_TOKEN, or loopback only)"""
+        if not metrics.scrape_allowed(request.headers.get("authorization"), request.client.host if request.client else None):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics are not available to this client")
+        return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # Pydantic models for authentication and API responses
 class UserCreate(BaseModel):
     username: str
@@ -94,12 +169,15 @@ class SubmissionOut(BaseModel):
     patient_instructions: Optional[str] = None
     status: str
     created_at: datetime
+    approved_by: Optional[int] = None
+    approved_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
 class SubmissionsList(BaseModel):
     submissions: List[SubmissionOut]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page
 
 # Dependency to get a database session for each request
 # Note: We're removing this since it's now imported from auth.py
@@ -120,12 +198,12 @@ def test_cors():
     return {"message": "CORS is working!", "status": "success"}
 
 @app.post("/register", response_model=UserOut)
-def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     print(f"Registration attempt - Username: {user_data.username}, Email: {user_data.email}, Type: {user_data.user_type}")
     
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = (await db.execute(select(User.id).where(User.username == user_data.username).limit(1))).first()
     if existing_user:
         print(f"Username {user_data.username} already exists")
         raise HTTPException(
@@ -134,7 +212,7 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
+    existing_email = (await db.execute(select(User.id).where(User.email == user_data.email).limit(1))).first()
     if existing_email:
         print(f"Email {user_data.email} already exists")
         raise HTTPException(
@@ -142,37 +220,47 @@ def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email already registered"
         )
     
-    # Create new user
+    # Hand the connection back to the pool while the password is hashed
+    await db.rollback()
+    
+    # Create new user; hashing runs in the password hashing pool
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        user_type=user_data.user_type
+        user_type=user_data.user_type,
+        password_hash=await password_hashing.hash_password(user_data.password)
     )
-    new_user.set_password(user_data.password)
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 @app.post("/login", response_model=LoginResponse)
-def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(login_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user and create session"""
     print(f"Login attempt - Username: {login_data.username}")
     
     # Find user by username
-    user = db.query(User).filter(User.username == login_data.username).first()
+    user = (await db.execute(select(User).where(User.username == login_data.username).limit(1))).scalars().first()
+    stored_hash = user.password_hash if user else None
+    if user:
+        db.expunge(user)  # keep its loaded fields through the rollback
+    # Hand the connection back to the pool while the password is verified
+    await db.rollback()
     
     if not user:
         print(f"User {login_data.username} not found")
+        # Spend as long as a real check so response times don't reveal usernames
+        await password_hashing.verify_dummy(login_data.password)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.check_password(login_data.password):
+    if not await password_hashing.verify_password(login_data.password, stored_hash):
         print(f"Invalid password for user {login_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -180,8 +268,13 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create session token
-    session_token = create_session_token(user.id, db)  # type: ignore[arg-type]
+    # Upgrade hashes made with old parameters now that we know the password
+    if password_hashing.needs_rehash(stored_hash):
+        new_hash = await password_hashing.hash_password(login_data.password)
+        await db.execute(update(User).where(User.id == user.id).values(password_hash=new_hash))
+    
+    # Create session token (committed together with an upgraded hash)
+    session_token = await create_session_token_async(user.id, db)  # type: ignore[arg-type]
     
     return {
         "user": user,
@@ -190,182 +283,302 @@ def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
     }
 
 @app.post("/logout")
-def logout_user(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def logout_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Logout user and invalidate session"""
-    # Note: We would need the token from the request to invalidate it
-    # For now, we'll just return a success message
+    invalidate_session(credentials.credentials, db)
     return {"message": "Logout successful"}
 
 @app.get("/me", response_model=UserOut)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: UserSnapshot = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @app.post("/submit_audio")
-async def submit_audio(file: UploadFile, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def submit_audio(file: UploadFile, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if not file.filename:
         return {"error": "No filename provided"}
     
-    file_path = UPLOAD_DIRECTORY / file.filename
     try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        upload = await receive_upload(file)
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": f"Failed to save audio file: {e}"}
 
-    transcribed_text = ""
-    try:
-        if client is None:
-            transcribed_text = "Transcription unavailable - OpenAI API key not configured."
-        else:
-            with open(file_path, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    language="en"
-                )
-                transcribed_text = transcription.text
-    except Exception as e:
-        print(f"Whisper API Error: {e}")
-        transcribed_text = "Transcription failed."
+    with upload:
+        return await _process_audio(upload, current_user, db)
+
+async def _process_audio(upload, current_user, db):
+    # Identical recording seen before: reuse its transcription and summary
+    cached = await asyncio.to_thread(result_cache.get, 'audio', upload.content_hash)
+    if cached is not None:
+        new_submission = Submission(
+            user_id=current_user.id,
+            type='audio',
+            transcribed_text=cached['transcribed_text'],
+            doctor_summary=cached['doctor_summary']
+        )
+        db.add(new_submission)
+        await db.commit()
+        await db.refresh(new_submission)
+        return {
+            "message": "Processing complete.",
+            "transcribed_text": new_submission.transcribed_text,
+            "doctor_summary": new_submission.doctor_summary,
+            "submission_id": new_submission.id,
+            "cached": True
+        }
 
-    doctor_summary = ""
-    try:
-        if client is None:
-            doctor_summary = "Summary unavailable - OpenAI API key not configured."
-        else:
-            prompt = f"""
-            You are a medical assistant AI. Summarize the following patient-reported symptoms into a single, concise sentence for a doctor.
-
-            Patient symptoms:
-            "{transcribed_text}"
-
-            Doctor summary:
-            """
-            chat_completion = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            doctor_summary = chat_completion.choices[0].message.content
-    except Exception as e:
-        print(f"GPT API Error: {e}")
-        doctor_summary = "Summary generation failed."
+    # Sent straight from memory (or the spool file); no copy in the uploads directory
+    result = await ai_integration.process_symptoms(upload.as_file_tuple(), language="en")
 
     new_submission = Submission(
         user_id=current_user.id,  # Associate with current user
         type='audio',
-        transcribed_text=transcribed_text,
-        doctor_summary=doctor_summary
+        transcribed_text=result.transcribed_text,
+        doctor_summary=result.doctor_summary
     )
     db.add(new_submission)
-    db.commit()
-    db.refresh(new_submission)
+    await db.commit()
+    await db.refresh(new_submission)
 
-    try:
-        file_path.unlink()
-    except Exception as e:
-        print(f"Failed to delete temp file: {e}")
+    # Only successful results are cached; failures and rule-based fallbacks should be retried on re-upload
+    if result.transcription_ok and result.summary_source in ('llm', 'cached'):
+        await asyncio.to_thread(result_cache.put, 'audio', upload.content_hash, {
+            'transcribed_text': result.transcribed_text,
+            'doctor_summary': result.doctor_summary
+        })
 
     return {
         "message": "Processing complete.",
-        "transcribed_text": transcribed_text,
-        "doctor_summary": doctor_summary,
+        "transcribed_text": result.transcribed_text,
+        "doctor_summary": result.doctor_summary,
         "submission_id": new_submission.id
     }
 
-@app.post("/submit_prescription")
-async def submit_prescription(file: UploadFile, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@app.post("/submit_prescription", status_code=status.HTTP_202_ACCEPTED)
+async def submit_prescription(file: UploadFile, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if not file.filename:
         return {"error": "No filename provided"}
     
-    file_path = UPLOAD_DIRECTORY / file.filename
     try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        upload = await receive_upload(file)
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": f"Failed to save prescription image: {e}"}
 
-    # Use the integrated AI processing
-    try:
-        patient_instructions = ai_integration.process_prescription(str(file_path))
-    except Exception as e:
-        print(f"AI Processing Error: {e}")
-        patient_instructions = "Prescription processing failed."
-    
-    # Extract text for display purposes
-    extracted_text = ""
-    try:
-        image = Image.open(file_path)
-        extracted_text = pytesseract.image_to_string(image)
-    except Exception as e:
-        print(f"OCR Error: {e}")
-        extracted_text = "OCR failed."
-    
-    new_submission = Submission(
-        user_id=current_user.id,  # Associate with current user
-        type='prescription',
-        extracted_text=extracted_text,
-        patient_instructions=patient_instructions
-    )
-    db.add(new_submission)
-    db.commit()
-    db.refresh(new_submission)
-
-    try:
-        file_path.unlink()
-    except Exception as e:
-        print(f"Failed to delete temp file: {e}")
+    with upload:
+        # Identical image seen before: skip OCR and the LLM entirely
+        cached = await asyncio.to_thread(result_cache.get, 'prescription', upload.content_hash)
+        if cached is not None:
+            new_submission = await job_queue.record_cached_prescription(db, current_user.id, cached, upload.content_hash)
+            return JSONResponse(status_code=status.HTTP_200_OK, content={
+                "message": "Prescription processed successfully.",
+                "submission_id": new_submission.id,
+                "status": "done",
+                "status_url": f"/jobs/{new_submission.id}",
+                "extracted_text": new_submission.extracted_text,
+                "patient_instructions": new_submission.patient_instructions,
+                "cached": True
+            })
+
+        # The queue worker runs in another process, so the image is kept on disk
+        # under a unique name until the job finishes
+        file_path = upload.persist(UPLOAD_DIRECTORY / f"rx_{uuid.uuid4().hex}{upload.suffix}")
+
+    # OCR and instruction generation happen in the job queue workers
+    new_submission = await job_queue.enqueue_prescription(db, current_user.id, file_path, upload.content_hash)
 
     return {
-        "message": "Prescription processed successfully.",
-        "extracted_text": extracted_text,
-        "patient_instructions": patient_instructions,
-        "submission_id": new_submission.id
+        "message": "Prescription queued for processing.",
+        "submission_id": new_submission.id,
+        "status": new_submission.status,
+        "status_url": f"/jobs/{new_submission.id}"
     }
 
-@app.get("/get_result", response_model=SubmissionsList)
-def get_results(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get submissions for the current user only"""
-    user_submissions = db.query(Submission).filter(Submission.user_id == current_user.id).all()
-    return {"submissions": user_submissions}
+@app.post("/submit_prescriptions/batch")
+async def submit_prescriptions_batch(files: List[UploadFile] = File(...), current_user: UserSnapshot = Depends(get_current_user)):
+    """Process many prescription images (or multi-page TIFF/PDF scans), streaming NDJSON results"""
+    items = []
+    uploads = []
+    for file in files:
+        filename = file.filename or "upload"
+        try:
+            upload = await receive_upload(file)
+            uploads.append(upload)
+            # Reject oversized scans from their page count, before rendering any page
+            pages = await asyncio.to_thread(batch_processing.count_pages, upload)
+            if len(items) + pages > batch_processing.MAX_BATCH_ITEMS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"A batch may contain at most {batch_processing.MAX_BATCH_ITEMS} pages"
+                )
+            sources = await asyncio.to_thread(batch_processing.expand_pages, upload)
+        except HTTPException:
+            for upload in uploads:
+                upload.close()
+            raise
+        except Exception as e:
+            items.append(batch_processing.BatchItem(index=len(items), filename=filename, page=1, error=f"Failed to read upload: {e}"))
+            continue
+
+        for page_number, source in enumerate(sources, 1):
+            items.append(batch_processing.BatchItem(
+                index=len(items),
+                filename=filename,
+                page=page_number,
+                source=source,
+                # Cache lookups are per upload; pages split from a scan are not cached
+                content_hash=upload.content_hash if len(sources) == 1 else None
+            ))
+
+    if len(items) > batch_processing.MAX_BATCH_ITEMS:
+        for upload in uploads:
+            upload.close()
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {batch_processing.MAX_BATCH_ITEMS} pages"
+        )
+
+    return StreamingResponse(
+        batch_processing.process_batch(items, uploads, current_user.id),
+        media_type="application/x-ndjson"
+    )
 
-@app.get("/get_all_results", response_model=SubmissionsList)
-def get_all_results(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Get all submissions (only for doctors)"""
+@app.get("/jobs/{submission_id}")
+async def get_job_status(submission_id: int, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Get the processing status of a queued submission"""
+    # Read the job first: once it is finished the submission row is too
+    job = await job_queue.get_job(db, submission_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    submission = (await db.execute(select(Submission).where(Submission.id == submission_id))).scalars().first()
+    if not submission or (submission.user_id != current_user.id and current_user.user_type != "doctor"):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {
+        "submission_id": submission.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "error": job.last_error,
+        "submission_status": submission.status
+    }
+    if job.status in ("done", "failed"):
+        response["extracted_text"] = submission.extracted_text
+        response["patient_instructions"] = submission.patient_instructions
+    return response
+
+# Listing filters shared by /get_result and /get_all_results
+class ListingParams:
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = Query(submission_listing.DEFAULT_PAGE_SIZE, ge=1, le=submission_listing.MAX_PAGE_SIZE),
+        status_filter: Optional[str] = Query(None, alias="status"),
+        type_filter: Optional[str] = Query(None, alias="type"),
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        fields: str = Query("full", pattern="^(full|summary)$"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.status_filter = status_filter
+        self.type_filter = type_filter
+        self.created_after = created_after
+        self.created_before = created_before
+        self.fields = fields
+
+@app.get("/get_result", response_model=SubmissionsList, response_model_exclude_unset=True)
+async def get_results(params: ListingParams = Depends(), current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Get submissions for the current user only, newest first, one page at a time"""
+    return await submission_listing.list_submissions_async(db, user_id=current_user.id, **vars(params))
+
+@app.get("/get_all_results", response_model=SubmissionsList, response_model_exclude_unset=True)
+async def get_all_results(params: ListingParams = Depends(), user_id: Optional[int] = None, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Get all submissions (only for doctors), newest first, one page at a time"""
     if current_user.user_type != "doctor":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors can access all submissions"
         )
     
-    all_submissions = db.query(Submission).all()
-    return {"submissions": all_submissions}
+    return await submission_listing.list_submissions_async(db, user_id=user_id, **vars(params))
 
 @app.put("/approve/{submission_id}")
-def approve_submission(submission_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def approve_submission(submission_id: int, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Approve a submission (only doctors can approve)"""
     if current_user.user_type != "doctor":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only doctors can approve submissions"
         )
-    
-    submission = db.query(Submission).filter(Submission.id == submission_id).first()
 
-    if not submission:
+    try:
+        [result] = await submission_review.review_by_ids(db, [submission_id], "approved", current_user.id)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    if result["result"] == "not_found":
         raise HTTPException(status_code=404, detail="Submission not found")
-    
-    submission.status = "approved"  # type: ignore[assignment]
+    if result["result"] == "not_reviewable":
+        # Still queued or failed: there is nothing to approve yet
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Submission is not ready for review")
+
+    return {"message": f"Submission {submission_id} has been approved.", "new_status": "approved"}
+
+# Which submissions a bulk review covers when no ids are given (same filters as the listings)
+class ReviewFilter(BaseModel):
+    user_id: Optional[int] = None
+    status: Optional[str] = None
+    type: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class ReviewRequest(BaseModel):
+    status: str = Field("approved", pattern="^(approved|rejected)$")
+    submission_ids: Optional[List[int]] = Field(None, max_length=submission_review.MAX_REVIEW_SUBMISSIONS)
+    filter: Optional[ReviewFilter] = None
+
+@app.post("/approve/bulk")
+async def review_submissions(review: ReviewRequest, current_user: UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Approve or reject many submissions in one transaction (only doctors can review)"""
+    if current_user.user_type != "doctor":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only doctors can approve submissions"
+        )
+    if (review.submission_ids is None) == (review.filter is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give either submission_ids or filter")
 
     try:
-        db.commit()
+        if review.submission_ids is not None:
+            results = await submission_review.review_by_ids(db, review.submission_ids, review.status, current_user.id)
+            more = False
+        else:
+            filters = review.filter
+            submission_ids, more = await submission_review.review_by_filter(
+                db, review.status, current_user.id, user_id=filters.user_id, status_filter=filters.status,
+                type_filter=filters.type, created_after=filters.created_after, created_before=filters.created_before
+            )
+            results = [{"submission_id": submission_id, "result": review.status} for submission_id in submission_ids]
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-    return {"message": f"Submission {submission_id} has been approved.", "new_status": submission.status}
+    return {
+        "status": review.status,
+        "updated": sum(1 for item in results if item["result"] == review.status),
+        "results": results,
+        "more": more  # the filter matched more submissions than one review may change
+    }
 
 class AudioRequest(BaseModel):
     text: str
@@ -375,32 +588,54 @@ class AudioRequest(BaseModel):
 async def generate_audio_instructions(request: AudioRequest):
     """Generate TTS audio for patient instructions"""
     try:
-        # Create a unique filename
-        import uuid
-        filename = f"instruction_{uuid.uuid4().hex}.mp3"
-        file_path = UPLOAD_DIRECTORY / filename
-        
-        # Generate TTS audio
-        tts_generator.generate_tts(request.text, str(file_path), request.language)
-        
-        # Return the file path for the frontend to access
-        return {
-            "message": "Audio generated successfully",
-            "audio_file": filename,
-            "file_path": f"/uploads/{filename}"
-        }
+        # Rendered once per (text, language); repeats reuse the cached file
+        filename, cached = await tts_cache.cache.get_or_render(request.text, request.language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"TTS generation failed: {e}")
+
+    # Return the file path for the frontend to access
+    return {
+        "message": "Audio generated successfully",
+        "audio_file": filename,
+        "file_path": f"/uploads/{filename}",
+        "cached": cached
+    }
+
+@app.post("/generate_audio/stream")
+async def stream_audio_instructions(request: AudioRequest):
+    """Stream TTS audio for patient instructions, sentence by sentence"""
+    chunks = tts_cache.cache.stream(request.text, request.language)
+    try:
+        # Wait for the first sentence so a failing TTS service still gets a proper error response
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=400, detail="No text to speak")
     except Exception as e:
+        await chunks.aclose()
         raise HTTPException(status_code=500, detail=f"TTS generation failed: {e}")
 
+    async def body():
+        yield first
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            # Headers are already sent; end the audio early
+            print(f"TTS streaming failed: {e}")
+
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
 @app.get("/uploads/{filename}")
-async def get_audio_file(filename: str):
-    """Serve generated audio files"""
-    file_path = UPLOAD_DIRECTORY / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    return FileResponse(file_path, media_type="audio/mpeg", headers={
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "GET",
-        "Access-Control-Allow-Headers": "*"
-    })
\ No newline at end of file
+async def get_audio_file(filename: str, request: Request):
+    """Serve generated audio files (Range requests, ETag revalidation)"""
+    return await audio_files.serve(
+        request,
+        UPLOAD_DIRECTORY / filename,
+        # TTS cache files are named after their content, so they never change
+        immutable=filename.startswith(tts_cache.FILE_PREFIX),
+        headers={
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET",
+            "Access-Control-Allow-Headers": "*"
+        }
+    )
@@ -0,0 +1,84 @@
+# maintenance.py
+# Periodic database housekeeping inside the server process.
+#
+# Each task runs in a worker thread, once at startup and then every `interval`
+# seconds, so housekeeping never blocks the event loop. A task returns the
+# number of rows it reclaimed; runs, rows and time spent are kept per task in
+# `stats`. Several server processes may each run the same task: the deletes
+# are idempotent, a second run just finds nothing left to do.
+import asyncio
+import os
+import time
+
+from auth import cleanup_expired_sessions
+from database import SessionLocal
+
+# Seconds between purges of expired and logged-out sessions (0 turns the purge off)
+SESSION_PURGE_INTERVAL = float(os.getenv("SESSION_PURGE_INTERVAL", "600"))
+
+
+class MaintenanceScheduler:
+    def __init__(self):
+        self._jobs = {}  # name -> (function, interval)
+        self._tasks = []
+        self.stats = {}
+
+    def add(self, name, function, interval):
+        """Run function() every interval seconds; it returns the number of rows reclaimed"""
+        self._jobs[name] = (function, interval)
+        self.stats[name] = {"runs": 0, "failures": 0, "rows": 0, "seconds": 0.0, "last_rows": 0, "last_seconds": 0.0}
+
+    async def run(self, name):
+        """Run one task now; returns the number of rows it reclaimed"""
+        function, _ = self._jobs[name]
+        stats = self.stats[name]
+        start = time.perf_counter()
+        try:
+            rows = await asyncio.to_thread(function)
+        except Exception:
+            stats["failures"] += 1
+            raise
+        elapsed = time.perf_counter() - start
+        stats["runs"] += 1
+        stats["rows"] += rows
+        stats["seconds"] += elapsed
+        stats["last_rows"] = rows
+        stats["last_seconds"] = elapsed
+        return rows
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run_forever(name, interval))
+            for name, (_, interval) in self._jobs.items() if interval > 0
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run_forever(self, name, interval):
+        while True:
+            try:
+                rows = await self.run(name)
+                if rows:
+                    print(f"Maintenance: {name} reclaimed {rows} rows in {self.stats[name]['last_seconds'] * 1000:.0f} ms")
+            except Exception as e:
+                print(f"Maintenance task {name} failed: {e}")
+            await asyncio.sleep(interval)
+
+
+def purge_sessions():
+    db = SessionLocal()
+    try:
+        return cleanup_expired_sessions(db)
+    finally:
+        db.close()
+
+
+# Shared scheduler for the application
+scheduler = MaintenanceScheduler()
+scheduler.add("expired_sessions", purge_sessions, SESSION_PURGE_INTERVAL)
@@ -0,0 +1,191 @@
+# medication_lexicon.py
+# Medication name lookup for the rule-based extractor.
+#
+# The bundled lexicon (data/medications.csv) is compiled into a table of exact
+# names plus a symmetric-delete table: every spelling reachable by deleting up to
+# MAX_EDIT_DISTANCE letters from a name. A misspelled OCR word then finds its
+# candidates with a handful of dictionary probes instead of a scan of the whole
+# lexicon. The compiled index is cached next to the CSV as plain JSON (loading
+# it never runs code, whoever wrote the file), checked against the CSV's hash
+# and rebuilt whenever the CSV changes or the cache does not hold together.
+import csv
+import hashlib
+import itertools
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+LEXICON_PATH = Path(os.getenv("MEDICATION_LEXICON", str(Path(__file__).parent / "data" / "medications.csv")))
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".index.json"
+MAX_EDIT_DISTANCE = 2
+
+# Shorter words only match exactly; fuzzy matches on them are mostly wrong.
+# Words shorter than LONG_WORD_LENGTH may be one edit away, longer ones two.
+MIN_FUZZY_LENGTH = 5
+LONG_WORD_LENGTH = 8
+
+# Remembered lookups (hits and misses) before the memo is cleared
+LOOKUP_MEMO_SIZE = 50000
+
+# Everyday prescription words that happen to sit close to a drug name
+COMMON_WORDS = frozenset("""
+    tablet tablets capsule capsules daily twice times morning evening night
+    before after meals bedtime water food patient doctor clinic hospital take
+    days weeks months hours with without every review avoid alcohol refill
+    signature date name address phone dose doses syrup drops cream apply
+""".split())
+
+
+@dataclass(frozen=True)
+class Medication:
+    name: str  # as written in the lexicon
+    generic: str
+
+
+def _deletes(word, distance):
+    """Every string made by deleting up to `distance` characters from word"""
+    found = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - found
+        found |= frontier
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (transpositions count as one edit), or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class MedicationLexicon:
+    def __init__(self, medications, exact, deletes):
+        self.medications = medications  # list of Medication
+        self.exact = exact  # lowercase name (single or multi-word) -> index
+        self.deletes = deletes  # deletion variant of a single-word name -> tuple of indexes
+        self._memo = {}  # word -> Medication or None; OCR text repeats the same words a lot
+
+    def __len__(self):
+        return len(self.medications)
+
+    @classmethod
+    def from_rows(cls, rows):
+        medications = []
+        exact = {}
+        deletes = {}
+        for name, generic in rows:
+            key = name.strip().lower()
+            if not key or key in exact:
+                continue
+            exact[key] = len(medications)
+            if " " not in key:
+                for variant in _deletes(key, MAX_EDIT_DISTANCE):
+                    deletes.setdefault(variant, []).append(len(medications))
+            medications.append(Medication(name.strip(), generic.strip().lower() or key))
+        return cls(medications, exact, {k: tuple(v) for k, v in deletes.items()})
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls.from_rows((row["name"], row.get("generic") or "") for row in csv.DictReader(f))
+
+    @classmethod
+    def load(cls, path=LEXICON_PATH):
+        """The compiled index for the CSV at `path`, built (and cached) if missing or stale"""
+        path = Path(path)
+        if not path.exists():
+            print(f"Warning: medication lexicon {path} not found; drug names will not be recognised.")
+            return cls([], {}, {})
+
+        source_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        index_path = path.with_suffix(INDEX_SUFFIX)
+        try:
+            index = json.loads(index_path.read_bytes())
+            if index["version"] == INDEX_VERSION and index["source_hash"] == source_hash:
+                return cls._from_index(index)
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            pass
+
+        lexicon = cls.from_csv(path)
+        lexicon.save(index_path, source_hash)
+        return lexicon
+
+    @classmethod
+    def _from_index(cls, index):
+        """A lexicon from a cached index; ValueError (or a lookup error) if it does not hold together"""
+        medications = [Medication(str(name), str(generic)) for name, generic in index["medications"]]
+        exact = {str(key): int(i) for key, i in index["exact"].items()}
+        deletes = {str(key): tuple(int(i) for i in indexes) for key, indexes in index["deletes"].items()}
+        count = len(medications)
+        if any(not 0 <= i < count for i in exact.values()) or \
+                any(not 0 <= i < count for indexes in deletes.values() for i in indexes):
+            raise ValueError("medication index out of range")
+        return cls(medications, exact, deletes)
+
+    def save(self, index_path, source_hash):
+        index = {
+            "version": INDEX_VERSION,
+            "source_hash": source_hash,
+            "medications": [[medication.name, medication.generic] for medication in self.medications],
+            "exact": self.exact,
+            "deletes": self.deletes,
+        }
+        temporary = Path(f"{index_path}.{os.getpid()}.tmp")
+        try:
+            temporary.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+            os.replace(temporary, index_path)
+        except OSError as e:
+            # Read-only installs still work, they just compile on every start
+            print(f"Could not cache the medication index at {index_path}: {e}")
+            temporary.unlink(missing_ok=True)
+
+    def lookup(self, word):
+        """The Medication a word (or space-separated phrase) most likely names, or None"""
+        key = word.lower()
+        index = self.exact.get(key)
+        if index is not None:
+            return self.medications[index]
+        if len(key) < MIN_FUZZY_LENGTH or key in COMMON_WORDS or " " in key:
+            return None
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        if len(self._memo) >= LOOKUP_MEMO_SIZE:
+            self._memo.clear()
+        medication = self._memo[key] = self._fuzzy_lookup(key)
+        return medication
+
+    def _fuzzy_lookup(self, key):
+        """The closest single-word name within the allowed edit distance of key, or None"""
+        limit = 1 if len(key) < LONG_WORD_LENGTH else MAX_EDIT_DISTANCE
+        best = None
+        best_distance = limit + 1
+        candidates = set(itertools.chain.from_iterable(
+            self.deletes.get(variant, ()) for variant in _deletes(key, limit)
+        ))
+        for candidate in sorted(candidates):
+            distance = edit_distance(key, self.medications[candidate].name.lower(), limit)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return self.medications[best] if best is not None else None
+
+
+# Shared lexicon used by rule_based_extractor
+lexicon = MedicationLexicon.load()
@@ -0,0 +1,273 @@
+# metrics.py
+# Request and pipeline instrumentation, exported in the Prometheus text format.
+#
+# MetricsMiddleware records a latency histogram per route (the route's path
+# template, so /jobs/1 and /jobs/2 share one series) and the number of
+# requests in flight. registry.span("name") times a pipeline stage into a
+# per-stage histogram and an in-flight gauge; stages that ran in another
+# process (OCR) report their timings with registry.observe(). Every database
+# statement is timed through engine events as the "db" stage. GET /metrics
+# renders all of it together with the stats dicts of the caches, the LLM
+# gateway and the maintenance scheduler: their keys are counters (exported with
+# a _total suffix) unless the component lists them as gauges.
+#
+# /metrics answers scrapers that send "Authorization: Bearer $METRICS_TOKEN";
+# without a METRICS_TOKEN it only answers requests from the loopback interface.
+#
+# Processes without the web app (the OCR job runner) serve the same page with
+# serve_metrics(), a minimal HTTP listener of their own.
+#
+# With METRICS_ENABLED=0 the middleware, the engine events and /metrics are
+# never installed, and span() returns a shared no-op context manager.
+import asyncio
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+# Upper bounds in seconds; a +Inf bucket is always added
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PREFIX = "mediassist"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NOOP_SPAN = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket..., count above the last bucket, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                bucket = _labels(self.label_names, label_values, 'le="%s"' % _number(bound))
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}  # label values -> current value
+        self._lock = threading.Lock()
+
+    def add(self, label_values, amount):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in snapshot]
+        return lines
+
+
+class _Span:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.registry.stages_in_flight.add((self.stage,), 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.stage_seconds.observe((self.stage,), time.perf_counter() - self.start)
+        self.registry.stages_in_flight.add((self.stage,), -1)
+        return False
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self.request_seconds = Histogram(
+            f"{PREFIX}_http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+        self.requests_in_flight = Gauge(f"{PREFIX}_http_requests_in_flight", "HTTP requests being handled")
+        self.stage_seconds = Histogram(f"{PREFIX}_stage_duration_seconds", "Time spent per pipeline stage", ("stage",))
+        self.stages_in_flight = Gauge(f"{PREFIX}_stages_in_flight", "Pipeline stages running", ("stage",))
+        self._stats = []  # (name, dict or callable returning a dict, keys that are gauges)
+
+    def span(self, stage):
+        """Context manager timing one run of a pipeline stage"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage, seconds):
+        """Record a stage timed elsewhere (e.g. in an OCR worker process)"""
+        if self.enabled:
+            self.stage_seconds.observe((stage,), seconds)
+
+    def add_stats(self, name, stats, gauges=()):
+        """Export a component's stats dict (or a callable returning one) as mediassist_<name>_<key>
+
+        Keys are counters, exported as mediassist_<name>_<key>_total, except the
+        ones named in gauges (current values, e.g. percentiles or the last run's).
+        """
+        self._stats.append((name, stats, frozenset(gauges)))
+
+    def instrument_engine(self, engine):
+        """Time every statement run on a (sync) engine as the "db" stage"""
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop(conn, cursor, statement, parameters, context, executemany):
+            self.stage_seconds.observe(("db",), time.perf_counter() - conn.info["metrics_started"].pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _failed(context):
+            started = context.connection.info.get("metrics_started") if context.connection is not None else None
+            if started:
+                started.pop()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (self.request_seconds, self.requests_in_flight, self.stage_seconds, self.stages_in_flight):
+            lines += metric.render()
+        for name, stats, gauges in self._stats:
+            values = stats() if callable(stats) else stats
+            for metric, key, value in _flatten(f"{PREFIX}_{name}", values):
+                if key in gauges:
+                    lines.append(f"# TYPE {metric} gauge")
+                else:
+                    metric += "_total"
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(prefix, values):
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _flatten(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, key, value
+
+
+def scrape_allowed(authorization, client_host, token=METRICS_TOKEN):
+    """Whether a /metrics request may be answered (see the top of this module)"""
+    if token:
+        return hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode())
+    return client_host in LOOPBACK_HOSTS
+
+
+async def serve_metrics(registry, host, port):
+    """Answer GET /metrics on host:port (same access rules as the app's /metrics); returns the asyncio Server"""
+
+    async def answer(reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target = request_line.split(" ")[:2]
+            headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines)}
+            if method != "GET" or target.partition("?")[0] != "/metrics":
+                code, body = "404 Not Found", b"Not found\n"
+            elif not scrape_allowed(headers.get("authorization"), writer.get_extra_info("peername")[0]):
+                code, body = "403 Forbidden", b"Metrics are not available to this client\n"
+            else:
+                code, body = "200 OK", registry.render().encode()
+            writer.write(f"HTTP/1.1 {code}\r\nContent-Type: {CONTENT_TYPE}\r\nContent-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError, ConnectionError):
+            pass  # not an HTTP request, or the scraper went away
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(answer, host, port)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per route and the requests in flight"""
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500  # the app raised before responding
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.registry.requests_in_flight.add((), 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.registry.request_seconds.observe((scope["method"], route, str(status_code)), time.perf_counter() - start)
+            self.registry.requests_in_flight.add((), -1)
+
+
+# Shared registry for the application
+registry = MetricsRegistry()
@@ -2,48 +2,164 @@
 import cv2
 import pytesseract
 import numpy as np
+import os
 import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
 
-def preprocess_image(image_path):
-    # Read image
-    img = cv2.imread(image_path)
-    
-    # Check if image was loaded successfully
-    if img is None:
-        raise ValueError(f"Could not load image from path: {image_path}")
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+
+@dataclass
+class OcrResult:
+    raw_text: str
+    cleaned_text: str
+    word_confidences: List[Tuple[str, float]] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def mean_confidence(self):
+        if not self.word_confidences:
+            return 0.0
+        return sum(conf for _, conf in self.word_confidences) / len(self.word_confidences)
+
+# Larger images are downscaled before OCR; ~2400px on the long side is
+# plenty for Tesseract on a phone photo of an A4/A5 prescription.
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "2400"))
+
+# Skew is estimated on a copy no larger than this
+DESKEW_SAMPLE_DIMENSION = 800
+
+# Largest skew searched for, in degrees
+DESKEW_MAX_ANGLE = 15.0
+
+# Rotations smaller than this (degrees) are not worth a full-size warp
+DESKEW_MIN_ANGLE = float(os.getenv("DESKEW_MIN_ANGLE", "0.5"))
+
+def load_grayscale(source):
+    """Decode an image file path, or an in-memory buffer (bytes, memoryview, mmap), to grayscale"""
+    # Read image straight into grayscale; the colour planes are never used
+    if isinstance(source, (str, os.PathLike)):
+        gray = cv2.imread(str(source), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError(f"Could not load image from path: {source}")
+    else:
+        gray = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise ValueError("Could not decode image data")
+    return gray
+
+def preprocess_image(source):
+    gray = load_grayscale(source)
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = normalize_resolution(gray)
     
     # Apply threshold to get binary image
     thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
     
-    # Optional: Deskew image
-    coords = np.column_stack(np.where(thresh > 0))
-    angle = cv2.minAreaRect(coords)[-1]
+    # Deskew image
+    angle = estimate_skew(thresh)
+    if abs(angle) < DESKEW_MIN_ANGLE:
+        return thresh
     
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-        
-    (h, w) = img.shape[:2]
+    (h, w) = thresh.shape[:2]
     center = (w // 2, h // 2)
-    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    M = cv2.getRotationMatrix2D(center, -angle, 1.0)
     rotated = cv2.warpAffine(thresh, M, (w, h), 
-                            flags=cv2.INTER_CUBIC, 
-                            borderMode=cv2.BORDER_REPLICATE)
+                            flags=cv2.INTER_LINEAR, 
+                            borderMode=cv2.BORDER_CONSTANT,
+                            borderValue=255)
     
     return rotated
 
-def extract_text(image_path):
-    processed_img = preprocess_image(image_path)
+def normalize_resolution(gray, max_dimension=OCR_MAX_DIMENSION):
+    """Downscale so the longest side is at most max_dimension pixels"""
+    (h, w) = gray.shape[:2]
+    scale = max_dimension / max(h, w)
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+
+def estimate_skew(thresh, max_angle=DESKEW_MAX_ANGLE):
+    """Skew of the text in a binarized (dark text on light) image, in degrees counter-clockwise"""
+    (h, w) = thresh.shape[:2]
+    scale = DESKEW_SAMPLE_DIMENSION / max(h, w)
+    if scale < 1:
+        thresh = cv2.resize(thresh, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    
+    # Coordinates of the text pixels (the dark ones), as an (N, 2) float array
+    ink = cv2.findNonZero(cv2.bitwise_not(thresh))
+    if ink is None or len(ink) < 50:
+        return 0.0
+    ink = ink.reshape(-1, 2).astype(np.float32)
+    ink -= ink.mean(axis=0)
     
-    # OCR using Tesseract
-    custom_config = r'--oem 3 --psm 6'
-    text = pytesseract.image_to_string(processed_img, config=custom_config)
+    # Projection profile search: when the page is straight, the row histogram of
+    # text pixels has sharp peaks (lines) and empty valleys, so its variance is
+    # highest. Search coarsely, then refine around the best candidate.
+    coarse = np.arange(-max_angle, max_angle + 1e-6, 1.0)
+    best = _best_projection_angle(ink, coarse)
+    fine = np.arange(best - 1.0, best + 1.0 + 1e-6, 0.1)
+    return float(_best_projection_angle(ink, fine))
+
+def _best_projection_angle(ink, angles):
+    theta = np.deg2rad(angles).astype(np.float32)
+    # Row of every point after rotating by each candidate angle, shape (len(angles), N)
+    rows = np.outer(np.sin(theta), ink[:, 0]) + np.outer(np.cos(theta), ink[:, 1])
+    rows = np.rint(rows - rows.min(axis=1, keepdims=True)).astype(np.int32)
     
-    return clean_ocr_text(text)
+    length = int(rows.max()) + 1
+    offsets = (np.arange(len(angles), dtype=np.int32) * length)[:, None]
+    profiles = np.bincount((rows + offsets).ravel(), minlength=len(angles) * length).reshape(len(angles), length)
+    scores = profiles.astype(np.float64).var(axis=1)
+    return angles[int(np.argmax(scores))]
+
+def extract_text(source):
+    return extract_text_with_details(source).cleaned_text
+
+def extract_text_with_details(source):
+    """Run Tesseract once and return raw text, cleaned text and word confidences"""
+    timings = {}
+
+    start = time.perf_counter()
+    processed_img = preprocess_image(source)
+    timings['preprocess_image'] = time.perf_counter() - start
+
+    # A single image_to_data call gives both the words and their confidences
+    start = time.perf_counter()
+    data = pytesseract.image_to_data(processed_img, config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT)
+    timings['tesseract'] = time.perf_counter() - start
+
+    raw_text, word_confidences = _assemble_text(data)
+
+    start = time.perf_counter()
+    cleaned_text = clean_ocr_text(raw_text)
+    timings['clean_ocr_text'] = time.perf_counter() - start
+
+    return OcrResult(raw_text, cleaned_text, word_confidences, timings)
+
+def _assemble_text(data):
+    """Rebuild Tesseract's line layout from image_to_data output"""
+    lines = []
+    word_confidences = []
+    current_key = None
+
+    for i, word in enumerate(data['text']):
+        word = word.strip()
+        if not word:
+            continue
+
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        if key != current_key:
+            lines.append([])
+            current_key = key
+        lines[-1].append(word)
+
+        conf = float(data['conf'][i])
+        if conf >= 0:
+            word_confidences.append((word, conf))
+
+    return "\n".join(" ".join(line) for line in lines), word_confidences
 
 def clean_ocr_text(text):
     # Remove extra whitespace
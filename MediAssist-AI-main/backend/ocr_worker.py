@@ -0,0 +1,84 @@
+# ocr_worker.py
+# Dedicated prescription job runner, outside the web workers.
+#
+# Drains the jobs table with JOB_WORKERS concurrent jobs and an OCR pool of
+# OCR_PROCESSES processes, so the CPU-bound OCR no longer competes with
+# request handling and N web workers don't each start a CPU-sized pool. The
+# web workers run with JOB_WORKERS=0 and only enqueue; an idle runner picks
+# new jobs up within JOB_POLL_INTERVAL. gunicorn.conf.py starts and supervises
+# one runner next to the web workers; it can also run on its own, e.g. in a
+# second container sharing the database and the uploads directory:
+#
+#     python ocr_worker.py
+#
+# The OCR, LLM and database timings of the jobs are recorded in this process,
+# so it serves its own Prometheus page at
+# http://RUNNER_METRICS_HOST:RUNNER_METRICS_PORT/metrics (same format and
+# METRICS_TOKEN rules as the web workers' /metrics); scrape it next to the
+# web port. RUNNER_METRICS_PORT=0 turns the listener off.
+import asyncio
+import os
+import signal
+
+from dotenv import load_dotenv
+
+# Load .env before the application modules read their settings
+load_dotenv()
+
+import ai_integration  # noqa: E402
+import database  # noqa: E402
+import job_queue  # noqa: E402
+import llm_gateway  # noqa: E402
+import metrics  # noqa: E402
+from result_cache import cache as result_cache  # noqa: E402
+
+RUNNER_METRICS_HOST = os.getenv("RUNNER_METRICS_HOST", "127.0.0.1")
+RUNNER_METRICS_PORT = int(os.getenv("RUNNER_METRICS_PORT", "9101"))
+
+
+async def start_metrics():
+    """Record the runner's database and component stats and serve them; None when turned off"""
+    if not metrics.registry.enabled or RUNNER_METRICS_PORT <= 0:
+        return None
+    for instrumented in {database.engine, database.read_engine}:
+        metrics.registry.instrument_engine(instrumented)
+    metrics.registry.add_stats("llm_gateway", llm_gateway.gateway.stats)
+    metrics.registry.add_stats("prescription_tier", ai_integration.tier_stats.snapshot, gauges=ai_integration.TierStats.PERCENTILES)
+    metrics.registry.add_stats("result_cache", result_cache.stats)
+    try:
+        server = await metrics.serve_metrics(metrics.registry, RUNNER_METRICS_HOST, RUNNER_METRICS_PORT)
+    except OSError as e:
+        # Jobs matter more than their metrics: keep running, just unscraped
+        print(f"OCR worker metrics unavailable on {RUNNER_METRICS_HOST}:{RUNNER_METRICS_PORT}: {e}")
+        return None
+    print(f"OCR worker metrics at http://{RUNNER_METRICS_HOST}:{RUNNER_METRICS_PORT}/metrics")
+    return server
+
+
+async def run():
+    queue = job_queue.queue
+    if queue.workers <= 0:  # JOB_WORKERS=0 is meant for the web workers
+        queue.workers = 1
+    database.create_db_and_tables()
+    metrics_server = await start_metrics()
+    await queue.start()
+    await queue.warm_up()
+    print(f"OCR worker: {queue.workers} concurrent jobs, {queue.ocr_processes} OCR processes")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    try:
+        await stopping.wait()
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        await queue.stop()
+        await llm_gateway.gateway.aclose()
+        await database.dispose_async_engines()
+    print("OCR worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+# password_hashing.py
+# PBKDF2 password hashing with versioned parameters, run off the event loop.
+#
+# Hashes are stored as 'pbkdf2_sha256$<iterations>$<salt>$<hex digest>', so the
+# iteration count can be raised at any time: old hashes keep verifying and are
+# transparently re-hashed on the next successful login. The original
+# '<hex digest>:<salt>' format (100,000 iterations) is still accepted.
+#
+# Hashing runs in a dedicated, bounded thread pool (hashlib releases the GIL
+# while deriving keys), so a login storm cannot take over the threads that
+# serve every other endpoint.
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+ALGORITHM = "pbkdf2_sha256"
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "100000"))
+
+# Threads deriving keys at once, and hashes allowed in flight (running or queued)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", str(4 * PASSWORD_HASH_WORKERS)))
+
+LEGACY_ITERATIONS = 100000
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+# Verified against when the username does not exist, so both cases take as long
+_DUMMY_HASH = None
+
+
+def _derive(password, salt, iterations):
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), iterations).hex()
+
+
+def hash_password_sync(password, iterations=None):
+    iterations = iterations or PASSWORD_HASH_ITERATIONS
+    salt = secrets.token_hex(32)
+    return f"{ALGORITHM}${iterations}${salt}${_derive(password, salt, iterations)}"
+
+
+def _parse(stored_hash):
+    """(iterations, salt, digest) of a stored hash in either format"""
+    if stored_hash.startswith(ALGORITHM + "$"):
+        _, iterations, salt, digest = stored_hash.split("$")
+        return int(iterations), salt, digest
+    digest, salt = stored_hash.split(":")
+    return LEGACY_ITERATIONS, salt, digest
+
+
+def verify_password_sync(password, stored_hash):
+    try:
+        iterations, salt, digest = _parse(stored_hash)
+    except (AttributeError, ValueError):
+        return False
+    return hmac.compare_digest(_derive(password, salt, iterations), digest)
+
+
+def needs_rehash(stored_hash):
+    """True for legacy hashes and hashes made with a different iteration count"""
+    try:
+        iterations, _, _ = _parse(stored_hash)
+    except (AttributeError, ValueError):
+        return True
+    return not stored_hash.startswith(ALGORITHM + "$") or iterations != PASSWORD_HASH_ITERATIONS
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(PASSWORD_HASH_CONCURRENCY)
+    async with semaphore:
+        return await loop.run_in_executor(_executor, fn, *args)
+
+
+async def hash_password(password):
+    return await _run(hash_password_sync, password)
+
+
+async def verify_password(password, stored_hash):
+    return await _run(verify_password_sync, password, stored_hash)
+
+
+async def verify_dummy(password):
+    """Burn the same time as a real verification, for unknown usernames"""
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = await hash_password(secrets.token_hex(16))
+    await verify_password(password, _DUMMY_HASH)
+    return False
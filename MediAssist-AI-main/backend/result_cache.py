@@ -0,0 +1,162 @@
+# result_cache.py
+# Content-addressed cache for upload processing results.
+#
+# Results are keyed by the SHA-256 of the uploaded bytes, so re-uploading the
+# same prescription photo or voice note skips OCR, Whisper and the chat
+# completion. Two tiers: a per-process LRU in memory and a persistent tier in
+# the `result_cache` table that survives restarts.
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal, CachedResult
+
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "512"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Persistent tier eviction runs once every this many writes
+EVICT_EVERY = 64
+
+
+class ResultCache:
+    def __init__(self, memory_entries=RESULT_CACHE_MEMORY_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(kind, content_hash):
+        return f"{kind}:{content_hash}"
+
+    def get(self, kind, content_hash):
+        """Return the cached result dict, or None"""
+        key = self.make_key(kind, content_hash)
+        now = datetime.utcnow()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return dict(value)
+                del self._memory[key]
+
+        value, expires_at = self._get_persistent(key, now)
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, value, expires_at)
+        return dict(value)
+
+    def put(self, kind, content_hash, value):
+        key = self.make_key(kind, content_hash)
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+
+        with self._lock:
+            self._remember(key, dict(value), expires_at)
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+
+        payload = json.dumps(value)
+        db = SessionLocal()
+        try:
+            for attempt in range(2):
+                db.merge(CachedResult(
+                    key=key,
+                    payload=payload,
+                    size_bytes=len(payload.encode()),
+                    created_at=now,
+                    last_accessed=now
+                ))
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Another request stored the same result between merge's lookup and insert;
+                    # the retry finds that row and updates it
+                    db.rollback()
+                    if attempt:
+                        raise
+        finally:
+            db.close()
+
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least recently used rows until under max_bytes"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+            removed = db.query(CachedResult).filter(CachedResult.created_at < cutoff).delete(synchronize_session=False)
+
+            total = db.query(func.coalesce(func.sum(CachedResult.size_bytes), 0)).scalar()
+            if total > self.max_bytes:
+                rows = db.query(CachedResult.key, CachedResult.size_bytes).order_by(CachedResult.last_accessed).all()
+                doomed = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append(key)
+                    total -= size
+                for i in range(0, len(doomed), 500):
+                    db.query(CachedResult).filter(CachedResult.key.in_(doomed[i:i + 500])).delete(synchronize_session=False)
+                removed += len(doomed)
+
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            self.stats["evictions"] += removed
+        return removed
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key, value, expires_at):
+        # Caller holds self._lock
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_persistent(self, key, now):
+        db = SessionLocal()
+        try:
+            row = db.query(CachedResult).filter(CachedResult.key == key).first()
+            if row is None:
+                return None, None
+
+            expires_at = row.created_at + timedelta(seconds=self.ttl)
+            if expires_at <= now:
+                db.delete(row)
+                db.commit()
+                return None, None
+
+            row.last_accessed = now  # type: ignore[assignment]
+            value = json.loads(row.payload)
+            db.commit()
+            return value, expires_at
+        finally:
+            db.close()
+
+
+# Shared cache for the application
+cache = ResultCache()
@@ -1,42 +1,205 @@
 # rule_based_extractor.py
+# Rule-based prescription extraction, used when GPT is unavailable.
+#
+# The text is tokenized in a single left-to-right pass of one precompiled
+# pattern. Its alternatives only use possessive quantifiers (Python 3.11+) over
+# disjoint character classes, so no token is ever re-scanned and extraction stays
+# linear in the input size, even on multi-kilobyte OCR noise. Drug names are
+# recognised during the same pass by looking each word up in the medication
+# lexicon, which tolerates the usual OCR misspellings.
 import re
 
+from medication_lexicon import lexicon
+
+_TOKEN_RE = re.compile(r"""
+      (?P<frequency>
+          \b(?: (?: (?:\d++|one|two|three|four) \s*+ times?+ | once | twice ) \s*+ (?: (?:a|/|per) \s*+ day | daily )
+              | daily
+              | every \s*+ \d++ \s*+ hours?+
+              | BID | TID | QID )\b )
+    | (?P<duration> \b(?:for|x) \s*+ (?P<duration_value> \d++ \s*+ (?:days|weeks|months)) \b )
+    | (?P<dosage>
+          (?P<strength> \d++ (?:\.\d++)?+ \s*+ (?:mcg|mg|ml|g) ) \b
+          (?: \s*+ (?:tablets?+|caps?+|capsules?+) \b )?+ )
+    | (?P<word> [A-Za-z]++ )
+    | (?P<number> \d++ )
+    | (?P<separator> [:\\-] )
+    | (?P<stop> \. | \n )
+""", re.IGNORECASE | re.VERBOSE)
+
+_SIMPLE_FIELDS = ('medication_name', 'dosage', 'frequency', 'duration')
+
+# Words that carry no dosing information, so leaving them out loses nothing
+_FILLER_WORDS = frozenset((
+    "rx", "sig", "take", "tab", "tabs", "tablet", "tablets", "cap", "caps", "capsule", "capsules",
+    "po", "by", "mouth", "oral", "orally", "and", "a", "an", "of",
+))
+
+# Telling the patient to stop, avoid or swap a drug is exactly what the
+# formatted instructions cannot express, so such prescriptions never score
+# above this (well under the local tier's threshold). Nor do ones where any
+# drug lacks its own strength or frequency, or where the text says anything
+# the rules did not read ("2 tablets", "then 20mg", "except Sunday", "with meals")
+UNCERTAIN_CONFIDENCE_CAP = 0.5
+_NEGATION_RE = re.compile(
+    r"\b(?:not|don'?t|never|no\s+longer|stop(?:ped)?|avoid|discontinue[ds]?|hold|instead\s+of|replace[ds]?)\b",
+    re.IGNORECASE)
+
+
 def extract_medication_info(text):
-    # Common medication patterns
-    patterns = {
-        'medication_name': r'([A-Z][a-z]+)(?:\s+\d+[mgMG]+)?',
-        'dosage': r'(\d+\s*[mgMG]+\s*(?:tablet|cap|mg|mL|gram|g))',
-        'frequency': r'(\d+\s*times?\s*(?:a|\/)\s*day|daily|every\s*\d+\s*hours?|BID|TID|QID)',
-        'duration': r'(?:for|x)\s*(\d+\s*(?:days|weeks|months))'
-    }
-    
+    medications = []  # {'name', 'generic', 'strength', 'frequency', 'duration'} per drug mention, in order
+    dosages = []
+    frequencies = []
+    durations = []
+    detailed = []
+
+    # A "Medication Name Strength: Instructions" entry is a run of words naming
+    # a known drug (optionally followed by a strength) right before a separator;
+    # its instructions run to the end of the sentence or line. One entry per sentence.
+    name_start = None  # start of the current run of words, if any
+    run_medication = None  # the drug named in the current run
+    previous_word = None  # the word just before this one in the run, for two-word names
+    previous_matched = False  # whether previous_word named a drug by itself
+    strength = None
+    last_end = 0
+    instructions_start = None
+    entry = None
+    # Words, numbers and dosing fields the result accounts for, and the ones it leaves out
+    parsed = 0
+    unparsed = []
+    previous_unparsed = False  # whether previous_word went to unparsed
+
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+        adjacent = start == last_end or text[last_end:start].isspace()
+        last_end = end
+
+        if kind == 'word':
+            word = match.group()
+            if name_start is None or not adjacent or strength is not None:
+                name_start = start
+                run_medication = previous_word = None
+                previous_matched = False
+                strength = None
+            medication = lexicon.lookup(f"{previous_word} {word}") if previous_word else None
+            if medication is not None and previous_matched:
+                medications.pop()  # "Insulin" then "Insulin Glargine": keep the longer name
+            if medication is not None and previous_unparsed:
+                unparsed.pop()  # the first word of a two-word name
+                parsed += 1
+            medication = medication or lexicon.lookup(word)
+            if medication is not None:
+                medications.append({'name': medication.name, 'generic': medication.generic, 'strength': None,
+                                    'frequency': None, 'duration': None})
+                run_medication = medication
+            previous_unparsed = not (medication is not None or instructions_start is not None
+                                     or word.lower() in _FILLER_WORDS)
+            if previous_unparsed:
+                unparsed.append(word)
+            else:
+                parsed += 1
+            previous_word = word
+            previous_matched = medication is not None
+            continue
+
+        # Tokens inside an entry's instructions are kept verbatim; the others
+        # count as read only when they are attached to a drug
+        used = instructions_start is not None
+
+        if kind == 'dosage':
+            dosages.append(match.group())
+            if run_medication is not None and adjacent and strength is None and medications[-1]['strength'] is None:
+                medications[-1]['strength'] = match.group('strength')
+                used = True
+        elif kind == 'frequency':
+            frequencies.append(match.group())
+            if medications and medications[-1]['frequency'] is None:
+                medications[-1]['frequency'] = match.group()
+                used = True
+        elif kind == 'duration':
+            durations.append(match.group('duration_value'))
+            if medications and medications[-1]['duration'] is None:
+                medications[-1]['duration'] = match.group('duration_value')
+                used = True
+        if kind not in ('separator', 'stop'):
+            if used:
+                parsed += 1
+            else:
+                unparsed.append(match.group())
+
+        if instructions_start is not None:
+            # Inside an entry's instructions: only the end of the sentence matters
+            if kind == 'stop':
+                _finish_entry(detailed, entry, text[instructions_start:start])
+                instructions_start = entry = None
+            name_start = None
+        elif kind == 'dosage' and name_start is not None and adjacent and strength is None:
+            strength = match.group('strength')
+        elif kind == 'separator' and run_medication is not None and adjacent:
+            entry = {'medication': run_medication.name, 'strength': strength or 'N/A'}
+            instructions_start = end
+            name_start = None
+        else:
+            name_start = None
+
+    if instructions_start is not None:
+        _finish_entry(detailed, entry, text[instructions_start:])
+
     extracted_info = {}
-    
-    for key, pattern in patterns.items():
-        matches = re.findall(pattern, text, re.IGNORECASE)
+    medication_names = [medication['name'] for medication in medications]
+    for key, matches in zip(_SIMPLE_FIELDS, (medication_names, dosages, frequencies, durations)):
         if matches:
             extracted_info[key] = matches[0] if len(matches) == 1 else matches
-    
-    # Specialized extraction for common formats
-    # Pattern: Medication Name Strength: Instructions
-    detailed_pattern = r'([A-Za-z\s]+)\s*(\d+\s*[mgMG]+)?\s*[:\\-]\s*([^\.]+)'
-    detailed_matches = re.findall(detailed_pattern, text)
-    
-    if detailed_matches:
-        extracted_info['detailed'] = []
-        for match in detailed_matches:
-            med_name, strength, instructions = match
-            extracted_info['detailed'].append({
-                'medication': med_name.strip(),
-                'strength': strength.strip() if strength else 'N/A',
-                'instructions': instructions.strip()
-            })
-    
+    if medications:
+        for medication in medications:
+            medication['strength'] = medication['strength'] or 'N/A'
+            medication['frequency'] = medication['frequency'] or 'N/A'
+            medication['duration'] = medication['duration'] or 'N/A'
+        extracted_info['medications'] = medications
+        extracted_info['coverage'] = round(parsed / (parsed + len(unparsed)), 3)
+    if unparsed:
+        extracted_info['unparsed'] = unparsed
+    if detailed:
+        extracted_info['detailed'] = detailed
     return extracted_info
 
+
+def _finish_entry(detailed, entry, instructions):
+    instructions = instructions.strip()
+    if instructions:
+        entry['instructions'] = instructions
+        detailed.append(entry)
+
+
+def extraction_confidence(text, extracted_info):
+    """How far extract_medication_info's result for text can be trusted on its own, from 0.0 to 1.0"""
+    medications = extracted_info.get('medications')
+    if not medications:
+        return 0.0
+    lowered = text.lower()
+
+    score = 0.0
+    for medication in medications:
+        score += 0.5
+        if medication['strength'] != 'N/A':
+            score += 0.25
+        if medication['name'].lower() in lowered:
+            score += 0.15  # spelled as in the lexicon, not a fuzzy OCR match
+        if medication['frequency'] != 'N/A':
+            score += 0.1
+    score /= len(medications)
+
+    score *= extracted_info['coverage']
+    if _NEGATION_RE.search(text) or 'unparsed' in extracted_info \
+            or any('N/A' in (m['strength'], m['frequency']) for m in medications):
+        score = min(score, UNCERTAIN_CONFIDENCE_CAP)
+    return round(score, 3)
+
+
 def format_patient_instructions(extracted_info):
     instructions = []
-    
+
     if 'detailed' in extracted_info:
         for med in extracted_info['detailed']:
             instruction = f"Take {med['medication']}"
@@ -44,16 +207,23 @@ def format_patient_instructions(extracted_info):
                 instruction += f" ({med['strength']})"
             instruction += f" as directed: {med['instructions']}"
             instructions.append(instruction)
+    elif 'medications' in extracted_info:
+        # One line per drug, so each dose stays with its own drug
+        for med in extracted_info['medications']:
+            instruction = f"Take {med['name']}"
+            if med['strength'] != 'N/A':
+                instruction += f" ({med['strength']})"
+            if med['frequency'] != 'N/A':
+                instruction += f" {med['frequency']}"
+            if med['duration'] != 'N/A':
+                instruction += f" for {med['duration']}"
+            instructions.append(instruction)
     else:
-        if 'medication_name' in extracted_info:
-            instructions.append(f"Medication: {extracted_info['medication_name']}")
-        if 'dosage' in extracted_info:
-            instructions.append(f"Dosage: {extracted_info['dosage']}")
-        if 'frequency' in extracted_info:
-            instructions.append(f"Frequency: {extracted_info['frequency']}")
-        if 'duration' in extracted_info:
-            instructions.append(f"Duration: {extracted_info['duration']}")
-    
+        for key, label in zip(_SIMPLE_FIELDS, ('Medication', 'Dosage', 'Frequency', 'Duration')):
+            if key in extracted_info:
+                value = extracted_info[key]
+                instructions.append(f"{label}: {', '.join(value) if isinstance(value, list) else value}")
+
     return instructions
 
 # Test function
@@ -63,7 +233,7 @@ if __name__ == "__main__":
         "Lipitor 20mg - 1 tablet daily at bedtime",
         "Rx: Metformin 500mg BID with meals"
     ]
-    
+
     for i, prescription in enumerate(test_prescriptions, 1):
         print(f"Prescription {i}: {prescription}")
         extracted = extract_medication_info(prescription)
@@ -71,4 +241,4 @@ if __name__ == "__main__":
         print("Extracted instructions:")
         for instruction in instructions:
             print(f" - {instruction}")
-        print()
\ No newline at end of file
+        print()
@@ -0,0 +1,175 @@
+# rule_based_summarizer.py
+# Rule-based doctor summary of patient-reported symptoms, used when GPT is
+# unavailable.
+#
+# Finds the symptoms a patient mentions, in their own words ("throwing up",
+# "short of breath"), which of them are denied ("no fever", "I don't have a
+# cough") or belong to someone else ("my daughter has a rash"), how long the complaint has lasted and how bad it is, and writes
+# them as one sentence for the doctor. Every phrase is matched by a single
+# precompiled alternation, longest phrases first, in one pass over the text.
+import re
+
+# Symptom as written in the summary -> phrases patients use for it
+SYMPTOMS = {
+    "headache": ("headache", "headaches", "head hurts", "head is hurting", "head pain", "migraine"),
+    "fever": ("fever", "feverish", "high temperature", "running a temperature", "febrile"),
+    "cough": ("cough", "coughing", "coughs"),
+    "sore throat": ("sore throat", "throat hurts", "throat pain", "scratchy throat"),
+    "runny nose": ("runny nose", "running nose", "nose is running"),
+    "nasal congestion": ("stuffy nose", "blocked nose", "congestion", "congested"),
+    "shortness of breath": ("shortness of breath", "short of breath", "breathless", "hard to breathe",
+                            "difficulty breathing", "trouble breathing"),
+    "chest pain": ("chest pain", "chest hurts", "pain in my chest", "chest tightness", "tight chest"),
+    "nausea": ("nausea", "nauseous", "nauseated", "feel sick", "feeling sick"),
+    "vomiting": ("vomiting", "vomited", "throwing up", "threw up"),
+    "diarrhea": ("diarrhea", "diarrhoea", "loose stools", "loose motions"),
+    "abdominal pain": ("abdominal pain", "stomach ache", "stomachache", "stomach pain", "stomach hurts",
+                       "belly pain", "tummy ache", "cramps"),
+    "dizziness": ("dizziness", "dizzy", "lightheaded", "light headed", "vertigo"),
+    "fatigue": ("fatigue", "fatigued", "tired", "tiredness", "exhausted", "no energy", "weakness"),
+    "body aches": ("body aches", "body ache", "muscle pain", "muscle aches", "sore muscles", "aching"),
+    "back pain": ("back pain", "backache", "back hurts"),
+    "joint pain": ("joint pain", "joints hurt", "painful joints", "knee pain"),
+    "chills": ("chills", "shivering", "shivers"),
+    "rash": ("rash", "hives", "spots on my skin"),
+    "itching": ("itching", "itchy"),
+    "loss of appetite": ("loss of appetite", "no appetite", "not hungry"),
+    "insomnia": ("insomnia", "can't sleep", "cannot sleep", "trouble sleeping"),
+    "night sweats": ("night sweats", "sweating at night"),
+    "palpitations": ("palpitations", "heart racing", "racing heart", "heart pounding"),
+    "ear pain": ("ear pain", "earache", "ear hurts"),
+    "sneezing": ("sneezing", "sneezes"),
+    "painful urination": ("painful urination", "burning urination", "burns when i pee", "burning when i pee"),
+    "swelling": ("swelling", "swollen"),
+    "anxiety": ("anxiety", "anxious", "panic attacks"),
+}
+
+_PHRASES = {phrase: symptom for symptom, phrases in SYMPTOMS.items() for phrase in phrases}
+_SYMPTOM_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(phrase) for phrase in sorted(_PHRASES, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE
+)
+
+# A symptom is denied when one of these words comes shortly before it in the same clause
+_NEGATION_RE = re.compile(r"\b(?:no|not|never|without|denies|deny|don't|dont|didn't|haven't|hasn't|isn't|aren't)\b",
+                          re.IGNORECASE)
+_CLAUSE_BREAK_RE = re.compile(r"[.;!?,]|\bbut\b|\bhowever\b|\bthough\b", re.IGNORECASE)
+NEGATION_WINDOW_WORDS = 4
+NEGATION_WINDOW_CHARS = 80
+
+# Whoever was mentioned last in the clause before a symptom has it: the patient
+# ("I have a fever") or someone else ("my son has a fever", "he has a fever")
+_SUBJECT_RE = re.compile(r"""
+      (?P<self> \b(?:i|i'm|im|i've|ive|i'd|me|myself)\b )
+    | (?P<other> \b(?:(?:my|our|his|her|their) \s+
+          (?:daughter|son|child|kid|baby|wife|husband|partner|mother|mom|mum|father|dad|brother|sister
+            |grandmother|grandma|grandfather|grandpa|aunt|uncle|cousin|friend|neighbou?r|colleague|coworker)s?
+        | he|she|he's|she's|him)\b )
+""", re.IGNORECASE | re.VERBOSE)
+
+_NUMBER_WORDS = {
+    "a": "1", "an": "1", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+    "seven": "7", "eight": "8", "nine": "9", "ten": "10", "a few": "a few", "a couple of": "2", "couple of": "2",
+}
+_DURATION_RE = re.compile(r"""
+      \b(?:for|over) \s+ (?:the \s+ )?(?:past \s+ |last \s+ )?
+        (?P<count> \d+ | a \s+ few | a \s+ couple \s+ of | couple \s+ of | an? | one | two | three | four | five
+                   | six | seven | eight | nine | ten )
+        \s+ (?P<unit> hours? | days? | weeks? | months? | years? ) \b
+    | \b(?P<since> since \s+ (?:yesterday | last \s+ \w+ | this \s+ (?:morning|afternoon|evening|week)
+                   | monday | tuesday | wednesday | thursday | friday | saturday | sunday | \d+ \s+ days? \s+ ago)) \b
+""", re.IGNORECASE | re.VERBOSE)
+
+_SEVERITY = (
+    ("severe", re.compile(r"\b(?:severe|severely|terrible|unbearable|excruciating|worst|really bad|very bad|intense)\b",
+                          re.IGNORECASE)),
+    ("moderate", re.compile(r"\bmoderate\b", re.IGNORECASE)),
+    ("mild", re.compile(r"\b(?:mild|mildly|slight|slightly|a little|a bit)\b", re.IGNORECASE)),
+)
+
+# Words of the transcript quoted when no symptom is recognised
+QUOTE_WORDS = 30
+
+
+def extract_symptoms(text):
+    """{'reported': [...], 'denied': [...], 'duration': str or None, 'severity': str or None}"""
+    reported, denied = [], []
+    for match in _SYMPTOM_RE.finditer(text):
+        symptom = _PHRASES[match.group(0).lower()]
+        clause = _clause_before(text, match.start())
+        if _is_someone_elses(clause):
+            continue
+        target = denied if _is_negated(clause) else reported
+        if symptom not in reported and symptom not in denied:
+            target.append(symptom)
+
+    duration = None
+    match = _DURATION_RE.search(text)
+    if match:
+        if match.group("since"):
+            duration = " ".join(match.group("since").lower().split())
+        else:
+            count = " ".join(match.group("count").lower().split())
+            count = _NUMBER_WORDS.get(count, count)
+            unit = match.group("unit").lower().rstrip("s")
+            duration = f"for {count} {unit}" + ("" if count == "1" else "s")
+
+    severity = next((level for level, pattern in _SEVERITY if pattern.search(text)), None)
+    return {"reported": reported, "denied": denied, "duration": duration, "severity": severity}
+
+
+def _clause_before(text, start):
+    # Only the words just before the symptom matter, so look at a bounded window
+    return _CLAUSE_BREAK_RE.split(text[max(0, start - NEGATION_WINDOW_CHARS):start])[-1]
+
+
+def _is_negated(clause):
+    return bool(_NEGATION_RE.search(" ".join(clause.split()[-NEGATION_WINDOW_WORDS:])))
+
+
+def _is_someone_elses(clause):
+    subjects = list(_SUBJECT_RE.finditer(clause))
+    return bool(subjects) and subjects[-1].lastgroup == "other"
+
+
+def _join(items):
+    return items[0] if len(items) == 1 else ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def summarize_symptoms(text):
+    """One sentence for the doctor describing the symptoms in a transcript"""
+    text = (text or "").strip()
+    if not text:
+        return "No symptoms described."
+
+    found = extract_symptoms(text)
+    if not found["reported"]:
+        if found["denied"]:
+            return f"Patient denies {_join(found['denied'])}."
+        words = text.split()
+        quote = " ".join(words[:QUOTE_WORDS]) + ("..." if len(words) > QUOTE_WORDS else "")
+        return f'Patient reports: "{quote}"'
+
+    summary = f"Patient reports {_join(found['reported'])}"
+    if found["duration"]:
+        summary += f" {found['duration']}"
+    if found["severity"]:
+        summary += f", described as {found['severity']}"
+    if found["denied"]:
+        summary += f"; denies {_join(found['denied'])}"
+    return summary + "."
+
+
+# Test function
+if __name__ == "__main__":
+    test_transcripts = [
+        "I have had a headache and a mild fever for three days",
+        "I've been throwing up since yesterday and my stomach hurts really bad, but no fever",
+        "I feel short of breath when I climb stairs. I don't have a cough.",
+        "Can you call me back about my appointment?",
+    ]
+
+    for i, transcript in enumerate(test_transcripts, 1):
+        print(f"Transcript {i}: {transcript}")
+        print(f" - {summarize_symptoms(transcript)}")
+        print()
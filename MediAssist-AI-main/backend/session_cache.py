@@ -0,0 +1,255 @@
+# session_cache.py
+# In-process TTL + LRU cache of session token -> user snapshot.
+#
+# get_current_user runs on every authenticated request; with the cache a
+# polling client costs one dictionary lookup instead of a database round trip.
+# Entries live at most SESSION_CACHE_TTL seconds (and never past the session's
+# own expiry), so a session revoked on another host is honoured within that
+# window.
+#
+# The worker processes of one host share revocations through RevocationLog, a
+# ring of recent revocations in a small memory-mapped file: a logout handled
+# by one worker is appended there, and every other worker drops the token from
+# its cache on its next lookup. Noticing that nothing changed is a single
+# 8-byte read of shared memory. Tokens are stored as BLAKE2b digests.
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no shared log, revocations stay per process
+    fcntl = None
+
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+
+# File shared by the workers of one host; empty to disable
+SESSION_REVOCATION_LOG = os.getenv("SESSION_REVOCATION_LOG", "session_revocations.bin")
+
+# Revocations kept in the ring; a worker further behind than this clears its cache
+REVOCATION_LOG_SLOTS = 4096
+
+# How long an applied revocation still blocks put() of the same token: covers
+# a lookup that read the session from the database just before it was revoked
+RECENT_REVOCATION_WINDOW = 30.0
+
+_HEADER = struct.Struct("<Q")  # revocations written so far
+_SLOT = struct.Struct("<c16s")  # b"T" + token digest, or b"U" + user id
+
+
+def token_digest(token):
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+class RevocationLog:
+    """Ring of recent session revocations in a memory-mapped file shared by the workers of one host"""
+
+    def __init__(self, path=SESSION_REVOCATION_LOG, slots=REVOCATION_LOG_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._fd = None
+        self._map = None
+        self._seen = 0
+        self._failed = not path or fcntl is None
+
+    def revoke_token(self, token):
+        self._append(b"T", token_digest(token))
+
+    def revoke_user(self, user_id):
+        self._append(b"U", user_id.to_bytes(16, "little"))
+
+    def poll(self):
+        """Revocations appended since the last poll, as ("T", digest) / ("U", user id) keys; None if some were missed"""
+        if self._map is None and not self._open():
+            return []
+        count = _HEADER.unpack_from(self._map, 0)[0]
+        if count == self._seen:
+            return []
+        seen, self._seen = self._seen, count
+        if count < seen or count - seen > self.slots:
+            return None  # the ring wrapped past unread entries (or the file was reset)
+        keys = []
+        for index in range(seen, count):
+            kind, value = _SLOT.unpack_from(self._map, _HEADER.size + (index % self.slots) * _SLOT.size)
+            keys.append(("T", value) if kind == b"T" else ("U", int.from_bytes(value, "little")))
+        return keys
+
+    def _append(self, kind, value):
+        if self._map is None and not self._open():
+            return
+        # POSIX record locks belong to the process, so they also exclude workers forked after _open
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            count = _HEADER.unpack_from(self._map, 0)[0]
+            _SLOT.pack_into(self._map, _HEADER.size + (count % self.slots) * _SLOT.size, kind, value)
+            _HEADER.pack_into(self._map, 0, count + 1)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def _open(self):
+        if self._failed:
+            return False
+        size = _HEADER.size + self.slots * _SLOT.size
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size != size:
+                    # New file, or one written with another ring size: start empty
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except OSError as e:
+            print(f"Session revocation log unavailable, revocations stay per process: {e}")
+            self._failed = True
+            return False
+        self._fd = fd
+        self._seen = _HEADER.unpack_from(self._map, 0)[0]
+        return True
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached, read-only view of the authenticated user"""
+    id: int
+    username: str
+    email: str
+    user_type: str
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            user_type=user.user_type,
+            created_at=user.created_at
+        )
+
+
+class SessionCache:
+    def __init__(self, ttl=SESSION_CACHE_TTL, max_entries=SESSION_CACHE_SIZE, revocations=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.revocations = revocations
+        # token -> (snapshot, valid_until as datetime.utcnow() value, cached_until as monotonic, token digest)
+        self._entries = OrderedDict()
+        self._digests = {}  # token digest -> token, to apply revocations from the shared log
+        self._recent = OrderedDict()  # revocation key -> monotonic time it was applied
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "resyncs": 0}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def get(self, token):
+        """Cached snapshot for a token, or None on a miss"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self.revocations is not None:
+                self._sync()
+            entry = self._entries.get(token)
+            if entry is not None:
+                snapshot, expires_at, cached_until, _ = entry
+                if cached_until > time.monotonic() and expires_at > datetime.utcnow():
+                    self._entries.move_to_end(token)
+                    self.stats["hits"] += 1
+                    return snapshot
+                self._drop(token)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, token, snapshot, expires_at):
+        if not self.enabled:
+            return
+        with self._lock:
+            digest = None
+            if self.revocations is not None:
+                self._sync()
+                digest = token_digest(token)
+                if ("T", digest) in self._recent or ("U", snapshot.id) in self._recent:
+                    return  # revoked while this lookup was reading the database
+            self._drop(token)
+            self._entries[token] = (snapshot, expires_at, time.monotonic() + self.ttl, digest)
+            if digest is not None:
+                self._digests[digest] = token
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, token):
+        with self._lock:
+            if self._drop(token):
+                self.stats["invalidations"] += 1
+        if self.revocations is not None:
+            self.revocations.revoke_token(token)
+
+    def invalidate_user(self, user_id):
+        """Drop every cached session belonging to a user"""
+        with self._lock:
+            self.stats["invalidations"] += self._drop_user(user_id)
+        if self.revocations is not None:
+            self.revocations.revoke_user(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+
+    def _drop(self, token):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return False
+        if entry[3] is not None:
+            self._digests.pop(entry[3], None)
+        return True
+
+    def _drop_user(self, user_id):
+        tokens = [token for token, entry in self._entries.items() if entry[0].id == user_id]
+        for token in tokens:
+            self._drop(token)
+        return len(tokens)
+
+    def _sync(self):
+        """Apply revocations appended to the shared log by any worker; caller holds the lock"""
+        keys = self.revocations.poll()
+        if keys is None:
+            self._entries.clear()
+            self._digests.clear()
+            self.stats["resyncs"] += 1
+            return
+        now = time.monotonic()
+        for key in keys:
+            self._recent[key] = now
+            self._recent.move_to_end(key)
+            if key[0] == "T":
+                token = self._digests.get(key[1])
+                dropped = token is not None and self._drop(token)
+            else:
+                dropped = self._drop_user(key[1])
+            self.stats["invalidations"] += int(dropped)
+        while self._recent and (len(self._recent) > REVOCATION_LOG_SLOTS
+                                or next(iter(self._recent.values())) < now - RECENT_REVOCATION_WINDOW):
+            self._recent.popitem(last=False)
+
+
+# Shared cache used by auth.get_current_user
+cache = SessionCache(revocations=RevocationLog())
@@ -0,0 +1,93 @@
+# submission_listing.py
+# Keyset-paginated, filterable submission listings.
+#
+# Pages are ordered newest first on (created_at, id) and continue from an opaque
+# cursor holding the last row's key, so page N costs the same as page 1 no
+# matter how large the table grows. The "summary" projection leaves out the
+# large text columns; it is answered entirely from the Submission indexes.
+# The same query runs on a sync Session or, from the handlers, an AsyncSession.
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+
+from database import Submission
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SUMMARY_COLUMNS = (
+    Submission.id,
+    Submission.user_id,
+    Submission.type,
+    Submission.status,
+    Submission.created_at,
+)
+
+
+def encode_cursor(created_at, submission_id):
+    raw = json.dumps([created_at.isoformat(), submission_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, submission_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(submission_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def filter_conditions(user_id=None, status_filter=None, type_filter=None, created_after=None, created_before=None):
+    """WHERE conditions for the listing filters (also used by bulk reviews)"""
+    conditions = []
+    if user_id is not None:
+        conditions.append(Submission.user_id == user_id)
+    if status_filter is not None:
+        conditions.append(Submission.status == status_filter)
+    if type_filter is not None:
+        conditions.append(Submission.type == type_filter)
+    if created_after is not None:
+        conditions.append(Submission.created_at >= created_after)
+    if created_before is not None:
+        conditions.append(Submission.created_at < created_before)
+    return conditions
+
+
+def listing_query(cursor=None, limit=DEFAULT_PAGE_SIZE, fields="full", **filters):
+    """SELECT for one page of submissions, plus one extra row that tells whether another page follows"""
+    query = select(*SUMMARY_COLUMNS) if fields == "summary" else select(Submission)
+    query = query.where(*filter_conditions(**filters))
+    if cursor:
+        query = query.where(tuple_(Submission.created_at, Submission.id) < decode_cursor(cursor))
+
+    return query.order_by(Submission.created_at.desc(), Submission.id.desc()).limit(limit + 1)
+
+
+def listing_page(result, limit, fields="full"):
+    """{"submissions": [...], "next_cursor": str or None} from the result of listing_query"""
+    summary = fields == "summary"
+    rows = result.all() if summary else result.scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    submissions = [row._asdict() for row in rows] if summary else rows
+    return {"submissions": submissions, "next_cursor": next_cursor}
+
+
+def list_submissions(db, limit=DEFAULT_PAGE_SIZE, fields="full", **filters):
+    """One page of submissions as {"submissions": [...], "next_cursor": str or None}"""
+    result = db.execute(listing_query(limit=limit, fields=fields, **filters))
+    return listing_page(result, limit, fields)
+
+
+async def list_submissions_async(db, limit=DEFAULT_PAGE_SIZE, fields="full", **filters):
+    """list_submissions on an AsyncSession"""
+    result = await db.execute(listing_query(limit=limit, fields=fields, **filters))
+    return listing_page(result, limit, fields)
@@ -0,0 +1,80 @@
+# submission_review.py
+# Doctor approval and rejection of submissions in bulk.
+#
+# A review sets the status of a list of submissions, or of every submission
+# matching the listing filters, with set-based UPDATE ... RETURNING statements
+# in a single transaction instead of a SELECT and a commit per submission.
+# Each reviewed row records the reviewing doctor (approved_by) and the time
+# (approved_at); both are set for rejections too. Only submissions waiting for
+# review (or already reviewed, to change the verdict) can be reviewed; queued
+# and failed ones are reported as not_reviewable and left alone.
+import os
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from database import Submission
+from submission_listing import filter_conditions
+
+REVIEW_STATUSES = ("approved", "rejected")
+REVIEWABLE_STATUSES = ("pending",) + REVIEW_STATUSES
+
+# Most submissions one review may change
+MAX_REVIEW_SUBMISSIONS = int(os.getenv("MAX_REVIEW_SUBMISSIONS", "10000"))
+
+# Ids bound per UPDATE, well under SQLite's limit on statement parameters
+REVIEW_CHUNK_SIZE = 2000
+
+
+async def review_by_ids(db, submission_ids, new_status, reviewer_id):
+    """Set new_status on the given submissions; returns one {"submission_id", "result"} per distinct id
+
+    result is new_status, "not_reviewable" (still processing, or failed) or "not_found".
+    """
+    submission_ids = list(dict.fromkeys(submission_ids))
+    values = _review_values(new_status, reviewer_id)
+    updated = set()
+    existing = set()
+    for start in range(0, len(submission_ids), REVIEW_CHUNK_SIZE):
+        chunk = submission_ids[start:start + REVIEW_CHUNK_SIZE]
+        result = await db.execute(
+            update(Submission)
+            .where(Submission.id.in_(chunk), Submission.status.in_(REVIEWABLE_STATUSES))
+            .values(**values).returning(Submission.id),
+            execution_options={"synchronize_session": False}
+        )
+        chunk_updated = set(result.scalars())
+        updated |= chunk_updated
+        skipped = [submission_id for submission_id in chunk if submission_id not in chunk_updated]
+        if skipped:
+            existing.update((await db.execute(select(Submission.id).where(Submission.id.in_(skipped)))).scalars())
+    await db.commit()
+    return [
+        {"submission_id": submission_id, "result": _result(submission_id, new_status, updated, existing)}
+        for submission_id in submission_ids
+    ]
+
+
+async def review_by_filter(db, new_status, reviewer_id, limit=MAX_REVIEW_SUBMISSIONS, **filters):
+    """Set new_status on up to limit reviewable submissions matching the listing filters, oldest first; returns (ids, more left)"""
+    matching = (
+        select(Submission.id).where(*filter_conditions(**filters), Submission.status.in_(REVIEWABLE_STATUSES))
+        .order_by(Submission.created_at, Submission.id)
+        .limit(limit + 1)
+    )
+    submission_ids = (await db.execute(matching)).scalars().all()
+    more = len(submission_ids) > limit
+    results = await review_by_ids(db, submission_ids[:limit], new_status, reviewer_id)
+    return [item["submission_id"] for item in results if item["result"] == new_status], more
+
+
+def _result(submission_id, new_status, updated, existing):
+    if submission_id in updated:
+        return new_status
+    return "not_reviewable" if submission_id in existing else "not_found"
+
+
+def _review_values(new_status, reviewer_id):
+    if new_status not in REVIEW_STATUSES:
+        raise ValueError(f"Unknown review status {new_status!r}")
+    return {"status": new_status, "approved_by": reviewer_id, "approved_at": datetime.utcnow()}
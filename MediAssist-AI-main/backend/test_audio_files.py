@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Audio file serving tests: ETags and revalidation, Range and If-Range on the
+in-memory path, large files through FileResponse, and the zero-copy send
+(which overrides private FileResponse methods, so a Starlette upgrade that
+changes them fails here).
+
+    python test_audio_files.py    (or: python -m pytest test_audio_files.py)
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from audio_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, AudioFiles, ZeroCopyFileResponse
+
+SMALL = bytes(range(256)) * 4  # 1 KB, served from memory
+LARGE = os.urandom(64 * 1024)  # over the limit below, served by FileResponse
+MEMORY_FILE_LIMIT = 16 * 1024
+
+
+@contextmanager
+def audio_client():
+    """A TestClient serving GET /<name> from a scratch directory holding small.mp3 and large.mp3"""
+    with tempfile.TemporaryDirectory() as directory:
+        for name, data in (("small.mp3", SMALL), ("large.mp3", LARGE)):
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(data)
+        files = AudioFiles(memory_file_limit=MEMORY_FILE_LIMIT)
+        app = FastAPI()
+
+        @app.get("/{name}")
+        async def get_file(name: str, request: Request):
+            return await files.serve(request, os.path.join(directory, name), immutable=name.startswith("small"))
+
+        yield TestClient(app), files, directory
+
+
+def etag_of(data):
+    return f'"{hashlib.sha256(data).hexdigest()}"'
+
+
+def test_full_get_has_etag_and_cache_control():
+    with audio_client() as (client, files, directory):
+        small = client.get("/small.mp3")
+        assert small.status_code == 200 and small.content == SMALL
+        assert small.headers["etag"] == etag_of(SMALL)
+        assert small.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+        assert small.headers["accept-ranges"] == "bytes"
+
+        large = client.get("/large.mp3")
+        assert large.status_code == 200 and large.content == LARGE
+        assert large.headers["etag"] == etag_of(LARGE)
+        assert large.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+        assert files.stats["memory_hits"] == 1 and files.stats["disk_reads"] == 1
+        assert client.get("/missing.mp3").status_code == 404
+
+
+def test_matching_if_none_match_is_304():
+    with audio_client() as (client, files, directory):
+        for name, data in (("small.mp3", SMALL), ("large.mp3", LARGE)):
+            response = client.get(f"/{name}", headers={"If-None-Match": f'"other", W/{etag_of(data)}'})
+            assert response.status_code == 304 and response.content == b""
+            assert response.headers["etag"] == etag_of(data)
+        assert client.get("/small.mp3", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_ranges_on_the_memory_path():
+    with audio_client() as (client, files, directory):
+        size = len(SMALL)
+        tail = client.get("/small.mp3", headers={"Range": "bytes=500-"})
+        assert tail.status_code == 206 and tail.content == SMALL[500:]
+        assert tail.headers["content-range"] == f"bytes 500-{size - 1}/{size}"
+
+        suffix = client.get("/small.mp3", headers={"Range": "bytes=-100"})
+        assert suffix.status_code == 206 and suffix.content == SMALL[-100:]
+        assert suffix.headers["content-range"] == f"bytes {size - 100}-{size - 1}/{size}"
+
+        middle = client.get("/small.mp3", headers={"Range": "bytes=10-19"})
+        assert middle.status_code == 206 and middle.content == SMALL[10:20]
+
+        for unsatisfiable in (f"bytes={size}-", "bytes=-0"):
+            response = client.get("/small.mp3", headers={"Range": unsatisfiable})
+            assert response.status_code == 416, unsatisfiable
+            assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_stale_if_range_gets_the_whole_file():
+    with audio_client() as (client, files, directory):
+        stale = client.get("/small.mp3", headers={"Range": "bytes=500-", "If-Range": '"old"'})
+        assert stale.status_code == 200 and stale.content == SMALL
+        current = client.get("/small.mp3", headers={"Range": "bytes=500-", "If-Range": etag_of(SMALL)})
+        assert current.status_code == 206 and current.content == SMALL[500:]
+
+
+def test_large_file_ranges_go_through_file_response():
+    with audio_client() as (client, files, directory):
+        response = client.get("/large.mp3", headers={"Range": "bytes=1000-1999"})
+        assert response.status_code == 206 and response.content == LARGE[1000:2000]
+        assert response.headers["content-range"] == f"bytes 1000-1999/{len(LARGE)}"
+        assert response.headers["etag"] == etag_of(LARGE)
+        assert client.get("/large.mp3", headers={"Range": f"bytes={len(LARGE)}-"}).status_code == 416
+        assert files.stats["memory_hits"] == 0
+
+
+def zerocopy_send(path, headers=None):
+    """Call a ZeroCopyFileResponse as a server offering zerocopysend would; returns the messages sent"""
+    messages = []
+    scope = {"type": "http", "method": "GET", "headers": headers or [],
+             "extensions": {"http.response.zerocopysend": {}}}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            # The file is closed when the response returns: read what the server would send now
+            os.lseek(message["file"], message.get("offset", 0), os.SEEK_SET)
+            message = dict(message, body=os.read(message["file"], message.get("count", len(LARGE))))
+        messages.append(message)
+
+    asyncio.run(ZeroCopyFileResponse(path, media_type="audio/mpeg")(scope, receive, send))
+    return messages
+
+
+def test_zero_copy_send_overrides():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "large.mp3")
+        with open(path, "wb") as f:
+            f.write(LARGE)
+
+        start, body = zerocopy_send(path)
+        assert start["status"] == 200 and body["type"] == "http.response.zerocopysend"
+        assert body["body"] == LARGE
+
+        start, body = zerocopy_send(path, headers=[(b"range", b"bytes=100-199")])
+        headers = dict(start["headers"])
+        assert start["status"] == 206
+        assert headers[b"content-range"] == f"bytes 100-199/{len(LARGE)}".encode()
+        assert (body["offset"], body["count"], body["body"]) == (100, 100, LARGE[100:200])
+
+
+if __name__ == "__main__":
+    print("🧪 Testing audio file serving...")
+    print("=" * 50)
+
+    tests = [
+        test_full_get_has_etag_and_cache_control,
+        test_matching_if_none_match_is_304,
+        test_ranges_on_the_memory_path,
+        test_stale_if_range_gets_the_whole_file,
+        test_large_file_ranges_go_through_file_response,
+        test_zero_copy_send_overrides,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Register and login tests: the handlers work through the async session, and a
+thread holding the SQLite writer does not stall the event loop.
+
+Each test runs the app in a fresh interpreter from a scratch directory (the
+database is ./mediassist.db).
+
+    python test_auth.py    (or: python -m pytest test_auth.py)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SETUP = """
+import asyncio, json, threading, time
+import httpx
+import db_config, main, password_hashing
+from database import SessionLocal, User
+main.init_worker()
+
+async def run(scenario):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await scenario(client)
+"""
+
+
+def run_scenario(code):
+    """Run SETUP + code in a fresh interpreter; code prints its result as JSON on the last line"""
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, OPENAI_API_KEY="", PASSWORD_HASH_ITERATIONS="1000", WARM_UP="0",
+                   SESSION_REVOCATION_LOG=os.path.join(directory, "revocations.bin"))
+        result = subprocess.run([sys.executable, "-c", SETUP + code], cwd=directory, env=env,
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_register_and_login():
+    result = run_scenario("""
+async def scenario(client):
+    user = {"username": "alice", "email": "alice@example.com", "password": "secret-1"}
+    registered = await client.post("/register", json=user)
+    duplicate = await client.post("/register", json=dict(user, email="other@example.com"))
+    login = await client.post("/login", json={"username": "alice", "password": "secret-1"})
+    wrong = await client.post("/login", json={"username": "alice", "password": "wrong"})
+    me = await client.get("/me", headers={"Authorization": f"Bearer {login.json()['session_token']}"})
+    return [registered.status_code, duplicate.status_code, login.status_code, login.json()["user"]["username"],
+            wrong.status_code, me.json()["username"]]
+print(json.dumps(asyncio.run(run(scenario))))
+""")
+    assert result == [200, 400, 200, "alice", 401, "alice"]
+
+
+def test_login_upgrades_old_hashes():
+    result = run_scenario("""
+async def scenario(client):
+    await client.post("/register", json={"username": "bob", "email": "bob@example.com", "password": "secret-1"})
+    password_hashing.PASSWORD_HASH_ITERATIONS = 2000
+    login = await client.post("/login", json={"username": "bob", "password": "secret-1"})
+    db = SessionLocal()
+    stored = db.query(User).filter(User.username == "bob").one().password_hash
+    db.close()
+    again = await client.post("/login", json={"username": "bob", "password": "secret-1"})
+    return [login.status_code, password_hashing.needs_rehash(stored), again.status_code]
+print(json.dumps(asyncio.run(run(scenario))))
+""")
+    assert result == [200, False, 200]
+
+
+def test_login_does_not_block_the_loop_while_a_thread_writes():
+    result = run_scenario("""
+async def scenario(client):
+    await client.post("/register", json={"username": "carol", "email": "carol@example.com", "password": "secret-1"})
+    # A job worker or the session purge holds the writer for a while
+    db_config.writer_turn.acquire()
+    threading.Timer(1.0, db_config.writer_turn.release).start()
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        for _ in range(15):
+            await asyncio.sleep(0.05)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    login, _ = await asyncio.gather(client.post("/login", json={"username": "carol", "password": "secret-1"}), ticker())
+    return [login.status_code, max(gaps)]
+print(json.dumps(asyncio.run(run(scenario))))
+""")
+    status, longest_gap = result
+    assert status == 200
+    assert longest_gap < 0.5
+
+
+if __name__ == "__main__":
+    print("🧪 Testing register and login...")
+    print("=" * 50)
+
+    tests = [
+        test_register_and_login,
+        test_login_upgrades_old_hashes,
+        test_login_does_not_block_the_loop_while_a_thread_writes,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Batch processing tests: page counts read before rendering, and OCR stopped
+when the client goes away mid-stream (OCR and storage replaced by stand-ins).
+
+    python test_batch_processing.py    (or: python -m pytest test_batch_processing.py)
+"""
+
+import asyncio
+import io
+
+from PIL import Image
+
+import batch_processing
+import job_queue
+from batch_processing import BatchItem
+from uploads import Upload
+
+
+def tiff_upload(pages):
+    frames = [Image.new("RGB", (32, 32), (i * 40, 0, 0)) for i in range(pages)]
+    encoded = io.BytesIO()
+    frames[0].save(encoded, format="TIFF", save_all=True, append_images=frames[1:])
+    data = encoded.getvalue()
+    return Upload("scan.tiff", "hash", len(data), data=data)
+
+
+def test_pages_are_counted_without_rendering():
+    upload = tiff_upload(3)
+    assert batch_processing.count_pages(upload) == 3
+    assert len(batch_processing.expand_pages(upload)) == 3
+    assert batch_processing.count_pages(Upload("photo.png", "hash", 3, data=b"png")) == 1
+
+
+def test_disconnect_cancels_pending_ocr():
+    cancelled = []
+
+    async def slow_ocr(source):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(source)
+            raise
+
+    def store(items, user_id):
+        for item in items:
+            item.submission_id = item.index + 1
+
+    async def scenario():
+        items = [BatchItem(index=0, filename="bad.png", page=1, error="Failed to read upload")]
+        items += [BatchItem(index=i, filename=f"{i}.png", page=1, source=f"page{i}") for i in range(1, 4)]
+        stream = batch_processing.process_batch(items, [], user_id=1)
+        first = await stream.__anext__()
+        await stream.aclose()  # what the server does when the client disconnects
+        await asyncio.sleep(0.05)
+        return first, list(cancelled)  # before asyncio.run cancels whatever is left
+
+    original_ocr, original_store = job_queue.queue.run_ocr, batch_processing._store_submissions
+    job_queue.queue.run_ocr, batch_processing._store_submissions = slow_ocr, store
+    try:
+        first, cancelled_before_exit = asyncio.run(scenario())
+    finally:
+        job_queue.queue.run_ocr, batch_processing._store_submissions = original_ocr, original_store
+
+    assert '"filename": "bad.png"' in first
+    assert sorted(cancelled_before_exit) == ["page1", "page2", "page3"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing batch processing...")
+    print("=" * 50)
+
+    tests = [
+        test_pages_are_counted_without_rendering,
+        test_disconnect_cancels_pending_ocr,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
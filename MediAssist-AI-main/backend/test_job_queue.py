@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Job queue tests, on a scratch SQLite database: claiming, retries with
+backoff, permanent and exhausted failures, stale job recovery and a job run
+end to end by a worker (OCR replaced by a canned result).
+
+    python test_job_queue.py    (or: python -m pytest test_job_queue.py)
+"""
+
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import db_config
+import job_queue
+from database import Base, Job, Submission
+from job_queue import JobQueue
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, kind, content_hash):
+        return self.entries.get((kind, content_hash))
+
+    def put(self, kind, content_hash, value):
+        self.entries[(kind, content_hash)] = value
+
+
+def with_jobs(jobs, check):
+    """Run check(queue, Session, directory) against a database holding one queued submission per job dict"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine, read_engine = db_config.create_engines(f"sqlite:///{os.path.join(directory, 'test.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(class_=db_config.RoutingSession, bind=engine, read_bind=read_engine)
+        db = Session()
+        try:
+            for fields in jobs:
+                submission = Submission(user_id=1, type='prescription', status='queued')
+                db.add(submission)
+                db.flush()
+                payload = os.path.join(directory, f"upload{submission.id}.png")
+                open(payload, "wb").close()
+                db.add(Job(submission_id=submission.id, payload_path=payload, **fields))
+            db.commit()
+        finally:
+            db.close()
+        try:
+            return check(JobQueue(workers=1, ocr_processes=1, sessions=Session, result_cache=DictCache()), Session, directory)
+        finally:
+            engine.dispose()
+            read_engine.dispose()
+
+
+def crash_ocr(source):
+    os._exit(1)  # as if the OCR process were killed for its memory
+
+
+def canned_ocr(source):
+    return SimpleNamespace(raw_text=source, cleaned_text=source, word_confidences=[], timings={})
+
+
+def load(Session, model, row_id):
+    db = Session()
+    try:
+        return db.get(model, row_id)
+    finally:
+        db.close()
+
+
+def test_each_job_is_claimed_once():
+    def check(queue, Session, directory):
+        claimed = []
+        lock = threading.Lock()
+
+        def claim():
+            while (job := queue._claim_next_job()) is not None:
+                with lock:
+                    claimed.append(job['id'])
+
+        threads = [threading.Thread(target=claim) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(claimed) == [1, 2, 3, 4, 5]
+        job = load(Session, Job, 1)
+        assert (job.status, job.attempts) == ('running', 1)
+
+    with_jobs([{}] * 5, check)
+
+
+def test_jobs_wait_for_their_run_after():
+    def check(queue, Session, directory):
+        job = queue._claim_next_job()
+        assert job['id'] == 2 and queue._claim_next_job() is None
+
+    with_jobs([{"run_after": datetime.utcnow() + timedelta(minutes=5)}, {}], check)
+
+
+def test_transient_failure_is_retried_with_backoff():
+    def check(queue, Session, directory):
+        job = queue._claim_next_job()
+        before = datetime.utcnow()
+        queue._record_failure(job, RuntimeError("OCR timed out"))
+
+        row = load(Session, Job, job['id'])
+        assert (row.status, row.last_error) == ('queued', "OCR timed out")
+        delay = (row.run_after - before).total_seconds()
+        assert job_queue.JOB_RETRY_BASE_DELAY * 0.5 - 0.1 <= delay <= job_queue.JOB_RETRY_BASE_DELAY + 0.1
+        assert queue._claim_next_job() is None  # not before its backoff is over
+        assert load(Session, Submission, job['submission_id']).status == 'queued'
+        assert os.path.exists(job['payload_path'])
+
+    with_jobs([{"max_attempts": 3}], check)
+
+
+def test_backoff_grows_and_is_capped():
+    assert job_queue.retry_delay(1) <= job_queue.JOB_RETRY_BASE_DELAY
+    assert job_queue.retry_delay(3) >= job_queue.JOB_RETRY_BASE_DELAY * 2
+    assert job_queue.retry_delay(50) <= job_queue.JOB_RETRY_MAX_DELAY
+
+
+def test_permanent_failure_is_not_retried():
+    def check(queue, Session, directory):
+        job = queue._claim_next_job()
+        queue._record_failure(job, ValueError("not an image"))
+
+        assert load(Session, Job, job['id']).status == 'failed'
+        submission = load(Session, Submission, job['submission_id'])
+        assert (submission.status, submission.patient_instructions) == ('failed', job_queue.PRESCRIPTION_FAILED_TEXT)
+        assert not os.path.exists(job['payload_path'])
+
+    with_jobs([{"max_attempts": 3}], check)
+
+
+def test_last_attempt_fails_the_submission():
+    def check(queue, Session, directory):
+        job = queue._claim_next_job()
+        assert job['attempts'] == 3
+        queue._record_failure(job, RuntimeError("OCR timed out"))
+        assert load(Session, Job, job['id']).status == 'failed'
+        assert load(Session, Submission, job['submission_id']).status == 'failed'
+
+    with_jobs([{"max_attempts": 3, "attempts": 2}], check)
+
+
+def test_stale_running_jobs_are_requeued():
+    stale = datetime.utcnow() - timedelta(seconds=job_queue.JOB_STALE_AFTER + 60)
+
+    def check(queue, Session, directory):
+        queue._requeue_stale_jobs()
+        assert load(Session, Job, 1).status == 'queued'
+        assert load(Session, Job, 2).status == 'running'
+
+    with_jobs([{"status": "running", "updated_at": stale}, {"status": "running"}], check)
+
+
+def test_finished_job_keeps_its_output_and_a_status_set_meanwhile():
+    def check(queue, Session, directory):
+        db = Session()
+        db.query(Submission).update({Submission.status: 'rejected'})
+        db.commit()
+        db.close()
+
+        queue._record_success(queue._claim_next_job(), SimpleNamespace(
+            extracted_text="Metformin 500mg BID", instructions="Take Metformin", instructions_source='llm'))
+        queue._record_failure(queue._claim_next_job(), ValueError("not an image"))
+
+        done, failed = load(Session, Submission, 1), load(Session, Submission, 2)
+        assert (done.status, done.extracted_text, done.patient_instructions) == \
+            ('rejected', "Metformin 500mg BID", "Take Metformin")
+        assert (failed.status, failed.patient_instructions) == ('rejected', job_queue.PRESCRIPTION_FAILED_TEXT)
+        assert load(Session, Job, 1).status == 'done' and load(Session, Job, 2).status == 'failed'
+
+    with_jobs([{}, {}], check)
+
+
+def test_dead_ocr_process_gets_a_fresh_pool():
+    queue = JobQueue(workers=1, ocr_processes=1)
+
+    async def scenario():
+        try:
+            job_queue._run_ocr = crash_ocr
+            try:
+                await queue.run_ocr("first.png")
+            except BrokenProcessPool:
+                pass
+            else:
+                raise AssertionError("the OCR process did not die")
+            job_queue._run_ocr = canned_ocr
+            return await queue.run_ocr("second.png")
+        finally:
+            job_queue._run_ocr = original
+            await queue.stop()
+
+    original = job_queue._run_ocr
+    assert asyncio.run(scenario()).raw_text == "second.png"
+
+
+def test_worker_survives_database_errors():
+    queue = JobQueue(workers=1, ocr_processes=1)
+    calls = []
+
+    def claim():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise OperationalError("UPDATE jobs", {}, Exception("database is locked"))
+        return None
+
+    async def scenario():
+        queue._claim_next_job = claim
+        queue._ensure_pool = lambda: None
+        queue._requeue_stale_jobs = lambda: None
+        await queue.start()
+        try:
+            for _ in range(100):
+                if len(calls) >= 3:
+                    break
+                await asyncio.sleep(0.05)
+            return all(not task.done() for task in queue._tasks)
+        finally:
+            await queue.stop()
+
+    original_delay = job_queue.JOB_RETRY_BASE_DELAY
+    job_queue.JOB_RETRY_BASE_DELAY = 0.01
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        job_queue.JOB_RETRY_BASE_DELAY = original_delay
+    assert len(calls) >= 3
+
+
+def test_worker_runs_a_job_to_completion():
+    ocr_result = SimpleNamespace(
+        raw_text="Amoxicillin 500mg three times daily for 7 days",
+        cleaned_text="Amoxicillin 500mg three times daily for 7 days",
+        word_confidences=[], timings={}
+    )
+
+    def check(queue, Session, directory):
+        async def run_ocr(source):
+            return ocr_result
+
+        async def run():
+            queue.run_ocr = run_ocr
+            queue._ensure_pool = lambda: None  # no OCR processes needed
+            await queue.start()
+            try:
+                for _ in range(100):
+                    if load(Session, Job, 1).status == 'done':
+                        break
+                    await asyncio.sleep(0.05)
+            finally:
+                await queue.stop()
+
+        asyncio.run(run())
+        submission = load(Session, Submission, 1)
+        assert submission.status == 'pending'
+        assert submission.extracted_text == ocr_result.raw_text
+        assert "Amoxicillin" in submission.patient_instructions
+        # Answered by the local tier, which is cached like an LLM answer
+        assert queue.result_cache.entries[('prescription', 'abc')]['patient_instructions'] == \
+            submission.patient_instructions
+
+    with_jobs([{"content_hash": "abc"}], check)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the job queue...")
+    print("=" * 50)
+
+    tests = [
+        test_each_job_is_claimed_once,
+        test_jobs_wait_for_their_run_after,
+        test_transient_failure_is_retried_with_backoff,
+        test_backoff_grows_and_is_capped,
+        test_permanent_failure_is_not_retried,
+        test_last_attempt_fails_the_submission,
+        test_stale_running_jobs_are_requeued,
+        test_finished_job_keeps_its_output_and_a_status_set_meanwhile,
+        test_dead_ocr_process_gets_a_fresh_pool,
+        test_worker_survives_database_errors,
+        test_worker_runs_a_job_to_completion,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+LLM gateway tests against a local stub of the OpenAI API.
+
+The stub answers chat completions and transcriptions after a configurable
+delay and can be told to answer the next N requests with 429s. No network
+access or API key is needed.
+
+    python test_llm_gateway.py    (or: python -m pytest test_llm_gateway.py)
+"""
+
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ai_integration
+import llm_gateway
+from llm_gateway import CircuitBreaker, LLMGateway, LLMUnavailable
+
+
+class StubOpenAI:
+    """Minimal OpenAI-compatible server on a random local port"""
+
+    def __init__(self):
+        self.latency = 0.0
+        self.rate_limited = 0  # answer this many upcoming requests with 429
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    limited = stub.rate_limited > 0
+                    if limited:
+                        stub.rate_limited -= 1
+                try:
+                    time.sleep(stub.latency)
+                    if limited:
+                        self._reply(429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+                    elif self.path.endswith("/audio/transcriptions"):
+                        self._reply(200, {"text": "I have had a headache for three days"})
+                    else:
+                        self._reply(200, {
+                            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": "Take one tablet daily."}}],
+                        })
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_gateway(stub, **kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(threshold=2, cooldown=60))
+    return LLMGateway(api_key="sk-test", base_url=stub.url, retry_base_delay=0.01, **kwargs)
+
+
+@contextmanager
+def pipeline_with(gateway):
+    """Point ai_integration at gateway, with fresh tier stats; both globals are restored afterwards"""
+    saved = ai_integration.gateway, ai_integration.tier_stats
+    ai_integration.gateway, ai_integration.tier_stats = gateway, ai_integration.TierStats()
+    try:
+        yield ai_integration.tier_stats
+    finally:
+        ai_integration.gateway, ai_integration.tier_stats = saved
+
+
+def run(gateway, coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await gateway.aclose()
+    return asyncio.run(main())
+
+
+def test_retries_rate_limits_then_succeeds():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub, max_retries=3)
+        stub.rate_limited = 2
+        content = run(gateway, gateway.chat([{"role": "user", "content": "Metformin 500mg BID"}]))
+        assert content == "Take one tablet daily."
+        assert stub.requests == 3
+        assert gateway.stats["retries"] == 2
+        assert gateway.breaker.state == "closed"
+    finally:
+        stub.close()
+
+
+def test_circuit_opens_and_short_circuits():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub, max_retries=1)
+        stub.rate_limited = 100
+
+        async def calls():
+            for _ in range(2):
+                try:
+                    await gateway.chat([{"role": "user", "content": "hello"}])
+                except LLMUnavailable:
+                    pass
+            requests_when_opened = stub.requests
+            try:
+                await gateway.chat([{"role": "user", "content": "hello"}])
+            except LLMUnavailable as e:
+                assert "circuit open" in str(e)
+            return requests_when_opened
+
+        requests_when_opened = run(gateway, calls())
+        assert gateway.breaker.state == "open"
+        assert stub.requests == requests_when_opened == 4  # 2 calls x (1 try + 1 retry), nothing after
+        assert gateway.stats["short_circuits"] == 1
+    finally:
+        stub.close()
+
+
+def test_open_circuit_falls_back_to_rules():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub)
+        gateway.breaker.opened_at = time.monotonic()  # degraded
+        with pipeline_with(gateway) as stats:
+            instructions, source = run(gateway, ai_integration.generate_instructions_with_source(
+                "Amoxicilin as discussed, stop if a rash appears"))
+        assert source == "rules"
+        assert "Amoxicillin" in instructions
+        assert stub.requests == 0
+        assert stats.counts == {"local": 0, "llm": 0, "rules": 1}
+    finally:
+        stub.close()
+
+
+def test_confident_prescriptions_skip_the_llm():
+    stub = StubOpenAI()
+    try:
+        texts = [
+            "Metformin 500mg BID",
+            "Amoxicillin 500mg: Take 1 tablet three times daily for 7 days",
+            "Patient reports headache, prescribed something for the pain, review next week",
+        ]
+
+        gateway = make_gateway(stub)
+        with pipeline_with(gateway) as stats:
+            single = run(gateway, ai_integration.generate_instructions_with_source(texts[0]))
+            assert single[1] == "local"
+            assert stub.requests == 0
+
+            gateway = ai_integration.gateway = make_gateway(stub)
+            batch = run(gateway, ai_integration.generate_instructions_batch(texts))
+        assert [source for _, source in batch] == ["local", "local", "llm"]
+        assert stub.requests == 1
+
+        snapshot = stats.snapshot()
+        assert snapshot["local"]["count"] == 3
+        assert snapshot["llm"]["count"] == 1
+        assert snapshot["rules"] == {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        assert snapshot["local"]["p99_ms"] < snapshot["llm"]["p50_ms"]
+    finally:
+        stub.close()
+
+
+def test_half_open_trial_closes_circuit():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub, breaker=CircuitBreaker(threshold=1, cooldown=0.1))
+        gateway.breaker.opened_at = time.monotonic()
+        time.sleep(0.15)
+        assert gateway.breaker.state == "half_open"
+        run(gateway, gateway.chat([{"role": "user", "content": "hello"}]))
+        assert gateway.breaker.state == "closed"
+    finally:
+        stub.close()
+
+
+def test_in_flight_limit():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub, max_in_flight=3)
+        stub.latency = 0.1
+
+        async def burst():
+            return await asyncio.gather(*(gateway.chat([{"role": "user", "content": str(i)}]) for i in range(12)))
+
+        results = run(gateway, burst())
+        assert len(results) == 12
+        assert stub.max_in_flight == 3
+    finally:
+        stub.close()
+
+
+def test_timeout_counts_as_failure():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub, timeout=0.2, max_retries=0, breaker=CircuitBreaker(threshold=1, cooldown=60))
+        stub.latency = 1.0
+        try:
+            run(gateway, gateway.chat([{"role": "user", "content": "hello"}]))
+            assert False, "expected LLMUnavailable"
+        except LLMUnavailable:
+            pass
+        assert gateway.breaker.state == "open"
+    finally:
+        stub.close()
+
+
+def test_transcribe():
+    stub = StubOpenAI()
+    try:
+        gateway = make_gateway(stub)
+        stub.rate_limited = 1
+        text = run(gateway, gateway.transcribe(("visit.webm", b"\x1a\x45\xdf\xa3" * 64)))
+        assert text == "I have had a headache for three days"
+        assert stub.requests == 2
+    finally:
+        stub.close()
+
+
+def test_unconfigured_gateway_is_unavailable():
+    gateway = LLMGateway(api_key=llm_gateway.PLACEHOLDER_API_KEY)
+    assert not gateway.configured
+    try:
+        run(gateway, gateway.chat([{"role": "user", "content": "hello"}]))
+        assert False, "expected LLMUnavailable"
+    except LLMUnavailable:
+        pass
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the LLM gateway against a local stub server...")
+    print("=" * 50)
+
+    tests = [
+        test_retries_rate_limits_then_succeeds,
+        test_circuit_opens_and_short_circuits,
+        test_open_circuit_falls_back_to_rules,
+        test_confident_prescriptions_skip_the_llm,
+        test_half_open_trial_closes_circuit,
+        test_in_flight_limit,
+        test_timeout_counts_as_failure,
+        test_transcribe,
+        test_unconfigured_gateway_is_unavailable,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
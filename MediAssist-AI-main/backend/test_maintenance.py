@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Session purge and maintenance scheduler tests, on a scratch SQLite database.
+
+    python test_maintenance.py    (or: python -m pytest test_maintenance.py)
+"""
+
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import sessionmaker
+
+import db_config
+from auth import cleanup_expired_sessions
+from database import Base, UserSession
+from maintenance import MaintenanceScheduler
+
+
+def make_sessions(directory):
+    engine, read_engine = db_config.create_engines(f"sqlite:///{os.path.join(directory, 'test.db')}")
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(class_=db_config.RoutingSession, bind=engine, read_bind=read_engine)
+
+
+def test_purge_deletes_expired_and_inactive_sessions_in_batches():
+    with tempfile.TemporaryDirectory() as directory:
+        engine, Session = make_sessions(directory)
+        now = datetime.utcnow()
+        with engine.begin() as conn:
+            conn.execute(UserSession.__table__.insert(), [
+                {"user_id": 1, "session_token": f"token{i}", "created_at": now,
+                 "expires_at": now + timedelta(hours=1 if i % 3 else -1), "is_active": i % 5 != 1}
+                for i in range(1000)
+            ])
+
+        db = Session()
+        try:
+            deleted = cleanup_expired_sessions(db, batch_size=64)
+            remaining = db.execute(select(UserSession.session_token)).scalars().all()
+        finally:
+            db.close()
+        engine.dispose()
+
+        kept = [i for i in range(1000) if i % 3 and i % 5 != 1]
+        assert deleted == 1000 - len(kept)
+        assert sorted(remaining) == sorted(f"token{i}" for i in kept)
+
+
+def test_token_lookup_index_exists():
+    with tempfile.TemporaryDirectory() as directory:
+        engine, _ = make_sessions(directory)
+        indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("user_sessions")}
+        engine.dispose()
+        assert indexes["ix_user_sessions_token_active_expires"] == ["session_token", "is_active", "expires_at"]
+
+
+def test_scheduler_records_rows_and_failures():
+    scheduler = MaintenanceScheduler()
+    scheduler.add("reclaim", lambda: 42, interval=0)
+    scheduler.add("broken", lambda: 1 / 0, interval=0)
+
+    async def run_both():
+        rows = await scheduler.run("reclaim")
+        try:
+            await scheduler.run("broken")
+            assert False, "expected ZeroDivisionError"
+        except ZeroDivisionError:
+            pass
+        await scheduler.start()  # interval 0: nothing scheduled
+        assert scheduler._tasks == []
+        return rows
+
+    assert asyncio.run(run_both()) == 42
+    assert scheduler.stats["reclaim"]["runs"] == 1
+    assert scheduler.stats["reclaim"]["rows"] == 42
+    assert scheduler.stats["broken"]["failures"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the session purge and the maintenance scheduler...")
+    print("=" * 50)
+
+    tests = [
+        test_purge_deletes_expired_and_inactive_sessions_in_batches,
+        test_token_lookup_index_exists,
+        test_scheduler_records_rows_and_failures,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Metrics registry, middleware and Prometheus rendering tests.
+
+    python test_metrics.py    (or: python -m pytest test_metrics.py)
+"""
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import MetricsMiddleware, MetricsRegistry, scrape_allowed, serve_metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(enabled=True)
+    for seconds in (0.002, 0.002, 0.3, 120):
+        registry.observe("tesseract", seconds)
+    lines = registry.render().splitlines()
+
+    assert '# TYPE mediassist_stage_duration_seconds histogram' in lines
+    assert 'mediassist_stage_duration_seconds_bucket{stage="tesseract",le="0.001"} 0' in lines
+    assert 'mediassist_stage_duration_seconds_bucket{stage="tesseract",le="0.005"} 2' in lines
+    assert 'mediassist_stage_duration_seconds_bucket{stage="tesseract",le="0.5"} 3' in lines
+    assert 'mediassist_stage_duration_seconds_bucket{stage="tesseract",le="+Inf"} 4' in lines
+    assert 'mediassist_stage_duration_seconds_count{stage="tesseract"} 4' in lines
+
+
+def test_middleware_labels_requests_by_route_template():
+    registry = MetricsRegistry(enabled=True)
+    app = FastAPI()
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: int):
+        with registry.span("db"):
+            return {"id": job_id}
+
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    client = TestClient(app)
+    for job_id in (1, 2, 3):
+        client.get(f"/jobs/{job_id}")
+    client.get("/missing")
+
+    text = registry.render()
+    assert 'mediassist_http_request_duration_seconds_count{method="GET",route="/jobs/{job_id}",status="200"} 3' in text
+    assert 'mediassist_http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'mediassist_stage_duration_seconds_count{stage="db"} 3' in text
+    assert 'mediassist_stages_in_flight{stage="db"} 0' in text
+    assert "mediassist_http_requests_in_flight 0" in text
+
+
+def test_stats_dicts_are_flattened_and_typed():
+    registry = MetricsRegistry(enabled=True)
+    registry.add_stats("cache", {"hits": 3, "enabled": True, "name": "x"})
+    registry.add_stats("tier", lambda: {"local": {"count": 2, "p50_ms": 1.5}}, gauges=("p50_ms",))
+    lines = registry.render().splitlines()
+    assert lines[lines.index("mediassist_cache_hits_total 3") - 1] == "# TYPE mediassist_cache_hits_total counter"
+    assert "# TYPE mediassist_tier_local_count_total counter" in lines
+    assert "mediassist_tier_local_count_total 2" in lines
+    assert lines[lines.index("mediassist_tier_local_p50_ms 1.5") - 1] == "# TYPE mediassist_tier_local_p50_ms gauge"
+    assert not any("untyped" in line for line in lines)
+    assert not any(line.startswith(("mediassist_cache_enabled", "mediassist_cache_name")) for line in lines)
+
+
+def test_scrapes_need_the_token_or_loopback():
+    assert scrape_allowed("Bearer s3cret", "203.0.113.9", token="s3cret")
+    assert not scrape_allowed("Bearer wrong", "127.0.0.1", token="s3cret")
+    assert not scrape_allowed(None, "127.0.0.1", token="s3cret")
+    assert scrape_allowed(None, "127.0.0.1", token="")
+    assert scrape_allowed(None, "::1", token="")
+    assert not scrape_allowed("Bearer anything", "203.0.113.9", token="")
+
+
+def test_standalone_listener_serves_the_registry():
+    registry = MetricsRegistry(enabled=True)
+    registry.observe("tesseract", 0.2)
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    async def scenario():
+        server = await serve_metrics(registry, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await get(port, "/metrics"), await get(port, "/")
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    found, missing = asyncio.run(scenario())
+    assert found.startswith("HTTP/1.1 200 OK")
+    assert 'mediassist_stage_duration_seconds_count{stage="tesseract"} 1' in found
+    assert missing.startswith("HTTP/1.1 404")
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.span("llm_chat"):
+        pass
+    registry.observe("tesseract", 0.1)
+    assert registry.span("a") is registry.span("b")  # one shared no-op
+    assert "stage=" not in registry.render()
+
+
+if __name__ == "__main__":
+    print("🧪 Testing metrics instrumentation...")
+    print("=" * 50)
+
+    tests = [
+        test_histogram_renders_cumulative_buckets,
+        test_middleware_labels_requests_by_route_template,
+        test_stats_dicts_are_flattened_and_typed,
+        test_scrapes_need_the_token_or_loopback,
+        test_standalone_listener_serves_the_registry,
+        test_disabled_registry_records_nothing,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
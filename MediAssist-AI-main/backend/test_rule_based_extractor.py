@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Rule-based extractor tests: known prescriptions, plus a fuzz run over
+multi-kilobyte OCR noise proving extraction time stays linear (no
+catastrophic backtracking).
+
+    python test_rule_based_extractor.py    (or: python -m pytest test_rule_based_extractor.py)
+"""
+
+import json
+import pickle
+import random
+import shutil
+import string
+import tempfile
+import time
+from pathlib import Path
+
+import medication_lexicon
+
+from rule_based_extractor import (
+    UNCERTAIN_CONFIDENCE_CAP,
+    extract_medication_info,
+    extraction_confidence,
+    format_patient_instructions,
+)
+
+# Generous: even noise made of long unknown words (each one fuzzy-matched
+# against the medication lexicon) takes a few ms per KB
+MAX_SECONDS_PER_KB = 0.02
+
+NOISE_ALPHABETS = [
+    string.ascii_letters + "  \t",  # smudged words, no punctuation
+    string.digits + "  ",  # long digit runs
+    string.ascii_letters + string.digits + " :-.\n",  # separators everywhere
+    string.printable,
+]
+
+# Fragments that start a multi-character token and then break it off
+ADVERSARIAL_FRAGMENTS = ["for ", "x ", "every ", "3 times ", "500 ", "500m", "Take ", ": ", "-", "1.", "   "]
+
+
+def ocr_noise(rng, size):
+    if rng.random() < 0.3:
+        return "".join(rng.choice(ADVERSARIAL_FRAGMENTS) for _ in range(size // 4))[:size]
+    alphabet = rng.choice(NOISE_ALPHABETS)
+    return "".join(rng.choice(alphabet) for _ in range(size))
+
+
+def test_detailed_entries():
+    info = extract_medication_info(
+        "Amoxicillin 500mg: Take 1 tablet three times daily for 7 days.\n"
+        "Lipitor 20 mg - 1 tablet daily at bedtime"
+    )
+    assert info["detailed"] == [
+        {"medication": "Amoxicillin", "strength": "500mg", "instructions": "Take 1 tablet three times daily for 7 days"},
+        {"medication": "Lipitor", "strength": "20 mg", "instructions": "1 tablet daily at bedtime"},
+    ]
+    assert info["duration"] == "7 days"
+    assert info["frequency"] == ["three times daily", "daily"]
+
+
+def test_simple_fields():
+    info = extract_medication_info("Paracetamol 650mg tablet every 6 hours x 3 days")
+    assert info == {
+        "medication_name": "Paracetamol",
+        "medications": [{"name": "Paracetamol", "generic": "paracetamol", "strength": "650mg",
+                         "frequency": "every 6 hours", "duration": "3 days"}],
+        "coverage": 1.0,
+        "dosage": "650mg tablet",
+        "frequency": "every 6 hours",
+        "duration": "3 days",
+    }
+    assert format_patient_instructions(info) == ["Take Paracetamol (650mg) every 6 hours for 3 days"]
+    assert format_patient_instructions({"dosage": ["500mg", "20mg"], "frequency": "daily"}) == [
+        "Dosage: 500mg, 20mg",
+        "Frequency: daily",
+    ]
+
+
+def test_ocr_misspellings_and_brands():
+    info = extract_medication_info("Amoxicilin 500mg: 1 tab TID. Metfromin 850 mg BID. Insulin Glargine 10 units at night")
+    assert info["medication_name"] == ["Amoxicillin", "Metformin", "Insulin Glargine"]
+    assert [m["strength"] for m in info["medications"]] == ["500mg", "850 mg", "N/A"]
+    assert extract_medication_info("Lipitor 20mg")["medications"][0]["generic"] == "atorvastatin"
+    # Capitalized words that are not drugs are no longer reported as medications
+    assert "medication_name" not in extract_medication_info("Patient Review Clinic Monday")
+
+
+def test_lexicon_index_is_cached_and_rebuilt_when_stale_or_damaged():
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = Path(directory) / "medications.csv"
+        shutil.copy(medication_lexicon.LEXICON_PATH, csv_path)
+        index_path = csv_path.with_suffix(medication_lexicon.INDEX_SUFFIX)
+
+        built = medication_lexicon.MedicationLexicon.load(csv_path)
+        assert json.loads(index_path.read_text())["version"] == medication_lexicon.INDEX_VERSION
+        assert medication_lexicon.MedicationLexicon.load(csv_path).lookup("amoxicilin") == built.lookup("amoxicilin")
+
+        class Payload:
+            def __reduce__(self):
+                return (open, (str(Path(directory) / "executed"), "w"))
+
+        damaged = [
+            b"not json",
+            pickle.dumps({"version": medication_lexicon.INDEX_VERSION, "payload": Payload()}),
+            index_path.read_text().replace('"exact":{', '"exact":{"zzz":99999,').encode(),
+            json.dumps({"version": medication_lexicon.INDEX_VERSION, "source_hash": "stale"}).encode(),
+        ]
+        for content in damaged:
+            index_path.write_bytes(content)
+            lexicon = medication_lexicon.MedicationLexicon.load(csv_path)
+            assert len(lexicon) == len(built) and lexicon.lookup("zzz") is None
+            assert json.loads(index_path.read_text())["source_hash"] != "stale"
+        assert not (Path(directory) / "executed").exists()
+
+
+def confidence(text):
+    return extraction_confidence(text, extract_medication_info(text))
+
+
+def test_confidence_needs_a_strength_and_frequency_for_every_drug():
+    assert confidence("Metformin 500mg BID") == 1.0
+    assert confidence("Metformin 500mg BID, Atorvastatin 20mg daily") == 1.0
+    assert confidence("Metformin 500mg, Atorvastatin 20mg daily") <= UNCERTAIN_CONFIDENCE_CAP
+    assert confidence("Metformin 500mg BID, Atorvastatin daily") <= UNCERTAIN_CONFIDENCE_CAP
+    info = extract_medication_info("Metformin 500mg BID, Atorvastatin 20mg daily")
+    assert [m["frequency"] for m in info["medications"]] == ["BID", "daily"]
+
+
+def test_negated_instructions_are_not_confident():
+    for text in [
+        "Warfarin 5mg daily. Do not take with aspirin.",
+        "Metformin 500mg BID, Atorvastatin 20mg daily, stop Aspirin",
+        "Ibuprofen 400mg TID, avoid alcohol",
+        "Discontinue Lisinopril 10mg daily",
+        "Paracetamol 500mg QID instead of Ibuprofen 400mg TID",
+    ]:
+        assert confidence(text) <= UNCERTAIN_CONFIDENCE_CAP, text
+
+
+def test_each_drug_keeps_its_own_dose():
+    info = extract_medication_info("Lisinopril 10mg daily, Metformin 500mg BID")
+    assert confidence("Lisinopril 10mg daily, Metformin 500mg BID") == 1.0
+    assert format_patient_instructions(info) == ["Take Lisinopril (10mg) daily", "Take Metformin (500mg) BID"]
+    assert format_patient_instructions(extract_medication_info("Take Metformin 500mg tablet by mouth twice daily")) == \
+        ["Take Metformin (500mg) twice daily"]
+
+
+def test_text_the_rules_did_not_read_is_not_confident():
+    for text, left_out in [
+        ("Metformin 500mg 2 tablets BID", ["2"]),
+        ("Prednisone 40mg daily for 5 days then 20mg daily for 5 days", ["then", "20mg", "daily", "for 5 days"]),
+        ("Warfarin 5mg daily except Sunday", ["except", "Sunday"]),
+        ("Aspirin 81mg daily; if bleeding go to ER", ["if", "bleeding", "go", "to", "ER"]),
+        ("Metformin 500mg BID with meals", ["with", "meals"]),
+    ]:
+        info = extract_medication_info(text)
+        assert info["unparsed"] == left_out, text
+        assert info["coverage"] < 1.0
+        assert confidence(text) <= UNCERTAIN_CONFIDENCE_CAP, text
+    # "three times daily" is read as a whole, not as "daily"
+    assert extract_medication_info("Amoxicillin 500mg three times daily")["frequency"] == "three times daily"
+
+
+def test_no_medication():
+    assert extract_medication_info("") == {}
+    assert extract_medication_info("   \n\t ...") == {}
+
+
+def test_fuzz_ocr_noise_is_linear():
+    rng = random.Random(1234)
+    for _ in range(60):
+        size = rng.choice([2000, 8000, 32000, 64000])
+        text = ocr_noise(rng, size)
+
+        start = time.perf_counter()
+        info = extract_medication_info(text)
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < MAX_SECONDS_PER_KB * size / 1000 + 0.05, f"{elapsed:.3f}s for {size} bytes"
+        for entry in info.get("detailed", []):
+            assert set(entry) == {"medication", "strength", "instructions"}
+        format_patient_instructions(info)
+
+
+def test_time_grows_linearly():
+    rng = random.Random(99)
+    alphabet = string.ascii_letters + "  \t"
+    small = "".join(rng.choice(alphabet) for _ in range(8000))
+    large = "".join(rng.choice(alphabet) for _ in range(64000))
+
+    def best_of_three(text):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            extract_medication_info(text)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    # 8x the input: linear is ~8x, quadratic would be ~64x
+    assert best_of_three(large) < 16 * best_of_three(small) + 0.01
+
+
+def test_worst_case_for_old_pattern():
+    # Letters and blanks with no separator made the old 'detailed' regex quadratic
+    text = ("Amoxicillin tablet twice " * 2000)[:50000]
+    start = time.perf_counter()
+    extract_medication_info(text)
+    assert time.perf_counter() - start < 0.5
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the rule-based extractor...")
+    print("=" * 50)
+
+    tests = [
+        test_detailed_entries,
+        test_simple_fields,
+        test_ocr_misspellings_and_brands,
+        test_lexicon_index_is_cached_and_rebuilt_when_stale_or_damaged,
+        test_confidence_needs_a_strength_and_frequency_for_every_drug,
+        test_negated_instructions_are_not_confident,
+        test_each_drug_keeps_its_own_dose,
+        test_text_the_rules_did_not_read_is_not_confident,
+        test_no_medication,
+        test_fuzz_ocr_noise_is_linear,
+        test_time_grows_linearly,
+        test_worst_case_for_old_pattern,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Session cache tests: revocations shared between worker processes.
+
+    python test_session_cache.py    (or: python -m pytest test_session_cache.py)
+"""
+
+import multiprocessing
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from session_cache import RevocationLog, SessionCache, UserSnapshot
+
+EXPIRES_AT = datetime.utcnow() + timedelta(hours=1)
+
+
+def snapshot(user_id):
+    return UserSnapshot(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                        user_type="patient", created_at=None)
+
+
+def make_cache(path, slots=64):
+    return SessionCache(ttl=60, revocations=RevocationLog(path, slots=slots))
+
+
+def revoke_in_child(path, token):
+    make_cache(path).invalidate(token)
+
+
+def test_logout_in_another_process_reaches_the_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revocations.bin")
+        cache = make_cache(path)
+        cache.put("token-a", snapshot(1), EXPIRES_AT)
+        cache.put("token-b", snapshot(2), EXPIRES_AT)
+
+        child = multiprocessing.get_context("spawn").Process(target=revoke_in_child, args=(path, "token-a"))
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+
+        assert cache.get("token-a") is None
+        assert cache.get("token-b") == snapshot(2)
+
+
+def test_user_revocation_drops_every_session_of_the_user():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revocations.bin")
+        worker_a, worker_b = make_cache(path), make_cache(path)
+        for token in ("t1", "t2"):
+            worker_b.put(token, snapshot(7), EXPIRES_AT)
+        worker_b.put("t3", snapshot(8), EXPIRES_AT)
+
+        worker_a.invalidate_user(7)
+
+        assert worker_b.get("t1") is None and worker_b.get("t2") is None
+        assert worker_b.get("t3") == snapshot(8)
+
+
+def test_put_after_a_concurrent_revocation_is_refused():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revocations.bin")
+        worker_a, worker_b = make_cache(path), make_cache(path)
+        assert worker_b.get("token") is None  # miss: worker B goes to the database...
+        worker_a.invalidate("token")  # ...while worker A logs the session out
+        worker_b.put("token", snapshot(1), EXPIRES_AT)  # B's row was read before the logout
+        assert worker_b.get("token") is None
+
+
+def test_reader_behind_the_ring_clears_its_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revocations.bin")
+        worker_a, worker_b = make_cache(path, slots=8), make_cache(path, slots=8)
+        worker_b.put("kept", snapshot(1), EXPIRES_AT)
+        for index in range(20):
+            worker_a.invalidate(f"other-{index}")
+
+        assert worker_b.get("kept") is None
+        assert worker_b.stats["resyncs"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the session cache...")
+    print("=" * 50)
+
+    tests = [
+        test_logout_in_another_process_reaches_the_cache,
+        test_user_revocation_drops_every_session_of_the_user,
+        test_put_after_a_concurrent_revocation_is_refused,
+        test_reader_behind_the_ring_clears_its_cache,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
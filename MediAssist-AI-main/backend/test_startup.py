@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Cold start tests: importing the app leaves the heavy subsystems unloaded.
+
+    python test_startup.py    (or: python -m pytest test_startup.py)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "pytesseract", "gtts", "openai", "httpx")
+
+
+def loaded_after(code):
+    """Heavy modules present after running code in a fresh interpreter, from a scratch directory"""
+    script = f"import json, sys\n{code}\nprint(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run([sys.executable, "-c", script], cwd=directory, capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=BACKEND_DIR, WARM_UP="0"), check=True)
+        assert os.listdir(directory) == [], "importing main must not create files"
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_loads_no_heavy_subsystem():
+    assert loaded_after("import main") == []
+
+
+def test_warm_up_loads_them_ahead_of_traffic():
+    loaded = loaded_after("import main\nmain.warm_up()")
+    assert {"cv2", "numpy", "pytesseract", "openai"} <= set(loaded)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing cold start...")
+    print("=" * 50)
+
+    tests = [
+        test_import_loads_no_heavy_subsystem,
+        test_warm_up_loads_them_ahead_of_traffic,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
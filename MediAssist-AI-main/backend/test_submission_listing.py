@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Keyset pagination tests for the submission listings, on a scratch SQLite
+database: cursor round trips, bad cursors and filter combinations.
+
+    python test_submission_listing.py    (or: python -m pytest test_submission_listing.py)
+"""
+
+import base64
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+import db_config
+import submission_listing
+from database import Base, Submission
+
+START = datetime(2026, 1, 1)
+
+
+def with_submissions(rows, check):
+    """Run check(db, engine) against a database holding `rows` (dicts of Submission columns), ids from 1"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine, read_engine = db_config.create_engines(f"sqlite:///{os.path.join(directory, 'test.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(Submission.__table__.insert(), rows)
+        db = sessionmaker(class_=db_config.RoutingSession, bind=engine, read_bind=read_engine)()
+        try:
+            return check(db, engine)
+        finally:
+            db.close()
+            engine.dispose()
+            read_engine.dispose()
+
+
+def sample_rows(count=25):
+    # Every created_at appears twice, so pages must break ties on id
+    return [
+        {"user_id": 1 + i % 3, "type": "audio" if i % 4 == 0 else "prescription",
+         "status": "approved" if i % 5 == 0 else "pending", "created_at": START + timedelta(minutes=i // 2)}
+        for i in range(count)
+    ]
+
+
+def all_pages(db, limit, **filters):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page = submission_listing.list_submissions(db, limit=limit, cursor=cursor, **filters)
+        ids += [row.id for row in page["submissions"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+def newest_first(rows, keep=lambda row: True):
+    numbered = [(row["created_at"], i + 1) for i, row in enumerate(rows) if keep(row)]
+    return [submission_id for _, submission_id in sorted(numbered, reverse=True)]
+
+
+def test_cursor_walks_every_row_once_newest_first():
+    rows = sample_rows()
+
+    def check(db, engine):
+        ids, pages = all_pages(db, limit=4)
+        assert ids == newest_first(rows)
+        assert pages == 7  # 25 rows in pages of 4
+
+    with_submissions(rows, check)
+
+
+def test_exact_last_page_has_no_cursor():
+    def check(db, engine):
+        page = submission_listing.list_submissions(db, limit=10)
+        assert len(page["submissions"]) == 10 and page["next_cursor"] is None
+
+    with_submissions(sample_rows(10), check)
+
+
+def test_new_rows_do_not_shift_later_pages():
+    rows = sample_rows(12)
+
+    def check(db, engine):
+        first = submission_listing.list_submissions(db, limit=5)
+        with engine.begin() as conn:
+            conn.execute(Submission.__table__.insert(), [
+                {"user_id": 1, "type": "audio", "status": "pending", "created_at": START + timedelta(days=1)}
+            ])
+        second = submission_listing.list_submissions(db, limit=5, cursor=first["next_cursor"])
+        assert [row.id for row in second["submissions"]] == newest_first(rows)[5:10]
+
+    with_submissions(rows, check)
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 4, 5, 6, 7, 890123)
+    cursor = submission_listing.encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert submission_listing.decode_cursor(cursor) == (created_at, 42)
+
+
+def test_bad_cursors_are_rejected_with_400():
+    bad = [
+        "not a cursor!",
+        base64.urlsafe_b64encode(b"not json").decode(),
+        base64.urlsafe_b64encode(b'["2026-01-01T00:00:00"]').decode(),
+        base64.urlsafe_b64encode(b'["yesterday", 5]').decode(),
+        base64.urlsafe_b64encode(b'["2026-01-01T00:00:00", "five"]').decode(),
+        base64.urlsafe_b64encode(b'{"id": 5}').decode(),
+    ]
+    for cursor in bad:
+        try:
+            submission_listing.decode_cursor(cursor)
+        except HTTPException as e:
+            assert e.status_code == 400, cursor
+        else:
+            raise AssertionError(f"accepted {cursor!r}")
+
+
+def test_filters_combine_with_each_other_and_the_cursor():
+    rows = sample_rows(40)
+    after, before = START + timedelta(minutes=3), START + timedelta(minutes=15)
+
+    def check(db, engine):
+        ids, _ = all_pages(db, limit=3, user_id=2, status_filter="pending")
+        assert ids == newest_first(rows, lambda row: row["user_id"] == 2 and row["status"] == "pending")
+
+        ids, _ = all_pages(db, limit=3, type_filter="audio", created_after=after, created_before=before)
+        assert ids == newest_first(rows, lambda row: row["type"] == "audio" and after <= row["created_at"] < before)
+
+        page = submission_listing.list_submissions(db, limit=5, user_id=99)
+        assert page == {"submissions": [], "next_cursor": None}
+
+    with_submissions(rows, check)
+
+
+def test_summary_projection_leaves_out_the_text_columns():
+    rows = sample_rows(6)
+
+    def check(db, engine):
+        page = submission_listing.list_submissions(db, limit=3, fields="summary")
+        assert [row["id"] for row in page["submissions"]] == newest_first(rows)[:3]
+        assert set(page["submissions"][0]) == {"id", "user_id", "type", "status", "created_at"}
+        rest = submission_listing.list_submissions(db, limit=3, fields="summary", cursor=page["next_cursor"])
+        assert [row["id"] for row in rest["submissions"]] == newest_first(rows)[3:]
+
+    with_submissions(rows, check)
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the submission listings...")
+    print("=" * 50)
+
+    tests = [
+        test_cursor_walks_every_row_once_newest_first,
+        test_exact_last_page_has_no_cursor,
+        test_new_rows_do_not_shift_later_pages,
+        test_cursor_round_trip,
+        test_bad_cursors_are_rejected_with_400,
+        test_filters_combine_with_each_other_and_the_cursor,
+        test_summary_projection_leaves_out_the_text_columns,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Bulk review tests, on a scratch SQLite database.
+
+    python test_submission_review.py    (or: python -m pytest test_submission_review.py)
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import db_config
+import submission_review
+from database import Base, Submission
+from test_auth import run_scenario
+
+DOCTOR_ID = 7
+
+
+def with_submissions(rows, check):
+    """Run check(sessionmaker) against a database holding `rows` pending submissions"""
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'test.db')}"
+        engine, _ = db_config.create_engines(url)
+        Base.metadata.create_all(bind=engine)
+        start = datetime.utcnow() - timedelta(days=1)
+        with engine.begin() as conn:
+            conn.execute(Submission.__table__.insert(), [
+                {"user_id": 1 + i % 2, "type": "prescription", "status": "pending", "created_at": start + timedelta(seconds=i)}
+                for i in range(rows)
+            ])
+        engine.dispose()
+
+        async def run():
+            async_engine, async_read_engine = db_config.create_async_engines(url)
+            Session = async_sessionmaker(bind=async_engine, sync_session_class=db_config.AsyncRoutingSession,
+                                         read_bind=async_read_engine.sync_engine, expire_on_commit=False)
+            try:
+                return await check(Session)
+            finally:
+                await async_engine.dispose()
+                await async_read_engine.dispose()
+
+        return asyncio.run(run())
+
+
+async def statuses(Session):
+    async with Session() as db:
+        rows = (await db.execute(select(Submission.id, Submission.status, Submission.approved_by).order_by(Submission.id))).all()
+    return {row.id: (row.status, row.approved_by) for row in rows}
+
+
+def test_review_by_ids_reports_each_id():
+    async def check(Session):
+        async with Session() as db:
+            results = await submission_review.review_by_ids(db, [3, 1, 99, 3], "rejected", DOCTOR_ID)
+        assert results == [
+            {"submission_id": 3, "result": "rejected"},
+            {"submission_id": 1, "result": "rejected"},
+            {"submission_id": 99, "result": "not_found"},
+        ]
+        rows = await statuses(Session)
+        assert rows[1] == rows[3] == ("rejected", DOCTOR_ID)
+        assert rows[2] == ("pending", None)
+
+    with_submissions(5, check)
+
+
+def test_review_by_filter_is_bounded():
+    async def check(Session):
+        async with Session() as db:
+            first, more = await submission_review.review_by_filter(
+                db, "approved", DOCTOR_ID, limit=3, user_id=1, status_filter="pending")
+        assert (first, more) == ([1, 3, 5], True)
+        async with Session() as db:
+            rest, more = await submission_review.review_by_filter(
+                db, "approved", DOCTOR_ID, limit=3, user_id=1, status_filter="pending")
+        assert (rest, more) == ([7, 9], False)
+        rows = await statuses(Session)
+        assert [i for i, (state, _) in rows.items() if state == "approved"] == [1, 3, 5, 7, 9]
+
+    with_submissions(10, check)
+
+
+async def set_statuses(Session, by_id):
+    async with Session() as db:
+        for submission_id, state in by_id.items():
+            await db.execute(update(Submission).where(Submission.id == submission_id).values(status=state))
+        await db.commit()
+
+
+def test_only_reviewable_submissions_change():
+    async def check(Session):
+        await set_statuses(Session, {1: "queued", 2: "failed", 3: "approved"})
+        async with Session() as db:
+            results = await submission_review.review_by_ids(db, [1, 2, 3, 4, 99], "rejected", DOCTOR_ID)
+        assert [item["result"] for item in results] == ["not_reviewable", "not_reviewable", "rejected", "rejected", "not_found"]
+        rows = await statuses(Session)
+        assert rows[1] == ("queued", None) and rows[2] == ("failed", None)
+        assert rows[3] == rows[4] == ("rejected", DOCTOR_ID)
+
+        async with Session() as db:
+            reviewed, more = await submission_review.review_by_filter(db, "approved", DOCTOR_ID, user_id=1)
+        assert (reviewed, more) == ([3, 5], False)  # 1 is still queued
+        async with Session() as db:
+            reviewed, _ = await submission_review.review_by_filter(db, "approved", DOCTOR_ID, status_filter="queued")
+        assert reviewed == []
+        assert (await statuses(Session))[1] == ("queued", None)
+
+    with_submissions(5, check)
+
+
+def test_single_approve_refuses_unfinished_submissions():
+    result = run_scenario("""
+async def scenario(client):
+    doctor = {"username": "dr", "email": "dr@example.com", "password": "secret-1", "user_type": "doctor"}
+    await client.post("/register", json=doctor)
+    login = await client.post("/login", json={"username": "dr", "password": "secret-1"})
+    headers = {"Authorization": f"Bearer {login.json()['session_token']}"}
+    db = SessionLocal()
+    for state in ("queued", "failed", "pending"):
+        db.add(Submission(user_id=1, type="prescription", status=state))
+    db.commit()
+    codes = [(await client.put(f"/approve/{i}", headers=headers)).status_code for i in (1, 2, 3, 4)]
+    statuses = [row.status for row in db.query(Submission).order_by(Submission.id)]
+    db.close()
+    return [codes, statuses]
+from database import Submission
+print(json.dumps(asyncio.run(run(scenario))))
+""")
+    assert result == [[409, 409, 200, 404], ["queued", "failed", "approved"]]
+
+
+def test_ten_thousand_ids_in_one_call():
+    async def check(Session):
+        async with Session() as db:
+            start = time.perf_counter()
+            results = await submission_review.review_by_ids(db, list(range(1, 10001)), "approved", DOCTOR_ID)
+            elapsed = time.perf_counter() - start
+        assert sum(1 for item in results if item["result"] == "approved") == 10000
+        return elapsed
+
+    elapsed = with_submissions(20000, check)
+    print(f"   10000 ids reviewed in {elapsed * 1000:.0f} ms")
+    assert elapsed < 1.0
+
+
+if __name__ == "__main__":
+    print("🧪 Testing bulk submission reviews...")
+    print("=" * 50)
+
+    tests = [
+        test_review_by_ids_reports_each_id,
+        test_review_by_filter_is_bounded,
+        test_only_reviewable_submissions_change,
+        test_single_approve_refuses_unfinished_submissions,
+        test_ten_thousand_ids_in_one_call,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
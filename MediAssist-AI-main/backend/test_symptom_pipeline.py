@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Symptom pipeline tests: batching, caching and the rule-based fallback of the
+doctor summaries, against a fake LLM gateway (no network or API key needed).
+
+    python test_symptom_pipeline.py    (or: python -m pytest test_symptom_pipeline.py)
+"""
+
+import asyncio
+import re
+
+import rule_based_summarizer
+from ai_integration import SymptomSummarizer
+from llm_gateway import LLMUnavailable
+
+
+class FakeGateway:
+    """Answers each chat request after `latency` seconds; batches get one '### n' section per patient"""
+
+    def __init__(self, latency=0.05, skip_sections=(), unavailable=False):
+        self.latency = latency
+        self.skip_sections = set(skip_sections)
+        self.unavailable = unavailable
+        self.requests = []
+        self.configured = True
+
+    async def chat(self, messages):
+        prompt = messages[-1]["content"]
+        self.requests.append(prompt)
+        await asyncio.sleep(self.latency)
+        if self.unavailable:
+            raise LLMUnavailable("OpenAI API circuit open")
+        transcripts = re.findall(r'"(.*)"', prompt)
+        if len(transcripts) == 1 and "###" not in prompt:
+            return f"Summary of {transcripts[0]}"
+        return "\n".join(f"### {i}\nSummary of {text}" for i, text in enumerate(transcripts, 1)
+                         if i not in self.skip_sections)
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, kind, content_hash):
+        return self.entries.get((kind, content_hash))
+
+    def put(self, kind, content_hash, value):
+        self.entries[(kind, content_hash)] = value
+
+
+def make_summarizer(gateway, batch_size=8):
+    return SymptomSummarizer(gateway=gateway, cache=DictCache(), batch_size=batch_size, batch_wait=0.02)
+
+
+async def summarize_all(summarizer, transcripts):
+    return await asyncio.gather(*(summarizer.summarize(text) for text in transcripts))
+
+
+def test_concurrent_transcripts_share_chat_requests():
+    gateway = FakeGateway()
+    summarizer = make_summarizer(gateway)
+    transcripts = [f"I have had a headache for {i} days" for i in range(1, 33)]
+
+    results = asyncio.run(summarize_all(summarizer, transcripts))
+
+    assert results == [(f"Summary of {text}", "llm") for text in transcripts]
+    assert len(gateway.requests) <= 5  # batches of up to 8, perhaps the first transcript alone
+    assert summarizer.stats["batched_items"] >= 31
+
+
+def test_a_lone_transcript_is_not_held_back():
+    gateway = FakeGateway()
+    summarizer = SymptomSummarizer(gateway=gateway, cache=DictCache(), batch_wait=5.0)
+    assert asyncio.run(summarizer.summarize("I feel dizzy")) == ("Summary of I feel dizzy", "llm")
+    assert "###" not in gateway.requests[0]
+
+
+def test_identical_transcripts_are_summarized_once():
+    gateway = FakeGateway()
+    summarizer = make_summarizer(gateway)
+
+    async def scenario():
+        first = await summarize_all(summarizer, ["My throat hurts"] * 5)
+        again = await summarizer.summarize("my throat  HURTS")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+
+    assert len(gateway.requests) == 1
+    assert first[0] == ("Summary of My throat hurts", "llm")
+    assert all(result == ("Summary of My throat hurts", "cached") for result in first[1:])
+    assert again == ("Summary of My throat hurts", "cached")
+
+
+def test_unavailable_llm_falls_back_to_rules():
+    gateway = FakeGateway(unavailable=True)
+    summarizer = make_summarizer(gateway)
+    transcripts = ["I have a cough and a fever", "I have a mild headache", "My back hurts since Monday"]
+
+    results = asyncio.run(summarize_all(summarizer, transcripts))
+
+    assert results == [(rule_based_summarizer.summarize_symptoms(text), "rules") for text in transcripts]
+    assert summarizer.cache.entries == {}  # fallbacks are not cached
+
+
+def test_missing_section_is_retried_alone():
+    gateway = FakeGateway(skip_sections={2})
+    summarizer = make_summarizer(gateway)
+    transcripts = [f"I have had a rash for {i} days" for i in range(1, 6)]
+
+    results = asyncio.run(summarize_all(summarizer, transcripts))
+
+    assert results == [(f"Summary of {text}", "llm") for text in transcripts]
+    assert any(request.startswith("\nYou are a medical assistant AI") and transcripts[1] in request
+               for request in gateway.requests)
+
+
+def test_cancelled_batch_does_not_strand_its_callers():
+    gateway = FakeGateway(latency=5.0)
+    summarizer = make_summarizer(gateway)
+    transcripts = ["I feel dizzy", "I have a cough"]
+
+    async def scenario():
+        waiting = [asyncio.create_task(summarizer.summarize(text)) for text in transcripts]
+        await asyncio.sleep(0.1)  # both batches are now waiting on the slow LLM
+        state = summarizer._state()
+        for task in list(state.tasks):
+            task.cancel()
+        first = await asyncio.wait_for(asyncio.gather(*waiting), 1.0)
+        gateway.latency = 0.01
+        again = await asyncio.wait_for(summarizer.summarize(transcripts[0]), 1.0)
+        return first, again, state
+
+    first, again, state = asyncio.run(scenario())
+
+    assert first == [(rule_based_summarizer.summarize_symptoms(text), "rules") for text in transcripts]
+    assert again == ("Summary of I feel dizzy", "llm")
+    assert state.inflight == {} and state.active == 0
+
+
+def test_rule_based_summaries():
+    summarize = rule_based_summarizer.summarize_symptoms
+    assert summarize("I have had a headache and a mild fever for three days") == \
+        "Patient reports headache and fever for 3 days, described as mild."
+    assert summarize("I've been throwing up since yesterday and my stomach hurts really bad, but no fever") == \
+        "Patient reports vomiting and abdominal pain since yesterday, described as severe; denies fever."
+    assert summarize("No cough, no fever.") == "Patient denies cough and fever."
+    assert summarize("") == "No symptoms described."
+
+
+def test_rule_based_summaries_leave_out_other_peoples_symptoms():
+    summarize = rule_based_summarizer.summarize_symptoms
+    assert summarize("My daughter has a rash.") == 'Patient reports: "My daughter has a rash."'
+    assert summarize("My daughter has a rash and I have a fever") == "Patient reports fever."
+    assert summarize("I have a headache. My son has a cough and he is throwing up") == "Patient reports headache."
+    assert summarize("My wife says I have been coughing for 3 days") == "Patient reports cough for 3 days."
+    assert summarize("My head hurts and my stomach hurts") == "Patient reports headache and abdominal pain."
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the symptom pipeline...")
+    print("=" * 50)
+
+    tests = [
+        test_concurrent_transcripts_share_chat_requests,
+        test_a_lone_transcript_is_not_held_back,
+        test_identical_transcripts_are_summarized_once,
+        test_unavailable_llm_falls_back_to_rules,
+        test_missing_section_is_retried_alone,
+        test_cancelled_batch_does_not_strand_its_callers,
+        test_rule_based_summaries,
+        test_rule_based_summaries_leave_out_other_peoples_symptoms,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+TTS cache tests against the fake TTS backend (silent audio, no network).
+
+    python test_tts_cache.py    (or: python -m pytest test_tts_cache.py)
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from tts_cache import TTSCache, split_sentences
+from tts_generator import FakeTTSBackend
+
+INSTRUCTIONS = "Take Amoxicillin 500mg three times daily for 7 days."
+
+
+def make_cache(directory, delay=0.0, **kwargs):
+    return TTSCache(directory=directory, backend=FakeTTSBackend(delay=delay), **kwargs)
+
+
+def test_repeat_request_reuses_the_file():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+
+        async def twice():
+            first = await cache.get_or_render(INSTRUCTIONS)
+            second = await cache.get_or_render("  " + INSTRUCTIONS + "\n")
+            return first, second
+
+        (filename, cached), (again, cached_again) = asyncio.run(twice())
+        assert filename == again
+        assert (cached, cached_again) == (False, True)
+        assert cache.backend.renders == 1
+        assert os.listdir(directory) == [filename]
+
+
+def test_language_is_part_of_the_key():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+
+        async def both():
+            return await cache.get_or_render(INSTRUCTIONS, "en"), await cache.get_or_render(INSTRUCTIONS, "hi")
+
+        (english, _), (hindi, _) = asyncio.run(both())
+        assert english != hindi
+        assert cache.backend.renders == 2
+
+
+def test_concurrent_identical_requests_render_once():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory, delay=0.2)
+
+        async def burst():
+            return await asyncio.gather(*(cache.get_or_render(INSTRUCTIONS) for _ in range(10)))
+
+        results = asyncio.run(burst())
+        assert len({filename for filename, _ in results}) == 1
+        assert cache.backend.renders == 1
+        assert cache.stats["shared"] == 9
+
+
+def test_renders_do_not_block_the_event_loop():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory, delay=0.3)
+
+        async def render_while_ticking():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            await asyncio.gather(*(cache.get_or_render(f"{INSTRUCTIONS} {i}") for i in range(4)))
+            task.cancel()
+            return ticks
+
+        start = time.perf_counter()
+        ticks = asyncio.run(render_while_ticking())
+        assert ticks >= 15
+        assert time.perf_counter() - start < 1.0  # 4 renderings in parallel, not 1.2 s in a row
+
+
+def test_sweep_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+        texts = [f"Instruction number {i}, taken with water." for i in range(4)]
+
+        async def render_all():
+            return [(await cache.get_or_render(text))[0] for text in texts]
+
+        filenames = asyncio.run(render_all())
+        size = os.path.getsize(Path(directory) / filenames[0])
+        for age, filename in enumerate(reversed(filenames)):
+            past = time.time() - 100 * (age + 1)
+            os.utime(Path(directory) / filename, (past, past))  # filenames[0] is the oldest
+
+        asyncio.run(cache.get_or_render(texts[0]))  # a hit makes it the most recently used
+        cache.max_bytes = 2 * size
+        assert cache.sweep() == 2
+        assert sorted(os.listdir(directory)) == sorted([filenames[0], filenames[3]])
+        assert cache.stats["evictions"] == 2
+
+
+def test_failed_render_is_not_cached():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+
+        def broken(text, filename, language='en'):
+            with open(filename, 'wb') as f:
+                f.write(b"partial")
+            raise RuntimeError("TTS service unavailable")
+
+        cache.backend.render = broken
+        try:
+            asyncio.run(cache.get_or_render(INSTRUCTIONS))
+            assert False, "expected RuntimeError"
+        except RuntimeError:
+            pass
+        assert os.listdir(directory) == []
+        assert cache.stats["failures"] == 1
+
+
+def test_split_sentences():
+    assert split_sentences("Take 2.5 mg at night. Take with food!\nAvoid alcohol") == [
+        "Take 2.5 mg at night.", "Take with food!", "Avoid alcohol"]
+    assert split_sentences("  \n ") == []
+
+
+def test_stream_yields_first_sentence_early():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory, delay=0.2, workers=2)
+        text = " ".join(f"Instruction {i} for the patient." for i in range(6))
+
+        async def collect():
+            start = time.perf_counter()
+            chunks = []
+            first_at = None
+            async for chunk in cache.stream(text):
+                first_at = first_at or time.perf_counter() - start
+                chunks.append(chunk)
+            return first_at, time.perf_counter() - start, chunks
+
+        first_at, total, chunks = asyncio.run(collect())
+        assert len(chunks) == 6
+        assert first_at < 0.35 < total  # 6 sentences on 2 workers take at least 0.6 s in total
+
+        async def whole_sentences():
+            parts = []
+            for sentence in split_sentences(text):
+                filename, cached = await cache.get_or_render(sentence)
+                assert cached
+                parts.append((Path(directory) / filename).read_bytes())
+            return parts
+
+        assert asyncio.run(whole_sentences()) == chunks
+
+
+def test_common_sentences_are_rendered_once():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+
+        async def stream_both():
+            for text in ("Take Metformin 500mg twice daily. Take with food.",
+                         "Take Lipitor 20mg at bedtime. Take with food."):
+                async for _ in cache.stream(text):
+                    pass
+
+        asyncio.run(stream_both())
+        assert cache.backend.renders == 3
+        assert cache.stats["hits"] == 1
+
+
+if __name__ == "__main__":
+    print("🧪 Testing the TTS cache with the fake backend...")
+    print("=" * 50)
+
+    tests = [
+        test_repeat_request_reuses_the_file,
+        test_language_is_part_of_the_key,
+        test_concurrent_identical_requests_render_once,
+        test_renders_do_not_block_the_event_loop,
+        test_sweep_evicts_least_recently_used,
+        test_failed_render_is_not_cached,
+        test_split_sentences,
+        test_stream_yields_first_sentence_early,
+        test_common_sentences_are_rendered_once,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+            passed += 1
+        except Exception as e:
+            print(f"❌ {test.__name__}: {e!r}")
+
+    print("=" * 50)
+    print(f"📊 Results: {passed}/{len(tests)} tests passed")
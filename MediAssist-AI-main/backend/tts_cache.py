@@ -0,0 +1,185 @@
+# tts_cache.py
+# Content-addressed cache of rendered patient instruction audio.
+#
+# Each rendering is stored once, as tts_<hash>.mp3 in the uploads directory,
+# where the hash covers the backend, language and text. Repeat requests get
+# the existing file without touching the TTS service, and identical requests
+# arriving while a rendering is in progress wait for that rendering instead of
+# starting their own. Renderings run in a small thread pool so a slow TTS call
+# never blocks the event loop.
+#
+# Long instructions can also be streamed: the text is split into sentences,
+# every sentence is rendered (and cached) on its own and concurrently, and the
+# MP3 chunks are sent in order as soon as each is ready. MP3 is a sequence of
+# self-contained frames, so the concatenated chunks play as one file.
+#
+# A file's modification time doubles as its last-use time (it is bumped on
+# every hit), so a background sweeper can evict least recently used files
+# whenever the cache grows past TTS_CACHE_MAX_BYTES, even across restarts.
+import asyncio
+import hashlib
+import os
+import re
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import metrics
+import tts_generator
+from uploads import UPLOAD_DIRECTORY
+
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_SWEEP_INTERVAL = float(os.getenv("TTS_CACHE_SWEEP_INTERVAL", "300"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "4"))
+
+FILE_PREFIX = "tts_"
+
+# Temporary files older than this belong to a rendering that died
+STALE_TEMPORARY_AFTER = 3600
+
+# Sentence boundary: end punctuation followed by whitespace ("2.5 mg" stays whole), or a line break
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+def split_sentences(text):
+    """The non-empty sentences of text, in order"""
+    return [sentence for sentence in (part.strip() for part in _SENTENCE_BREAK_RE.split(text)) if sentence]
+
+
+class TTSCache:
+    def __init__(self, directory=UPLOAD_DIRECTORY, backend=None, max_bytes=TTS_CACHE_MAX_BYTES,
+                 sweep_interval=TTS_CACHE_SWEEP_INTERVAL, workers=TTS_WORKERS):
+        self.directory = Path(directory)
+        self.backend = backend or tts_generator.get_backend()
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self._renders = weakref.WeakKeyDictionary()  # event loop -> {key: Future}
+        self._sweeper = None
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "failures": 0, "evictions": 0}
+
+    def key(self, text, language):
+        digest = hashlib.sha256(f"{self.backend.name}\0{language}\0{text.strip()}".encode()).hexdigest()
+        return digest[:40]
+
+    def filename(self, key):
+        return f"{FILE_PREFIX}{key}.mp3"
+
+    async def get_or_render(self, text, language='en'):
+        """Return (filename, cached): the audio for text, rendered only if not cached yet"""
+        key = self.key(text, language)
+        filename = self.filename(key)
+        path = self.directory / filename
+        if self._touch(path):
+            self.stats["hits"] += 1
+            return filename, True
+
+        loop = asyncio.get_running_loop()
+        renders = self._renders.setdefault(loop, {})
+        pending = renders.get(key)
+        if pending is not None:
+            self.stats["shared"] += 1
+            await asyncio.shield(pending)
+            return filename, True
+
+        self.stats["misses"] += 1
+        pending = renders[key] = loop.run_in_executor(self._executor, self._render, text.strip(), language, path)
+        try:
+            await asyncio.shield(pending)
+        except Exception:
+            self.stats["failures"] += 1
+            raise
+        finally:
+            renders.pop(key, None)
+        return filename, False
+
+    async def stream(self, text, language='en'):
+        """Yield the audio for text sentence by sentence, as soon as each sentence is rendered"""
+        sentences = split_sentences(text)
+        # Start every sentence at once; the thread pool bounds how many render in parallel
+        renders = [asyncio.ensure_future(self.get_or_render(sentence, language)) for sentence in sentences]
+        try:
+            for render in renders:
+                filename, _ = await render
+                yield await asyncio.to_thread((self.directory / filename).read_bytes)
+        finally:
+            # Client went away or a rendering failed: stop waiting for the rest
+            for render in renders:
+                render.cancel()
+            await asyncio.gather(*renders, return_exceptions=True)
+
+    def _render(self, text, language, path):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.{time.monotonic_ns()}.tmp")
+        try:
+            with metrics.registry.span("tts"):
+                self.backend.render(text, str(temporary), language)
+            os.replace(temporary, path)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    @staticmethod
+    def _touch(path):
+        """Mark a cached file as just used; False if it does not exist"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sweep(self):
+        """Delete least recently used renderings until the cache fits in max_bytes; returns the count removed"""
+        entries = []
+        total = 0
+        removed = 0
+        now = time.time()
+        for entry in os.scandir(self.directory) if self.directory.exists() else ():
+            if not entry.name.startswith(FILE_PREFIX):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.endswith(".tmp"):
+                if now - stat.st_mtime > STALE_TEMPORARY_AFTER:
+                    Path(entry.path).unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            Path(path).unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        self.stats["evictions"] += removed
+        return removed
+
+    async def start(self):
+        """Start the background sweeper"""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def _sweep_forever(self):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.sweep)
+                if removed:
+                    print(f"TTS cache: evicted {removed} least recently used renderings")
+            except Exception as e:
+                print(f"TTS cache sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+
+# Shared cache for the application
+cache = TTSCache()
@@ -1,16 +1,57 @@
 # tts_generator.py
-from typing import Optional, Any
-
-try:
-    from gtts import gTTS
-    GTTS_AVAILABLE = True
-except ImportError:
-    # Define a fallback to satisfy type checker
-    gTTS: Optional[Any] = None
-    GTTS_AVAILABLE = False
-    print("Warning: gtts not available. TTS functionality will be limited.")
-    
+import importlib.util
 import os
+import time
+
+# gtts (and the requests stack behind it) is imported on the first rendering
+GTTS_AVAILABLE = importlib.util.find_spec("gtts") is not None
+if not GTTS_AVAILABLE:
+    print("Warning: gtts not available. TTS functionality will be limited.")
+
+# Which backend renders audio for the TTS cache: 'gtts' or 'fake' (silent audio, for tests)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "gtts")
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), about 26 ms long
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class GTTSBackend:
+    """Google Text-to-Speech; needs network access"""
+
+    name = "gtts"
+
+    def render(self, text, filename, language='en'):
+        """Write the spoken text to filename as MP3; raises on failure"""
+        if not GTTS_AVAILABLE:
+            raise RuntimeError("gtts not installed")
+        from gtts import gTTS
+        gTTS(text=text, lang=language, slow=False).save(filename)
+
+
+class FakeTTSBackend:
+    """Writes silent audio roughly as long as the text would take to read; no network needed"""
+
+    name = "fake"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay  # seconds each rendering takes, to stand in for the real service
+        self.renders = 0
+
+    def render(self, text, filename, language='en'):
+        self.renders += 1
+        if self.delay:
+            time.sleep(self.delay)
+        frames = max(1, len(text.split()) * 15)  # ~0.4 s per word
+        with open(filename, 'wb') as f:
+            f.write(SILENT_MP3_FRAME * frames)
+
+
+def get_backend(name=TTS_BACKEND):
+    backends = {"gtts": GTTSBackend, "fake": FakeTTSBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown TTS backend {name!r}; expected one of {sorted(backends)}")
+    return backends[name]()
+
 
 def generate_tts(text, filename, language='en'):
     if not GTTS_AVAILABLE:
@@ -21,8 +62,7 @@ def generate_tts(text, filename, language='en'):
         return filename
     
     try:
-        if gTTS is None:
-            raise RuntimeError("gTTS not available")
+        from gtts import gTTS
         tts = gTTS(text=text, lang=language, slow=False)
         tts.save(filename)
         return filename
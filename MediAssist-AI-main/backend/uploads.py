@@ -0,0 +1,212 @@
+# uploads.py
+# Upload handling: size limits, hashing and in-memory decoding.
+#
+# Uploads are read once, in chunks, with a hard size cap. Small uploads stay in
+# memory; larger ones spill to a uniquely named spool file that is memory
+# mapped for decoding, and renamed (not copied) when it must be kept on disk.
+import asyncio
+import hashlib
+import mmap
+import os
+import uuid
+from pathlib import Path
+
+from fastapi import HTTPException, status
+
+# Hard cap for a single uploaded file (Whisper itself rejects audio over 25 MB)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+
+# Hard cap for a whole request body; batch uploads get a larger allowance
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(MAX_UPLOAD_BYTES + 1024 * 1024)))
+MAX_BATCH_REQUEST_BYTES = int(os.getenv("MAX_BATCH_REQUEST_BYTES", str(200 * 1024 * 1024)))
+
+# Uploads larger than this are spooled to disk instead of kept in memory
+SPOOL_MEMORY_LIMIT = int(os.getenv("SPOOL_MEMORY_LIMIT", str(4 * 1024 * 1024)))
+
+CHUNK_SIZE = 1024 * 1024
+
+UPLOAD_DIRECTORY = Path("./uploads")
+
+
+def _too_large(limit):
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the {limit / (1024 * 1024):.1f} MB limit"
+    )
+
+
+class Upload:
+    """An upload that has been fully received and hashed"""
+
+    def __init__(self, filename, content_hash, size, data=None, spool_path=None):
+        self.filename = filename
+        self.suffix = Path(filename).suffix
+        self.content_hash = content_hash
+        self.size = size
+        self._data = data  # bytes, when kept in memory
+        self._spool_path = spool_path  # Path, when spooled to disk
+        self._mmap = None
+        self._spool_file = None
+        self._open_files = []
+
+    @property
+    def in_memory(self):
+        return self._spool_path is None
+
+    @property
+    def path(self):
+        """Spool file path, or None for in-memory uploads"""
+        return self._spool_path
+
+    def source(self):
+        """What ocr_pipeline accepts: the bytes for in-memory uploads, otherwise the spool file path"""
+        return self._data if self.in_memory else str(self._spool_path)
+
+    def buffer(self):
+        """The upload's bytes as a buffer: the bytes object itself, or a read-only memory map of the spool file"""
+        if self.in_memory:
+            return self._data
+        if self._mmap is None:
+            self._spool_file = open(self._spool_path, "rb")
+            self._mmap = mmap.mmap(self._spool_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def as_file_tuple(self):
+        """(filename, content) in the form the OpenAI SDK accepts for file parameters"""
+        if self.in_memory:
+            return (self.filename, self._data)
+        handle = open(self._spool_path, "rb")
+        self._open_files.append(handle)
+        return (self.filename, handle)
+
+    def persist(self, path):
+        """Move the upload to `path` (a rename for spooled uploads, a single write otherwise); the caller now owns the file"""
+        path = Path(path)
+        if self.in_memory:
+            path.write_bytes(self._data)
+        else:
+            self._close_mmap()
+            os.replace(self._spool_path, path)
+        self._spool_path = None
+        self._data = None
+        return path
+
+    def close(self):
+        self._close_mmap()
+        if self._spool_path is not None:
+            try:
+                Path(self._spool_path).unlink()
+            except FileNotFoundError:
+                pass
+            self._spool_path = None
+        self._data = None
+
+    def _close_mmap(self):
+        for handle in self._open_files:
+            handle.close()
+        self._open_files = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def receive_upload(file, max_bytes=MAX_UPLOAD_BYTES, spool_limit=SPOOL_MEMORY_LIMIT, directory=UPLOAD_DIRECTORY):
+    """Read an UploadFile in chunks, enforcing max_bytes and hashing as it goes"""
+    # One worker thread for the whole copy: hashing and disk writes stay off the
+    # event loop, without a thread hop per chunk
+    return await asyncio.to_thread(
+        _receive, file.file, file.filename or "upload", max_bytes, spool_limit, directory
+    )
+
+
+def _receive(source, filename, max_bytes, spool_limit, directory):
+    digest = hashlib.sha256()
+    size = 0
+    chunks = []
+    spool_path = None
+    spool = None
+
+    try:
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+
+            if spool is None and size > spool_limit:
+                # Unique per request, so concurrent uploads never collide
+                spool_path = Path(directory) / f"spool_{uuid.uuid4().hex}"
+                spool = open(spool_path, "wb")
+                spool.writelines(chunks)
+                chunks = None
+
+            if spool is None:
+                chunks.append(chunk)
+            else:
+                spool.write(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            spool_path.unlink(missing_ok=True)
+        raise
+
+    if spool is not None:
+        spool.close()
+        return Upload(filename, digest.hexdigest(), size, spool_path=spool_path)
+    return Upload(filename, digest.hexdigest(), size, data=b"".join(chunks))
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware rejecting request bodies over a size limit before they are fully read"""
+
+    def __init__(self, app, default_limit=MAX_REQUEST_BYTES, limits=None):
+        self.app = app
+        self.default_limit = default_limit
+        self.limits = limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        limit = self.limits.get(scope["path"], self.default_limit)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                return await _send_too_large(send, limit)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside body parsing, so FastAPI turns it into a 413 response
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_too_large(send, limit):
+    body = f'{{"detail":"Upload exceeds the {limit / (1024 * 1024):.1f} MB limit"}}'.encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
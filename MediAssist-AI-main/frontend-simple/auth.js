@@ -227,6 +227,14 @@ function hideUserInfo() {
 
 // Logout user
 function logout() {
+    // Revoke the session on the server; plain fetch so a 401 can't recurse into logout()
+    if (sessionToken) {
+        fetch(`${API_BASE_URL}/logout`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${sessionToken}` }
+        }).catch(() => {});
+    }
+    
     // Clear session data
     sessionToken = null;
     currentUser = null;
@@ -294,6 +302,27 @@ async function makeAuthenticatedRequest(url, options = {}) {
     return response;
 }
 
+// Poll a queued submission until its background job has finished
+async function waitForJob(submissionId, intervalMs = 1000, timeoutMs = 120000) {
+    const deadline = Date.now() + timeoutMs;
+    
+    while (Date.now() < deadline) {
+        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/jobs/${submissionId}`);
+        const job = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(job.detail || 'Failed to get job status');
+        }
+        if (job.status === 'done' || job.status === 'failed') {
+            return job;
+        }
+        
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
+    
+    throw new Error('Timed out waiting for prescription processing');
+}
+
 // Portal access functions
 function showPatientPortal() {
     if (isAuthenticated()) {
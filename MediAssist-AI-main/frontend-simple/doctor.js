@@ -15,8 +15,12 @@ function setupEventListeners() {
     document.getElementById('doctorPrescriptionFile').addEventListener('change', previewDoctorPrescription);
 }
 
-// Load and display submissions
-async function loadSubmissions() {
+// Submissions loaded so far, and the cursor for the next page (null when there is none)
+let loadedSubmissions = [];
+let nextSubmissionsCursor = null;
+
+// Load and display submissions; loadMore appends the next page
+async function loadSubmissions(loadMore = false) {
     if (!isAuthenticated()) {
         showError('Please login to access submissions');
         window.location.href = 'index.html';
@@ -24,12 +28,15 @@ async function loadSubmissions() {
     }
     
     try {
-        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/get_all_results`);
+        const cursor = loadMore && nextSubmissionsCursor ? `?cursor=${encodeURIComponent(nextSubmissionsCursor)}` : '';
+        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/get_all_results${cursor}`);
         const result = await response.json();
         
         if (response.ok) {
-            displaySubmissions(result.submissions);
-            updateDashboardStats(result.submissions);
+            loadedSubmissions = loadMore ? loadedSubmissions.concat(result.submissions) : result.submissions;
+            nextSubmissionsCursor = result.next_cursor || null;
+            displaySubmissions(loadedSubmissions);
+            updateDashboardStats(loadedSubmissions);
         } else {
             showError('Failed to load submissions');
         }
@@ -88,6 +95,14 @@ function displaySubmissions(submissions) {
         `;
     });
     
+    if (nextSubmissionsCursor) {
+        html += `
+            <div class="text-center">
+                <button class="btn btn-outline-primary" onclick="loadSubmissions(true)">Load more</button>
+            </div>
+        `;
+    }
+    
     submissionsList.innerHTML = html;
 }
 
@@ -193,31 +208,52 @@ async function handleDoctorPrescriptionUpload(event) {
         return;
     }
     
+    // Send the whole stack in one request; results stream back one line per page
+    const formData = new FormData();
     for (let file of files) {
-        const formData = new FormData();
-        formData.append('file', file);
-        
-        showLoading();
+        formData.append('files', file);
+    }
+    
+    showLoading();
+    
+    try {
+        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/submit_prescriptions/batch`, {
+            method: 'POST',
+            body: formData
+        });
         
-        try {
-            const response = await makeAuthenticatedRequest(`${API_BASE_URL}/submit_prescription`, {
-                method: 'POST',
-                body: formData,
-                headers: {
-                    'Authorization': `Bearer ${sessionToken}`
-                }
-            });
-            
+        if (!response.ok) {
             const result = await response.json();
+            showError(`Failed to process prescriptions: ${result.detail || result.error}`);
+        } else {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffered = '';
             
-            if (response.ok) {
-                showSuccess(`Prescription ${file.name} processed successfully!`);
-            } else {
-                showError(`Failed to process ${file.name}: ${result.error}`);
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                
+                buffered += decoder.decode(value, { stream: true });
+                const lines = buffered.split('\n');
+                buffered = lines.pop();
+                
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const item = JSON.parse(line);
+                    
+                    if (item.summary) {
+                        showSuccess(`${item.summary.done} of ${item.summary.total} prescriptions processed`);
+                    } else if (item.status === 'done') {
+                        showSuccess(`Prescription ${item.filename} (page ${item.page}) processed successfully!`);
+                    } else {
+                        showError(`Failed to process ${item.filename} (page ${item.page}): ${item.error}`);
+                    }
+                }
             }
-        } catch (error) {
-            showError(`Network error processing ${file.name}: ${error.message}`);
         }
+    } catch (error) {
+        showError(`Network error processing prescriptions: ${error.message}`);
     }
     
     hideLoading();
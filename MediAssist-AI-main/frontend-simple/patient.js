@@ -159,13 +159,16 @@ async function handlePrescriptionUpload(event) {
         });
         
         const result = await response.json();
-        hideLoading();
         
         if (response.ok) {
+            // Processing happens in the background; wait for the result
+            const job = await waitForJob(result.submission_id);
+            hideLoading();
+            
             showResults({
                 type: 'prescription',
-                extracted_text: result.extracted_text,
-                patient_instructions: result.patient_instructions,
+                extracted_text: job.extracted_text,
+                patient_instructions: job.patient_instructions,
                 submission_id: result.submission_id
             });
             
@@ -173,6 +176,7 @@ async function handlePrescriptionUpload(event) {
             document.getElementById('prescriptionFile').value = '';
             document.getElementById('prescriptionPreview').innerHTML = '';
         } else {
+            hideLoading();
             showError(result.error || 'Failed to process prescription');
         }
     } catch (error) {
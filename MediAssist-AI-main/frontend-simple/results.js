@@ -45,8 +45,12 @@ function setupEventListeners() {
     });
 }
 
-// Load and display results
-async function loadResults() {
+// Results loaded so far, and the cursor for the next page (null when there is none)
+let loadedResults = [];
+let nextResultsCursor = null;
+
+// Load and display results; loadMore appends the next page
+async function loadResults(loadMore = false) {
     // Check if user is authenticated
     if (typeof isAuthenticated !== 'function' || !isAuthenticated()) {
         showError('Please login to view results');
@@ -62,12 +66,15 @@ async function loadResults() {
     }
     
     try {
-        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/get_result`);
+        const cursor = loadMore && nextResultsCursor ? `?cursor=${encodeURIComponent(nextResultsCursor)}` : '';
+        const response = await makeAuthenticatedRequest(`${API_BASE_URL}/get_result${cursor}`);
         const result = await response.json();
         
         if (response.ok) {
-            displayResults(result.submissions);
-            updateSummaryStats(result.submissions);
+            loadedResults = loadMore ? loadedResults.concat(result.submissions) : result.submissions;
+            nextResultsCursor = result.next_cursor || null;
+            displayResults(loadedResults);
+            updateSummaryStats(loadedResults);
         } else {
             showError('Failed to load results: ' + (result.detail || 'Unknown error'));
         }
@@ -155,6 +162,15 @@ function displayResults(submissions) {
     });
     
     html += '</div>';
+    
+    if (nextResultsCursor) {
+        html += `
+            <div class="text-center mt-3">
+                <button class="btn btn-outline-primary" onclick="loadResults(true)">Load more</button>
+            </div>
+        `;
+    }
+    
     timeline.innerHTML = html;
 }
 